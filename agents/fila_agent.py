@@ -1,11 +1,15 @@
 from interfaces.agents.agent_interface import AgentResponse, IAgent
+from utils.circuit_breaker import QUEUE_TIMES, CircuitBreakerOpen, dependency_breaker
+from utils.turn_context import DeadlineExceeded, SEND_RESERVE, TurnContext, guarded_stage
 from utils.orlando_parks import get_orlando_parks
-from services.send_park_service import send_parks_list, send_message
+from services.send_park_service import send_parks_list
 # Removemos a importação do ChatState para evitar o erro
 # from database.models.chat_state import ChatState 
+import asyncio
 import requests
 import re
 import json
+import time
 from datetime import datetime, timezone
 
 # Implementação simplificada do ChatState para modo simulação
@@ -42,12 +46,22 @@ class AgenteFilas(IAgent):
     MODEL = "gpt-4o-mini"
     TEMPERATURE = 0.5
     MAX_TOKENS = 488
+    # Teto (em segundos) da consulta à Queue-Times
+    QUEUE_TIMES_TIMEOUT = 10.0
+    # Última consulta bem-sucedida de cada parque: {park_id: (timestamp, lands, rides)}
+    _queue_snapshots = {}
     
     def __init__(self, clients=None, repositories=None):
         self.clients = clients
         self.repositories = repositories
+        # Cliente de WhatsApp (Z-API ou Evolution) registrado no ClientContainer
+        self.chat = clients.get("whatsapp") if clients else None
         # Usamos nosso SimpleMemoryState em vez do ChatState
         self.chat_state = SimpleMemoryState()
+
+    @staticmethod
+    def factory(client_container, repository_container):
+        return AgenteFilas(client_container, repository_container)
         
     # --- Implementação das Propriedades da Interface ---
     @property
@@ -70,12 +84,69 @@ class AgenteFilas(IAgent):
             "Lembre-se de exibir o crédito obrigatório: Desenvolvido por Queue-Times.com."
         )
     
-    def get_park_queues(self, park_id):
+    async def fetch_park_queues(self, park_id, turn: TurnContext | None = None):
+        """
+        Consulta as filas fora do event loop, dentro da parte do prazo do turno reservada à
+        Queue-Times e atrás do circuit breaker da Queue-Times.
+
+        Returns:
+            tuple: (lands, rides, stale_since) - se a consulta falhar, estourar o prazo ou o
+                  circuito estiver aberto, devolve a última consulta do parque com o horário em
+                  que foi feita (stale_since); sem consulta anterior, listas vazias
+        """
+        timeout = turn.stage_timeout(cap=self.QUEUE_TIMES_TIMEOUT, reserve=SEND_RESERVE) if turn else None
+        try:
+            lands, rides = await guarded_stage(
+                dependency_breaker(QUEUE_TIMES),
+                turn,
+                "queue_times",
+                lambda: asyncio.to_thread(self._request_park_queues, park_id, timeout or self.QUEUE_TIMES_TIMEOUT),
+                cap=self.QUEUE_TIMES_TIMEOUT,
+                reserve=SEND_RESERVE
+            )
+        except (DeadlineExceeded, CircuitBreakerOpen) as e:
+            print(f"⚠️ Queue-Times indisponível para o parque {park_id}: {e}")
+            return self._stale_park_queues(park_id)
+        except Exception as e:
+            print(f"❌ Erro ao consultar filas de Orlando: {e}")
+            return self._stale_park_queues(park_id)
+        
+        AgenteFilas._queue_snapshots[park_id] = (time.time(), lands, rides)
+        return lands, rides, None
+    
+    def _stale_park_queues(self, park_id):
+        """Retorna a última consulta guardada do parque, marcada com o horário em que foi feita."""
+        snapshot = AgenteFilas._queue_snapshots.get(park_id)
+        if not snapshot:
+            return [], [], None
+        fetched_at, lands, rides = snapshot
+        return lands, rides, fetched_at
+    
+    def get_park_queues(self, park_id, timeout: float = 10):
         """
         Consulta os tempos de fila de um parque específico de Orlando usando a API do Queue-Times
         
         Args:
             park_id (int): ID do parque na API Queue-Times
+            timeout (float): Tempo máximo da requisição, em segundos
+            
+        Returns:
+            tuple: (lands, rides) - listas vazias em caso de erro
+        """
+        try:
+            return self._request_park_queues(park_id, timeout)
+        except Exception as e:
+            print(f"❌ Erro ao consultar filas de Orlando: {e}")
+            return [], []
+    
+    def _request_park_queues(self, park_id, timeout: float = 10):
+        """
+        Consulta os tempos de fila de um parque específico de Orlando usando a API do Queue-Times.
+        Erros de rede e de HTTP são propagados (contam como falha no circuit breaker)
+        
+        Args:
+            park_id (int): ID do parque na API Queue-Times
+            timeout (float): Tempo máximo da requisição, em segundos
             
         Returns:
             tuple: (lands, rides) - Lands contém as áreas do parque e suas atrações,
@@ -84,53 +155,48 @@ class AgenteFilas(IAgent):
         url = f"https://queue-times.com/parks/{park_id}/queue_times.json"
         print(f"📊 Consultando filas de Orlando via API: {url}")
         
-        try:
-            resp = requests.get(url, timeout=10)
-            resp.raise_for_status()
-            data = resp.json()
-            
-            # Extrai as terras (lands) e seus passeios (rides)
-            lands = data.get("lands", [])
-            all_rides = data.get("rides", [])
-            
-            # Se há lands com rides, vamos processá-las
-            processed_rides = []
-            if lands:
-                for land in lands:
-                    land_rides = land.get("rides", [])
-                    for ride in land_rides:
-                        # Converte os campos para os nomes que nossa aplicação espera
-                        processed_ride = {
-                            "id": ride.get("id"),
-                            "name": ride.get("name"),
-                            "status": "open" if ride.get("is_open", False) else "closed",
-                            "wait_time": ride.get("wait_time", 0),
-                            "last_updated": ride.get("last_updated"),
-                            "land": land.get("name")
-                        }
-                        processed_rides.append(processed_ride)
-                        
-            # Se há rides soltos (fora de lands), vamos adicioná-los
-            if all_rides:
-                for ride in all_rides:
+        resp = requests.get(url, timeout=timeout)
+        resp.raise_for_status()
+        data = resp.json()
+        
+        # Extrai as terras (lands) e seus passeios (rides)
+        lands = data.get("lands", [])
+        all_rides = data.get("rides", [])
+        
+        # Se há lands com rides, vamos processá-las
+        processed_rides = []
+        if lands:
+            for land in lands:
+                land_rides = land.get("rides", [])
+                for ride in land_rides:
+                    # Converte os campos para os nomes que nossa aplicação espera
                     processed_ride = {
                         "id": ride.get("id"),
                         "name": ride.get("name"),
                         "status": "open" if ride.get("is_open", False) else "closed",
                         "wait_time": ride.get("wait_time", 0),
                         "last_updated": ride.get("last_updated"),
-                        "land": "Geral"
+                        "land": land.get("name")
                     }
                     processed_rides.append(processed_ride)
                     
-            print(f"✅ Filas de Orlando consultadas com sucesso! Encontradas {len(processed_rides)} atrações.")
-            return lands, processed_rides
-            
-        except Exception as e:
-            print(f"❌ Erro ao consultar filas de Orlando: {e}")
-            return [], []
+        # Se há rides soltos (fora de lands), vamos adicioná-los
+        if all_rides:
+            for ride in all_rides:
+                processed_ride = {
+                    "id": ride.get("id"),
+                    "name": ride.get("name"),
+                    "status": "open" if ride.get("is_open", False) else "closed",
+                    "wait_time": ride.get("wait_time", 0),
+                    "last_updated": ride.get("last_updated"),
+                    "land": "Geral"
+                }
+                processed_rides.append(processed_ride)
+                
+        print(f"✅ Filas de Orlando consultadas com sucesso! Encontradas {len(processed_rides)} atrações.")
+        return lands, processed_rides
     
-    def format_queue_message(self, park_name, lands, rides):
+    def format_queue_message(self, park_name, lands, rides, stale_since=None):
         """
         Formata a mensagem de filas de Orlando de modo amigável, agrupando por áreas
         
@@ -138,14 +204,21 @@ class AgenteFilas(IAgent):
             park_name (str): Nome do parque de Orlando
             lands (list): Lista de áreas do parque
             rides (list): Lista de atrações
+            stale_since (float): Horário (timestamp) da consulta, quando os dados não são atuais
             
         Returns:
             str: Mensagem formatada
         """
-        # Obtém a data/hora atual em UTC
-        now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+        # Obtém a data/hora da consulta (a atual, se os dados são atuais) em UTC
+        updated_at = datetime.fromtimestamp(stale_since, timezone.utc) if stale_since else datetime.now(timezone.utc)
+        now = updated_at.strftime("%Y-%m-%d %H:%M:%S UTC")
         
         message = f"🎢 *Tempos de fila em {park_name} - Orlando* 🎢\n\n"
+        if stale_since:
+            message += (
+                "⚠️ _A consulta de filas em tempo real está indisponível agora; "
+                "estes são os últimos tempos que consegui obter._\n\n"
+            )
         
         # Se temos áreas definidas, vamos organizar por áreas
         if lands:
@@ -210,7 +283,7 @@ class AgenteFilas(IAgent):
                 return None
         return None
     
-    async def execute(self, context: list[dict], phone: str, user: dict | None) -> AgentResponse:
+    async def execute(self, context: list[dict], phone: str, user: dict | None, turn: TurnContext | None = None) -> AgentResponse:
         """
         Processa a mensagem do usuário e retorna uma resposta sobre filas de parques de Orlando.
         
@@ -218,6 +291,7 @@ class AgenteFilas(IAgent):
             context: Lista com o histórico da conversa
             phone: Número de telefone do usuário
             user: Informações do usuário (opcional)
+            turn: Dados do turno em andamento (opcional)
             
         Returns:
             AgentResponse: Resposta estruturada do agente
@@ -269,20 +343,20 @@ class AgenteFilas(IAgent):
                 
                 # Consulta as filas do parque usando o ID correto do Queue-Times
                 print(f"🎯 Parque selecionado em Orlando: {park['nome']} (ID: {park['id']})")
-                lands, rides = self.get_park_queues(park["id"])
+                lands, rides, stale_since = await self.fetch_park_queues(park["id"], turn)
                 
                 if not rides:
                     return AgentResponse(
                         status="error",
-                        message=f"Não foi possível obter os tempos de fila para {park['nome']} em Orlando no momento.",
+                        message=f"Não foi possível obter os tempos de fila para {park['nome']} em Orlando no momento. Tente de novo em alguns minutos.",
                         tool_data={"park_id": park["id"], "selected_by_number": numero_parque}
                     )
                 
                 # Formata a mensagem com as lands e rides
-                queue_message = self.format_queue_message(park["nome"], lands, rides)
+                queue_message = self.format_queue_message(park["nome"], lands, rides, stale_since)
                 
-                # Envia via ZAPI
-                status, _ = send_message(phone, queue_message)
+                # Envia pelo cliente de WhatsApp
+                await self.chat.send_message(phone, queue_message)
                 
                 # Limpa o estado aguardando seleção
                 state["awaiting_park_choice"] = False
@@ -302,7 +376,7 @@ class AgenteFilas(IAgent):
                 )
             else:
                 # Número fora do range válido
-                send_parks_list(phone)
+                await send_parks_list(self.chat, phone)
                 return AgentResponse(
                     status="error",
                     message=f"Número {numero_parque} inválido. Por favor, escolha um número entre 1 e {len(parks)} para ver as filas dos parques de Orlando.",
@@ -311,7 +385,7 @@ class AgenteFilas(IAgent):
         
         # CASO 2: Usuário pede a lista de parques
         elif "parques" in last_user_message or "lista" in last_user_message or "filas" in last_user_message:
-            status, mensagem = send_parks_list(phone)
+            await send_parks_list(self.chat, phone)
             
             # Atualiza o estado para aguardar seleção de parque
             state["awaiting_park_choice"] = True
@@ -327,7 +401,7 @@ class AgenteFilas(IAgent):
         # CASO 3: Verificar se o usuário está selecionando um parque pelo número sem contexto prévio
         elif self._identificar_numero_parque(last_user_message) is not None:
             # Enviamos a lista de parques primeiro
-            status, mensagem = send_parks_list(phone)
+            await send_parks_list(self.chat, phone)
             
             # Atualiza o estado para aguardar seleção de parque
             state["awaiting_park_choice"] = True
@@ -356,20 +430,20 @@ class AgenteFilas(IAgent):
                 if park["nome"].lower() in last_user_message.lower():
                     try:
                         # Consulta as filas do parque
-                        lands, rides = self.get_park_queues(park["id"])
+                        lands, rides, stale_since = await self.fetch_park_queues(park["id"], turn)
                         
                         if not rides:
                             return AgentResponse(
                                 status="error",
-                                message=f"Não foi possível obter os tempos de fila para {park['nome']} em Orlando no momento.",
+                                message=f"Não foi possível obter os tempos de fila para {park['nome']} em Orlando no momento. Tente de novo em alguns minutos.",
                                 tool_data={"park_id": park["id"]}
                             )
                         
                         # Formata a mensagem
-                        queue_message = self.format_queue_message(park["nome"], lands, rides)
+                        queue_message = self.format_queue_message(park["nome"], lands, rides, stale_since)
                         
-                        # Envia via ZAPI
-                        status, _ = send_message(phone, queue_message)
+                        # Envia pelo cliente de WhatsApp
+                        await self.chat.send_message(phone, queue_message)
                         
                         # Atualiza o estado
                         state["awaiting_park_choice"] = False
@@ -391,7 +465,7 @@ class AgenteFilas(IAgent):
                         )
             
             # Nenhuma das opções acima, enviar a lista de parques
-            status, mensagem = send_parks_list(phone)
+            await send_parks_list(self.chat, phone)
             
             # Atualiza o estado para aguardar seleção de parque
             state["awaiting_park_choice"] = True
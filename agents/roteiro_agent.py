@@ -1,14 +1,26 @@
 # agents/roteiro_agent.py
+import asyncio
 import json
 import os
+import re
 import sys
+import time
 from openai import AsyncOpenAI
-from utils.pdf_utils import gerar_pdf_base64
-from services.send_pdf_service import send_pdf_via_whatsapp
+from utils.metrics import metrics
+from utils.pdf_utils import DaySectionSplitter
+from services.pdf_render_service import pdf_render_service, RenderedPdf
+from services.send_pdf_service import (
+    send_pdf_via_whatsapp, send_pdf_url_via_whatsapp, build_document_url, public_base_url
+)
+from interfaces.repositories.document_store_interface import IDocumentStore
+from interfaces.clients.chat_interface import IChat
 from openai.types.chat import ChatCompletionMessageParam
-from interfaces.agents.agent_interface import IAgent, AgentResponse
+from interfaces.agents.agent_interface import IAgent
+from utils.circuit_breaker import OPENAI, dependency_breaker
+from utils.turn_context import SEND_RESERVE, TurnContext, guarded_stage, within_deadline
 from typing import TYPE_CHECKING
 from services.itinerary_generator_service import ItineraryGeneratorService
+from services.speculative_itinerary_service import SpeculativeItineraryService
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
@@ -28,12 +40,31 @@ class RoteiroAgent(IAgent):
     MODEL = "gpt-4o-mini"
     TEMPERATURE = 0.5
     MAX_TOKENS = 2048
+    # Geração + PDF + envio do roteiro podem levar mais que o timeout padrão das tools
+    TOOL_TIMEOUTS = {"roteiro": 120.0}
+    EXPECTED_LATENCY = 20.0
+    DEGRADED_MESSAGE = (
+        "Estou com uma instabilidade para montar roteiros agora. 😕 Tente de novo em alguns minutos: "
+        "as informações que você já me passou continuam aqui na conversa."
+    )
+    INTERIM_MESSAGE = "✍️ Estou montando seu roteiro, isso leva alguns segundos. Já te envio!"
+    # A coleta de dados precisa das respostas anteriores, mas não da conversa inteira
+    CONTEXT_TOKEN_BUDGET = 3000
 
-    def __init__(self, client: AsyncOpenAI):
+    def __init__(self, client: AsyncOpenAI, chat: IChat | None = None, document_store: IDocumentStore | None = None):
         """O construtor recebe o cliente da IA já inicializado."""
         self.client = client
+        self.chat = chat
+        self.document_store = document_store
+        # Entrega por URL: o provedor baixa o PDF de PUBLIC_BASE_URL, que precisa estar configurada
+        self.deliver_by_url = bool(document_store) and os.getenv("DOCUMENT_DELIVERY", "base64").lower() == "url"
+        if self.deliver_by_url:
+            public_base_url()
         self.itinerary_service = ItineraryGeneratorService(client)
-        self.collected_data = {}
+        self.speculative_service = SpeculativeItineraryService(
+            self.itinerary_service,
+            parameters=self.tools[0]["function"]["parameters"]
+        )
 
     # --- Implementação das Propriedades da Interface ---
     @property
@@ -69,7 +100,9 @@ class RoteiroAgent(IAgent):
                 IMPORTANTE: Só acione a function 'roteiro' após toda a coleta obrigatória. Continue perguntando até que todas as informações sejam fornecidas.
 
                 # Output Format
-                - Durante a coleta: saída em lista numerada das perguntas obrigatórias faltantes.
+                - Durante a coleta: responda SEMPRE com um objeto JSON com duas chaves:
+                    - "mensagem": o texto para o viajante, com a lista numerada das perguntas obrigatórias faltantes;
+                    - "dados": objeto com TODOS os dados que o viajante já informou na conversa até agora, com os mesmos nomes de campo da function 'roteiro'. Inclua somente campos respondidos explicitamente; não invente valores.
                 - Quando todas as respostas foram coletadas: CHAME A FUNCTION 'roteiro' passando todos os dados coletados como argumento. **Não gere o roteiro como texto diretamente, apenas acione a function.**
                 - Nunca gere o roteiro diretamente, apenas acione a function 'roteiro' com os dados coletados.
             """
@@ -267,15 +300,22 @@ class RoteiroAgent(IAgent):
         ]
                 
 
+    def tool_handlers(self) -> dict:
+        return {"roteiro": self._roteiro_tool}
+
     @staticmethod
     def factory(client_container: "ClientContainer", repository_container: "RepositoryContainer") -> "IAgent":
         """Método fábrica que cria a instância do agente, injetando as dependências corretas."""
         openai_client = client_container.get("async_openai")
         if not openai_client:
             raise ValueError("Cliente 'async_openai' não encontrado.")
-        return RoteiroAgent(client=openai_client)
+        return RoteiroAgent(
+            client=openai_client,
+            chat=client_container.get("whatsapp"),
+            document_store=repository_container.get("document")
+        )
 
-    async def execute(self, context: list[dict], phone: str, user: dict | None) -> dict:
+    async def execute(self, context: list[dict], phone: str, user: dict | None, turn: TurnContext | None = None) -> dict:
         """
         Ponto de entrada principal do agente. A assinatura agora é compatível.
         """
@@ -294,37 +334,70 @@ class RoteiroAgent(IAgent):
         # Adicionando o histórico da conversa
         messages.extend(context)
         
-        response = await self.client.chat.completions.create(
-            model=self.MODEL,
-            messages=messages,
-            tools=self.tools,
-            tool_choice="auto",
-            temperature=self.TEMPERATURE,
-            max_tokens=self.MAX_TOKENS
+        response = await guarded_stage(
+            dependency_breaker(OPENAI),
+            turn,
+            "agent_llm",
+            lambda: self.client.chat.completions.create(
+                model=self.MODEL,
+                messages=messages,
+                tools=self.tools,
+                tool_choice="auto",
+                # Na coleta, a resposta traz a mensagem e os dados já informados (ver system)
+                response_format={"type": "json_object"},
+                temperature=self.TEMPERATURE,
+                max_tokens=self.MAX_TOKENS
+            ),
+            reserve=SEND_RESERVE
         )
         
         message = response.choices[0].message
         
         if message.tool_calls:
-            tool_call = message.tool_calls[0]
-            function_name = tool_call.function.name
-            arguments = json.loads(tool_call.function.arguments)
-            
-            if function_name == "roteiro":
-                print("INFO: Todas as informações coletadas! Gerando roteiro...")
-                roteiro = await self.roteiro(arguments, phone)
-                return {
-                    'status': 'final_answer',
-                    'message': roteiro
-                }
+            # Executa todas as tool calls e devolve os resultados ao modelo em uma única chamada
+            final_message, _ = await self.complete_tool_calls(
+                self.client,
+                messages,
+                message,
+                tool_kwargs={"phone": phone, "turn": turn},
+                model=self.MODEL,
+                temperature=self.TEMPERATURE,
+                max_tokens=self.MAX_TOKENS
+            )
+            return {
+                'status': 'final_answer',
+                'message': final_message or self.DEGRADED_MESSAGE
+            }
         
+        # Ainda coletando: com os dados que o próprio agente informou, verifica se já dá
+        # para pré-gerar o roteiro em segundo plano
+        reply, slots = self._parse_collecting_reply(message.content)
+        self.speculative_service.observe(phone, slots)
+
         # Se não houver tool_calls, retorna a mensagem da IA (que deve ser uma pergunta)
         return {
             'status': 'collecting_data',
-            'message': message.content or "Por favor, forneça mais informações para seu roteiro."
+            'message': reply or "Por favor, forneça mais informações para seu roteiro."
         }
+
+    @staticmethod
+    def _parse_collecting_reply(content: str | None) -> tuple[str | None, dict]:
+        """Separa a mensagem ao viajante e os dados coletados da resposta JSON da coleta."""
+        try:
+            reply = json.loads(content or "")
+        except json.JSONDecodeError:
+            return content, {}
+        if not isinstance(reply, dict):
+            return content, {}
+        text, slots = reply.get("mensagem"), reply.get("dados")
+        return (text if isinstance(text, str) else None), (slots if isinstance(slots, dict) else {})
             
-    async def roteiro(self, dados_coletados: dict, phone: str) -> str:
+    async def _roteiro_tool(self, arguments: dict, phone: str, turn: TurnContext | None = None) -> str:
+        """Handler da function 'roteiro' usado pela camada de execução de tools."""
+        print("INFO: Todas as informações coletadas! Gerando roteiro...")
+        return await self.roteiro(arguments, phone, turn)
+
+    async def roteiro(self, dados_coletados: dict, phone: str, turn: TurnContext | None = None) -> str:
         """
         Função que envia os dados coletados para o serviço de geração de roteiro.
         Esta função é chamada quando todas as informações obrigatórias forem coletadas.
@@ -332,20 +405,102 @@ class RoteiroAgent(IAgent):
         Args:
             dados_coletados (dict): Dicionário com todos os dados coletados do usuário.
             phone (str): Número de telefone para enviar o PDF.
+            turn (TurnContext): Turno em andamento; a renderização respeita o seu prazo.
             
         Returns:
             str: O roteiro personalizado gerado
         """
-        print("INFO: Gerando roteiro com os dados coletados...")
-        roteiro_final = await self.itinerary_service.generate(dados_coletados)
-        
-        print("INFO: Convertendo roteiro para PDF...")
-        pdf_base64 = gerar_pdf_base64(roteiro_final)
+        roteiro_final = await self.speculative_service.take(phone, dados_coletados)
+        if roteiro_final:
+            print("INFO: Reaproveitando roteiro pré-gerado...")
+            print("INFO: Convertendo roteiro para PDF...")
+            pdf = await within_deadline(
+                turn, "pdf_render", pdf_render_service.render(roteiro_final), reserve=SEND_RESERVE
+            )
+        else:
+            print("INFO: Gerando roteiro com os dados coletados...")
+            pdf = await self._gerar_pdf_em_streaming(dados_coletados, phone, turn)
         
         print(f"INFO: Enviando PDF para {phone}...")
-        enviado = send_pdf_via_whatsapp(phone, pdf_base64)
+        with pdf:
+            enviado = await self._enviar_pdf(phone, pdf)
         
         if enviado:
             return "Seu roteiro personalizado para Orlando está pronto! Acabei de enviar o PDF pelo WhatsApp. 😊 Qualquer dúvida sobre o roteiro, é só me perguntar!"
         else:
-            return "Seu roteiro está pronto, mas encontrei um problema ao enviar o PDF pelo WhatsApp. Por favor, tente novamente ou entre em contato com o suporte."
\ No newline at end of file
+            return "Seu roteiro está pronto, mas encontrei um problema ao enviar o PDF pelo WhatsApp. Por favor, tente novamente ou entre em contato com o suporte."
+
+    async def _enviar_pdf(self, phone: str, pdf: RenderedPdf) -> bool:
+        """
+        Envia o PDF pelo WhatsApp. Com DOCUMENT_DELIVERY=url, o documento é gravado no
+        armazenamento endereçado por conteúdo e o provedor o baixa pela URL pública (PUBLIC_BASE_URL);
+        caso contrário, os bytes seguem para o chat (a outbox grava o documento e só o
+        cliente do provedor o codifica em base64).
+        """
+        if self.deliver_by_url:
+            # Hash, gravação e fsync fora do event loop
+            content_hash = await asyncio.to_thread(self.document_store.put, pdf.view)
+            return await send_pdf_url_via_whatsapp(self.chat, phone, build_document_url(content_hash))
+        return await send_pdf_via_whatsapp(self.chat, phone, pdf.view)
+
+    async def _gerar_pdf_em_streaming(
+        self, dados_coletados: dict, phone: str, turn: TurnContext | None = None
+    ) -> RenderedPdf:
+        """
+        Gera o roteiro em streaming, diagramando o PDF dia a dia no pool de
+        renderização. Assim que o primeiro dia fica pronto, uma prévia em texto é
+        enviada pelo WhatsApp enquanto os demais dias ainda estão sendo gerados.
+
+        A geração (etapa "itinerary_llm") e o fechamento do PDF (etapa "pdf_render")
+        respeitam o prazo do turno separadamente; se uma delas falhar ou estourar o
+        prazo, as diagramações e a prévia ainda pendentes são canceladas.
+        """
+        inicio = time.perf_counter()
+        splitter = DaySectionSplitter()
+        diagramacoes: list[asyncio.Task] = []
+        envio_previa = None
+
+        def processar(secoes: list[str]):
+            nonlocal envio_previa
+            for secao in secoes:
+                diagramacoes.append(asyncio.create_task(pdf_render_service.layout(secao)))
+                if envio_previa is None and DaySectionSplitter.is_day_section(secao):
+                    metrics.observe("roteiro_time_to_first_content_seconds", time.perf_counter() - inicio)
+                    print(f"INFO: Enviando prévia do primeiro dia para {phone}...")
+                    envio_previa = asyncio.create_task(
+                        self.chat.send_message(phone, self._formatar_previa(secao))
+                    )
+
+        async def gerar():
+            async for trecho in self.itinerary_service.generate_stream(dados_coletados):
+                processar(splitter.feed(trecho))
+            processar(splitter.flush())
+
+        async def finalizar() -> RenderedPdf:
+            secoes_diagramadas = await asyncio.gather(*diagramacoes)
+            return await pdf_render_service.render_lines([linha for secao in secoes_diagramadas for linha in secao])
+
+        try:
+            await within_deadline(turn, "itinerary_llm", gerar(), reserve=SEND_RESERVE)
+
+            print("INFO: Finalizando PDF do roteiro...")
+            pdf = await within_deadline(turn, "pdf_render", finalizar(), reserve=SEND_RESERVE)
+
+            # Garante que a prévia saia antes do PDF
+            if envio_previa is not None:
+                try:
+                    await envio_previa
+                except Exception as e:
+                    print(f"WARNING: Falha ao enviar a prévia do roteiro para {phone}: {e}")
+
+            return pdf
+        finally:
+            for tarefa in [*diagramacoes, envio_previa]:
+                if tarefa is not None and not tarefa.done():
+                    tarefa.cancel()
+
+    @staticmethod
+    def _formatar_previa(secao: str) -> str:
+        # O WhatsApp usa um único asterisco para negrito
+        texto = re.sub(r"\*\*(.+?)\*\*", r"*\1*", secao.strip())
+        return f"✨ Seu roteiro está quase pronto! Enquanto finalizo o PDF, aqui vai uma prévia do primeiro dia:\n\n{texto}"
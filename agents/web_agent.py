@@ -1,10 +1,18 @@
+import asyncio
 from interfaces.agents.agent_interface import IAgent
+from utils.circuit_breaker import OPENAI, dependency_breaker
+from utils.turn_context import SEND_RESERVE, TurnContext, guarded_stage
 from openai import OpenAI
 
 class WebAgent(IAgent):
     id = "#4"
     name = "Agente_Web"
     model = "gpt-4o-mini" 
+    EXPECTED_LATENCY = 15.0
+    INTERIM_MESSAGE = "🔎 Estou pesquisando isso para você, só um instante!"
+    DEGRADED_MESSAGE = "🔎 A pesquisa na web está indisponível no momento. Pode tentar de novo em alguns minutos?"
+    # Só a última pergunta do usuário vai para a pesquisa
+    CONTEXT_TOKEN_BUDGET = 1000
     description = (
         "Agente responsável por realizar pesquisas aprofundadas na web sobre Orlando, "
         "fornecendo informações completas, atualizadas e confiáveis sobre a cidade. O agente conhece desde atrações turísticas, "
@@ -34,6 +42,7 @@ class WebAgent(IAgent):
             model=self.model,  # Sempre utilize o atributo da classe
             tools=[{"type": "web_search_preview"}],
             input=query,
+            **({"timeout": kwargs["timeout"]} if kwargs.get("timeout") else {})
         )
         # Extrai o texto da resposta
         output_text = ""
@@ -48,7 +57,7 @@ class WebAgent(IAgent):
             "raw_response": response
         }
         
-    async def execute(self, context: list[dict], phone: str, user: dict) -> dict:
+    async def execute(self, context: list[dict], phone: str, user: dict, turn: TurnContext | None = None) -> dict:
         """
         Executa o agente web, recebendo o contexto da conversa, telefone e dados do usuário.
         """
@@ -56,5 +65,13 @@ class WebAgent(IAgent):
         if not last_user_message:
             return {"text": "Nenhuma mensagem de usuário encontrada no contexto."}
         query = last_user_message[-1]["content"]
-        result = self.run(query)
+        # O cliente é síncrono: roda numa thread, com o timeout da requisição no prazo do turno
+        timeout = turn.stage_timeout(reserve=SEND_RESERVE) if turn else None
+        result = await guarded_stage(
+            dependency_breaker(OPENAI),
+            turn,
+            "agent_llm",
+            lambda: asyncio.to_thread(self.run, query, timeout=timeout),
+            reserve=SEND_RESERVE
+        )
         return result
\ No newline at end of file
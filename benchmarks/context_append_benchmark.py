@@ -0,0 +1,125 @@
+# benchmarks/context_append_benchmark.py
+"""
+Compara o append antigo (carrega o histórico inteiro e usa len() como sequência)
+com o append pelo contador do contexto: latência por mensagem e idas ao banco,
+para contextos de tamanhos crescentes (até 10 mil mensagens).
+
+Uso:
+    python -m benchmarks.context_append_benchmark [--tamanhos 100 1000 10000] [--mensagens 50] [--url sqlite:///...]
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event, insert, update
+
+from clients.database_client import DatabaseClient
+from database.config import Base
+from database.models import ContextMessage, ConversationContext, User
+from repositories.conversation_context_repository import ConversationContextRepository
+
+
+class ContadorDeConsultas:
+    """Conta as instruções SQL enviadas ao banco pelo engine assíncrono."""
+
+    def __init__(self, engine):
+        self.total = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._contar)
+
+    def _contar(self, *_):
+        self.total += 1
+
+
+async def preparar_contexto(db: DatabaseClient, repository: ConversationContextRepository, tamanho: int, sessao: str) -> int:
+    async with db.session() as session:
+        user_id = (await session.execute(
+            insert(User).values(name="Benchmark", phone=sessao).returning(User.id)
+        )).scalar_one()
+        await session.commit()
+
+    context = await repository.create_context(user_id=user_id, session_id=sessao, agent_id="benchmark")
+    agora = datetime.datetime.now()
+    async with db.session() as session:
+        for inicio in range(0, tamanho, 1000):
+            await session.execute(insert(ContextMessage), [
+                {
+                    "context_id": context.id,
+                    "role": "user" if sequencia % 2 == 0 else "assistant",
+                    "content": f"Mensagem {sequencia} sobre parques, ingressos e restaurantes em Orlando.",
+                    "sequence": sequencia,
+                    "created_at": agora,
+                }
+                for sequencia in range(inicio, min(inicio + 1000, tamanho))
+            ])
+        await session.execute(
+            update(ConversationContext.__table__)
+            .where(ConversationContext.id == context.id)
+            .values({ConversationContext.message_count: tamanho})
+        )
+        await session.commit()
+    return context.id
+
+
+async def append_legado(repository: ConversationContextRepository, sessao: str, conteudo: str) -> None:
+    """Cópia do fluxo anterior de ContextService.store_user_message."""
+    context = await repository.get_latest_context_by_session(sessao)
+    messages = await repository.get_messages_by_context(context.id)
+    await repository.add_message(context_id=context.id, role="user", content=conteudo, sequence=len(messages))
+
+
+async def append_contador(repository: ConversationContextRepository, sessao: str, conteudo: str) -> None:
+    await repository.append_message(role="user", content=conteudo, session_id=sessao)
+
+
+async def executar(nome: str, append, db, repository, contador, tamanho: int, mensagens: int) -> None:
+    sessao = f"bench_{nome}_{tamanho}"
+    await preparar_contexto(db, repository, tamanho, sessao)
+
+    consultas_antes = contador.total
+    duracoes = []
+    for indice in range(mensagens):
+        inicio = time.perf_counter()
+        await append(repository, sessao, f"Nova mensagem {indice}")
+        duracoes.append(time.perf_counter() - inicio)
+    consultas = (contador.total - consultas_antes) / mensagens
+
+    duracoes.sort()
+    media = sum(duracoes) / len(duracoes)
+    p95 = duracoes[min(len(duracoes) - 1, int(len(duracoes) * 0.95))]
+    print(
+        f"{nome:<9} histórico={tamanho:<6} mensagens={mensagens:<4} "
+        f"média={media * 1000:8.2f}ms  p95={p95 * 1000:8.2f}ms  consultas/mensagem={consultas:4.1f}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--mensagens", type=int, default=50)
+    parser.add_argument("--url", default=None, help="Banco de teste (padrão: SQLite temporário)")
+    args = parser.parse_args()
+
+    diretorio = tempfile.TemporaryDirectory()
+    url = args.url or f"sqlite:///{os.path.join(diretorio.name, 'benchmark.db')}"
+    db = DatabaseClient(url)
+    Base.metadata.create_all(db.sync_engine)
+
+    repository = ConversationContextRepository(db)
+    contador = ContadorDeConsultas(db.async_engine)
+    try:
+        for tamanho in args.tamanhos:
+            await executar("antes", append_legado, db, repository, contador, tamanho, args.mensagens)
+            await executar("depois", append_contador, db, repository, contador, tamanho, args.mensagens)
+    finally:
+        await db.aclose()
+        diretorio.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
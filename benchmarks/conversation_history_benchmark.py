@@ -0,0 +1,144 @@
+"""
+Compara o save_history antigo do DatabaseConversationRepository (apaga a sessão e
+regrava o histórico inteiro) com o atual (insere só as mensagens novas): latência
+por turno e instruções SQL por turno, além da leitura das últimas mensagens,
+para históricos de 1 mil e 10 mil mensagens.
+
+Uso:
+    python -m benchmarks.conversation_history_benchmark [--tamanhos 1000 10000] [--turnos 20] [--url sqlite:///...]
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event, text
+
+from clients.database_client import DatabaseClient
+from database.config import Base
+from repositories.conversation_repository import DatabaseConversationRepository
+import database.models  # registra os modelos no metadata
+
+
+class ContadorDeConsultas:
+    """Conta as instruções SQL enviadas ao banco pelo engine assíncrono."""
+
+    def __init__(self, engine):
+        self.total = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._contar)
+
+    def _contar(self, *_):
+        self.total += 1
+
+
+async def save_legado(db: DatabaseClient, session_id: str, history: list) -> None:
+    """Cópia do save_history anterior: DELETE da sessão e INSERT de todo o histórico."""
+    async with db.session() as session:
+        await session.execute(
+            text("DELETE FROM conversation_messages WHERE session_id = :session_id"),
+            {"session_id": session_id}
+        )
+        now = datetime.datetime.now()
+        await session.execute(
+            text("""
+            INSERT INTO conversation_messages
+            (session_id, sequence, role, content, created_at)
+            VALUES (:session_id, :sequence, :role, :content, :created_at)
+            """),
+            [
+                {
+                    "session_id": session_id,
+                    "sequence": i,
+                    "role": message.get("role", "unknown"),
+                    "content": json.dumps(message.get("content", "")),
+                    "created_at": now
+                }
+                for i, message in enumerate(history)
+            ]
+        )
+        await session.commit()
+
+
+async def get_legado(db: DatabaseClient, session_id: str, limit: int) -> list:
+    """Leitura anterior: carrega a sessão inteira e corta as últimas mensagens."""
+    async with db.session() as session:
+        result = await session.execute(
+            text("SELECT role, content FROM conversation_messages WHERE session_id = :session_id ORDER BY sequence ASC"),
+            {"session_id": session_id}
+        )
+        return [{"role": row[0], "content": json.loads(row[1])} for row in result][-limit:]
+
+
+def mensagem(indice: int) -> dict:
+    return {
+        "role": "user" if indice % 2 == 0 else "assistant",
+        "content": f"Mensagem {indice} sobre parques, ingressos e restaurantes em Orlando."
+    }
+
+
+async def executar(nome: str, db, repository, contador, tamanho: int, turnos: int) -> None:
+    sessao = f"bench_{nome}_{tamanho}"
+    history = [mensagem(i) for i in range(tamanho)]
+    await repository.save_history(sessao, history)
+
+    consultas_antes = contador.total
+    duracoes = []
+    for turno in range(turnos):
+        history = history + [mensagem(tamanho + turno)]
+        inicio = time.perf_counter()
+        if nome == "antes":
+            await save_legado(db, sessao, history)
+        else:
+            await repository.save_history(sessao, history)
+        duracoes.append(time.perf_counter() - inicio)
+    consultas = (contador.total - consultas_antes) / turnos
+
+    inicio = time.perf_counter()
+    for _ in range(turnos):
+        if nome == "antes":
+            await get_legado(db, sessao, 20)
+        else:
+            await repository.get_history(sessao, limit=20)
+    leitura = (time.perf_counter() - inicio) / turnos
+
+    duracoes.sort()
+    media = sum(duracoes) / len(duracoes)
+    p95 = duracoes[min(len(duracoes) - 1, int(len(duracoes) * 0.95))]
+    print(
+        f"{nome:<6} histórico={tamanho:<6} turnos={turnos:<4} "
+        f"save média={media * 1000:9.2f}ms  p95={p95 * 1000:9.2f}ms  consultas/turno={consultas:8.1f}  "
+        f"últimas 20={leitura * 1000:7.2f}ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--turnos", type=int, default=20)
+    parser.add_argument("--url", default=None, help="Banco de teste (padrão: SQLite temporário)")
+    args = parser.parse_args()
+
+    diretorio = tempfile.TemporaryDirectory()
+    url = args.url or f"sqlite:///{os.path.join(diretorio.name, 'benchmark.db')}"
+    db = DatabaseClient(url)
+    Base.metadata.create_all(db.sync_engine)
+
+    repository = DatabaseConversationRepository(db)
+    contador = ContadorDeConsultas(db.async_engine)
+    try:
+        for tamanho in args.tamanhos:
+            await executar("antes", db, repository, contador, tamanho, args.turnos)
+            await executar("depois", db, repository, contador, tamanho, args.turnos)
+    finally:
+        await db.aclose()
+        diretorio.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
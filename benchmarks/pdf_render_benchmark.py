@@ -0,0 +1,111 @@
+# benchmarks/pdf_render_benchmark.py
+"""
+Compara a renderização antiga (reportlab síncrono no event loop) com o pool de
+renderização: páginas por segundo e tempo máximo/total de bloqueio do event loop.
+
+Uso:
+    python -m benchmarks.pdf_render_benchmark [--docs 20] [--dias 10]
+"""
+import argparse
+import asyncio
+import io
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+from services.pdf_render_service import PdfRenderService
+
+PAGE_PATTERN = re.compile(rb"/Type\s*/Page\b")
+
+
+def gerar_roteiro_exemplo(dias: int) -> str:
+    linhas = ["Roteiro personalizado para Orlando", ""]
+    for dia in range(1, dias + 1):
+        linhas.append(f"**Dia {dia}: Magic Kingdom e Disney Springs**")
+        for hora in range(8, 22):
+            linhas.append(
+                f"- {hora:02d}:00 - Atividade com descrição longa o bastante para ultrapassar a largura "
+                f"da página e exigir quebra de linha, incluindo **dicas práticas** e sugestões de comida."
+            )
+        linhas.append("")
+    return "\n".join(linhas)
+
+
+def render_legado(conteudo_texto: str) -> bytes:
+    """Cópia da implementação anterior de utils/pdf_utils.gerar_pdf_base64 (sem base64)."""
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=letter)
+    largura, altura = letter
+    y = altura - 50
+    for linha in conteudo_texto.split('\n'):
+        pdf.drawString(50, y, linha)
+        y -= 15
+        if y < 50:
+            pdf.showPage()
+            y = altura - 50
+    pdf.save()
+    return buffer.getvalue()
+
+
+async def medir_bloqueio(parar: asyncio.Event, intervalo: float = 0.005) -> tuple[float, float]:
+    """Mede o atraso dos ticks do event loop: (maior bloqueio, bloqueio total)."""
+    maior = total = 0.0
+    while not parar.is_set():
+        inicio = time.perf_counter()
+        await asyncio.sleep(intervalo)
+        atraso = time.perf_counter() - inicio - intervalo
+        if atraso > 0.001:
+            maior = max(maior, atraso)
+            total += atraso
+    return maior, total
+
+
+async def executar(nome: str, renderizar, documentos: list[str]) -> None:
+    parar = asyncio.Event()
+    monitor = asyncio.create_task(medir_bloqueio(parar))
+    await asyncio.sleep(0.05)
+
+    inicio = time.perf_counter()
+    paginas = sum(await asyncio.gather(*(renderizar(doc) for doc in documentos)))
+    duracao = time.perf_counter() - inicio
+
+    parar.set()
+    maior, total = await monitor
+    print(
+        f"{nome:<10} docs={len(documentos):<4} páginas={paginas:<5} "
+        f"páginas/s={paginas / duracao:8.1f}  bloqueio máx={maior * 1000:7.1f}ms  bloqueio total={total * 1000:8.1f}ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--dias", type=int, default=10)
+    args = parser.parse_args()
+
+    documentos = [gerar_roteiro_exemplo(args.dias) for _ in range(args.docs)]
+
+    async def legado(doc: str) -> int:
+        return len(PAGE_PATTERN.findall(render_legado(doc)))
+
+    service = PdfRenderService()
+    await service.warm()
+
+    async def pool(doc: str) -> int:
+        with await service.render(doc) as pdf:
+            return len(PAGE_PATTERN.findall(pdf.view))
+
+    try:
+        await executar("antes", legado, documentos)
+        await executar("depois", pool, documentos)
+    finally:
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,176 @@
+# clients/database_client.py
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from interfaces.clients.database_interface import IDatabase, IAsyncDatabase
+from utils.metrics import metrics
+
+# Driver assíncrono de cada banco: asyncpg para Postgres, aiosqlite para o SQLite local
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+SYNC_DRIVERS = {
+    "postgresql": "postgresql",
+    "postgres": "postgresql",
+    "sqlite": "sqlite",
+}
+
+
+def _with_driver(url: str, drivers: dict) -> str:
+    scheme, rest = url.split("://", 1)
+    driver = drivers.get(scheme.split("+")[0])
+    return f"{driver}://{rest}" if driver else url
+
+
+def to_async_url(url: str) -> str:
+    return _with_driver(url, ASYNC_DRIVERS)
+
+
+def to_sync_url(url: str) -> str:
+    return _with_driver(url, SYNC_DRIVERS)
+
+
+class DatabaseClient(IDatabase, IAsyncDatabase):
+    """
+    Cliente de banco de dados com sessões de escopo bem definido.
+
+    - `session()`: sessão assíncrona (asyncpg/aiosqlite) para os repositórios chamados
+      a partir do event loop.
+    - `get_session()`: sessão síncrona para repositórios executados em threads
+      (ex: outbox e status de mensagens, via asyncio.to_thread). O engine síncrono
+      só é criado no primeiro uso.
+
+    O uso dos pools é publicado nas métricas `db_pool_in_use`, `db_pool_wait_seconds`
+    e `db_pool_timeouts` (label `pool` = async | sync).
+    """
+
+    def __init__(
+        self,
+        url: str | None = None,
+        pool_size: int | None = None,
+        max_overflow: int | None = None,
+        pool_timeout: float | None = None,
+        echo: bool = False
+    ):
+        load_dotenv()
+        self.url = url or os.getenv("DATABASE_URL", "sqlite:///./dikas_orlando.db")
+        self._engine_options = {"echo": echo, "pool_pre_ping": True}
+        # SQLite em memória usa um pool de conexão única, sem parâmetros de tamanho
+        if ":memory:" not in self.url:
+            self._engine_options.update(
+                pool_size=pool_size or int(os.getenv("DB_POOL_SIZE", 5)),
+                max_overflow=max_overflow if max_overflow is not None else int(os.getenv("DB_MAX_OVERFLOW", 10)),
+                pool_timeout=pool_timeout or float(os.getenv("DB_POOL_TIMEOUT", 30)),
+                pool_recycle=3600,
+            )
+
+        self._async_engine = create_async_engine(to_async_url(self.url), **self._engine_options)
+        self._instrument(self._async_engine.sync_engine, "async")
+        self._async_sessions = async_sessionmaker(self._async_engine, expire_on_commit=False, autoflush=False)
+
+        self._sync_engine = None
+        self._sync_sessions = None
+
+    @property
+    def async_engine(self):
+        return self._async_engine
+
+    @property
+    def sync_engine(self):
+        if self._sync_engine is None:
+            connect_args = {"check_same_thread": False} if self.url.startswith("sqlite") else {}
+            self._sync_engine = create_engine(
+                to_sync_url(self.url), connect_args=connect_args, **self._engine_options
+            )
+            self._instrument(self._sync_engine, "sync")
+            self._sync_sessions = sessionmaker(bind=self._sync_engine, expire_on_commit=False, autoflush=False)
+        return self._sync_engine
+
+    @staticmethod
+    def _instrument(engine, label: str) -> None:
+        pool = engine.pool
+
+        def update_gauges(*_):
+            if hasattr(pool, "checkedout"):
+                metrics.set_gauge("db_pool_in_use", pool.checkedout(), pool=label)
+                metrics.set_gauge("db_pool_overflow", max(pool.overflow(), 0), pool=label)
+
+        event.listen(engine, "checkout", update_gauges)
+        event.listen(engine, "checkin", update_gauges)
+
+    @asynccontextmanager
+    async def session(self):
+        session = self._async_sessions()
+        start = time.perf_counter()
+        try:
+            # Reserva a conexão logo na abertura para medir a espera no pool
+            await session.connection()
+        except PoolTimeoutError:
+            metrics.increment("db_pool_timeouts", pool="async")
+            await session.close()
+            raise
+        metrics.observe("db_pool_wait_seconds", time.perf_counter() - start, pool="async")
+
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+    @contextmanager
+    def get_session(self):
+        self.sync_engine  # cria o engine síncrono no primeiro uso
+        session = self._sync_sessions()
+        start = time.perf_counter()
+        try:
+            session.connection()
+        except PoolTimeoutError:
+            metrics.increment("db_pool_timeouts", pool="sync")
+            session.close()
+            raise
+        metrics.observe("db_pool_wait_seconds", time.perf_counter() - start, pool="sync")
+
+        try:
+            yield session
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def pool_stats(self) -> dict:
+        stats = {}
+        engines = {"async": self._async_engine.sync_engine, "sync": self._sync_engine}
+        for label, engine in engines.items():
+            if engine is None:
+                continue
+            pool = engine.pool
+            stats[label] = {
+                "status": pool.status(),
+                "size": pool.size() if hasattr(pool, "size") else None,
+                "in_use": pool.checkedout() if hasattr(pool, "checkedout") else None,
+                "idle": pool.checkedin() if hasattr(pool, "checkedin") else None,
+                "overflow": max(pool.overflow(), 0) if hasattr(pool, "overflow") else None,
+                "timeouts": metrics.counter("db_pool_timeouts", pool=label),
+                "wait_seconds": metrics.histogram("db_pool_wait_seconds", pool=label),
+            }
+        return stats
+
+    def close(self) -> None:
+        if self._sync_engine is not None:
+            self._sync_engine.dispose()
+
+    async def aclose(self) -> None:
+        await self._async_engine.dispose()
+        self.close()
@@ -0,0 +1,99 @@
+# clients/outbox_chat.py
+import asyncio
+import base64
+from typing import Any, Dict, Optional
+from interfaces.clients.chat_interface import IChat
+from interfaces.repositories.document_store_interface import IDocumentStore
+from interfaces.repositories.outbox_repository_interface import IOutboxRepository
+from services.outbox_dispatcher import OutboxDispatcher
+from utils.message_chunker import split_message
+from utils.turn_context import canonical_phone, valid_cell_number
+
+
+class OutboxChat(IChat):
+    """
+    Implementação de IChat que grava os envios na outbox durável em vez de
+    chamar o provedor diretamente. O OutboxDispatcher faz a entrega.
+    Com o armazenamento de documentos, a outbox guarda só o hash do documento,
+    e não o arquivo em base64; os bytes recebidos em `document` são gravados
+    sem passar por base64.
+    """
+    def __init__(
+        self,
+        outbox_repository: IOutboxRepository,
+        dispatcher: OutboxDispatcher,
+        delegate: IChat,
+        document_store: Optional[IDocumentStore] = None
+    ):
+        self.outbox = outbox_repository
+        self.dispatcher = dispatcher
+        self.delegate = delegate
+        self.document_store = document_store
+
+    @staticmethod
+    def _rejected(error: str) -> Dict[str, Any]:
+        # Erro nos dados do envio: nem entra na outbox, e repetir não adianta
+        return {
+            "status": "failed",
+            "outbox_id": None,
+            "message_id": None,
+            "error": error,
+            "retryable": False,
+            "provider_error": False,
+        }
+
+    async def _enqueue(self, phone: str, kind: str, payload: dict) -> Dict[str, Any]:
+        outbox_id = await asyncio.to_thread(self.outbox.enqueue, canonical_phone(phone), kind, payload)
+        self.dispatcher.notify()
+        return {"status": "queued", "outbox_id": outbox_id, "message_id": None, "error": None}
+
+    async def send_message(self, phone: str, message: str, media_url: Optional[str] = None) -> Dict[str, Any]:
+        # Valida o número como recebido: canonical_phone só normaliza, e um número inválido
+        # ficaria na outbox falhando a cada tentativa e segurando a fila do telefone
+        if not valid_cell_number(phone):
+            return self._rejected("Telefone inválido")
+        chunks = split_message(message) if message else [message]
+        if len(chunks) == 1:
+            payload = {"message": message}
+            if media_url:
+                payload["media_url"] = media_url
+            return await self._enqueue(phone, "text", payload)
+
+        # Cada parte vira uma mensagem da outbox; a ordem FIFO por telefone garante a sequência
+        # e o dispatcher libera a primeira parte sem esperar as demais
+        payloads = [{"message": chunk} for chunk in chunks]
+        if media_url:
+            payloads[0]["media_url"] = media_url
+        outbox_ids = await asyncio.to_thread(self.outbox.enqueue_many, canonical_phone(phone), "text", payloads)
+        self.dispatcher.notify()
+        return {"status": "queued", "outbox_id": outbox_ids[0], "outbox_ids": outbox_ids, "message_id": None, "error": None}
+
+    async def send_document(
+        self,
+        phone: str,
+        filename: str,
+        document_base64: Optional[str] = None,
+        document_url: Optional[str] = None,
+        caption: Optional[str] = None,
+        document: Optional[bytes] = None
+    ) -> Dict[str, Any]:
+        if not valid_cell_number(phone):
+            return self._rejected("Telefone inválido")
+        payload = {"filename": filename, "document_url": document_url, "caption": caption}
+        if document_base64 and self.document_store:
+            document = base64.b64decode(document_base64)
+        if document and self.document_store:
+            payload["document_hash"] = await asyncio.to_thread(self.document_store.put, document)
+        elif document:
+            # Sem armazenamento, o payload da outbox (JSON) precisa do documento como texto
+            payload["document_base64"] = base64.b64encode(document).decode("ascii")
+        else:
+            payload["document_base64"] = document_base64
+        return await self._enqueue(phone, "document", payload)
+
+    async def send_presence(self, phone: str, presence: str = "composing") -> Dict[str, Any]:
+        # Presença não faz sentido depois de enfileirada: vai direto ao provedor
+        return await self.delegate.send_presence(phone, presence)
+
+    async def get_message_status(self, message_id: str) -> Dict[str, Any]:
+        return await self.delegate.get_message_status(message_id)
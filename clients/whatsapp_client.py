@@ -0,0 +1,381 @@
+# clients/whatsapp_client.py
+import asyncio
+import base64
+import datetime
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+import httpx
+
+from clients.zapi_client import zapi_client
+from interfaces.clients.chat_interface import IChat
+from services.message_status_service import message_status_service
+from utils.message_chunker import split_message
+from utils.metrics import metrics
+from utils.turn_context import canonical_phone, current_turn, valid_cell_number
+
+# Status dos callbacks da Z-API -> status normalizados (READ_BY_ME é leitura no próprio aparelho)
+ZAPI_STATUS_MAP = {
+    "SENT": "sent",
+    "RECEIVED": "delivered",
+    "READ": "read",
+    "PLAYED": "read",
+    "FAILED": "failed",
+}
+
+# Status HTTP que valem uma nova tentativa
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class WhatsAppProvider:
+    """
+    Descreve como falar com um provedor de WhatsApp: URL base, headers e o
+    formato das requisições de texto e documento.
+    """
+    name = "provider"
+
+    @property
+    def base_url(self) -> str:
+        raise NotImplementedError
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Content-Type": "application/json"}
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.base_url)
+
+    def text_request(self, phone: str, message: str, media_url: Optional[str] = None) -> tuple[str, dict]:
+        raise NotImplementedError
+
+    def document_request(
+        self,
+        phone: str,
+        filename: str,
+        document_base64: Optional[str],
+        document_url: Optional[str],
+        caption: Optional[str]
+    ) -> tuple[str, dict]:
+        raise NotImplementedError
+
+    def presence_request(self, phone: str, presence: str) -> Optional[tuple[str, dict]]:
+        """Requisição de presença ("composing" = digitando); None se o provedor não suporta."""
+        return None
+
+    def parse_message_id(self, body: Any) -> Optional[str]:
+        if isinstance(body, dict):
+            return body.get("messageId") or body.get("id")
+        return None
+
+    def parse_status_callback(self, body: Any) -> list[dict]:
+        """Converte um callback de status do provedor em eventos normalizados."""
+        return []
+
+
+class ZAPIProvider(WhatsAppProvider):
+    name = "zapi"
+
+    def __init__(self, connection_info: Optional[dict] = None):
+        info = connection_info or zapi_client.get_connection_info()
+        self._base_url = info.get("base_url")
+        self._instance_id = info.get("instance_id")
+        self._instance_token = info.get("instance_token")
+        self._client_token = info.get("client_token")
+
+    @property
+    def base_url(self) -> str:
+        if not self._base_url:
+            return ""
+        return f"{self._base_url}/instances/{self._instance_id}/token/{self._instance_token}"
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Content-Type": "application/json", "Client-Token": self._client_token or ""}
+
+    def text_request(self, phone, message, media_url=None):
+        if media_url:
+            return "/send-image", {"phone": phone, "image": media_url, "caption": message}
+        return "/send-text", {"phone": phone, "message": message}
+
+    def document_request(self, phone, filename, document_base64, document_url, caption):
+        if document_url:
+            return "/send-document/pdf", {
+                "phone": phone,
+                "document": document_url,
+                "fileName": filename,
+                "caption": caption,
+            }
+        return "/send-file-base64", {
+            "phone": phone,
+            "filename": filename,
+            "base64": document_base64,
+            "caption": caption,
+        }
+
+    def parse_message_id(self, body):
+        if isinstance(body, dict):
+            return body.get("messageId") or body.get("zaapId") or body.get("id")
+        return None
+
+    def parse_status_callback(self, body):
+        # MessageStatusCallback: {"type", "status", "ids": [...], "phone", "momment" (ms)}
+        # DeliveryCallback: {"type", "messageId", "phone", "error"?} (resultado do envio)
+        if not isinstance(body, dict):
+            return []
+        moment = body.get("momment")
+        timestamp = datetime.datetime.fromtimestamp(moment / 1000) if isinstance(moment, (int, float)) else None
+        base = {"provider": self.name, "phone": body.get("phone"), "timestamp": timestamp}
+
+        if body.get("type") == "DeliveryCallback":
+            status = "failed" if body.get("error") else "sent"
+            return [{**base, "provider_message_id": body.get("messageId"), "status": status, "error": body.get("error")}]
+
+        status = ZAPI_STATUS_MAP.get(str(body.get("status", "")).upper())
+        if not status:
+            return []
+        ids = body.get("ids") or [body.get("messageId")]
+        return [{**base, "provider_message_id": message_id, "status": status} for message_id in ids if message_id]
+
+
+class EvolutionProvider(WhatsAppProvider):
+    name = "evolution"
+
+    def __init__(self):
+        self._api_url = os.getenv("EVOLUTION_BASE_URL", "https://api.evolution-api.com.br")
+        self._instance_id = os.getenv("EVOLUTION_INSTANCE_ID")
+        self._token = os.getenv("EVOLUTION_TOKEN")
+
+    @property
+    def base_url(self) -> str:
+        if not self._instance_id or not self._token:
+            return ""
+        return f"{self._api_url}/instances/{self._instance_id}/token/{self._token}"
+
+    def text_request(self, phone, message, media_url=None):
+        payload = {"to": phone, "type": "text", "message": message}
+        if media_url:
+            payload.update({"type": "image", "media_url": media_url})
+        return "/send-message", payload
+
+    def document_request(self, phone, filename, document_base64, document_url, caption):
+        return "/send-message", {
+            "to": phone,
+            "type": "document",
+            "filename": filename,
+            "document": document_url or document_base64,
+            "message": caption,
+        }
+
+    def presence_request(self, phone, presence):
+        return "/send-presence", {"to": phone, "presence": presence}
+
+
+class WhatsAppClient(IChat):
+    """
+    Cliente assíncrono de WhatsApp com pool de conexões compartilhado,
+    timeouts, novas tentativas com backoff exponencial e métricas de latência.
+    O provedor (Z-API ou Evolution) define apenas URLs e payloads.
+    """
+    def __init__(
+        self,
+        provider: WhatsAppProvider,
+        timeout: float | None = None,
+        max_retries: int | None = None,
+        backoff: float = 0.5,
+        http_client: httpx.AsyncClient | None = None
+    ):
+        self.provider = provider
+        self.timeout = timeout or float(os.getenv("WHATSAPP_TIMEOUT", 10))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("WHATSAPP_MAX_RETRIES", 3))
+        self.backoff = backoff
+        self._http = http_client or httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 5.0)),
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60)
+        )
+        # Uma fila por telefone: envios ao mesmo número saem um por vez, na ordem de chegada
+        self._lanes: Dict[str, asyncio.Lock] = {}
+        self._lane_users: Dict[str, int] = {}
+
+    @property
+    def name(self) -> str:
+        return self.provider.name
+
+    def _failure(
+        self,
+        error: str,
+        status_code: int | None = None,
+        retryable: bool = False,
+        provider_error: bool = True
+    ) -> Dict[str, Any]:
+        # provider_error=False indica erro nos dados do envio (o provedor não tem culpa)
+        return {
+            "status": "failed",
+            "provider": self.provider.name,
+            "message_id": None,
+            "status_code": status_code,
+            "error": error,
+            "retryable": retryable,
+            "provider_error": provider_error,
+        }
+
+    @asynccontextmanager
+    async def _lane(self, phone: str):
+        self._lane_users[phone] = self._lane_users.get(phone, 0) + 1
+        lock = self._lanes.setdefault(phone, asyncio.Lock())
+        try:
+            async with lock:
+                yield
+        finally:
+            self._lane_users[phone] -= 1
+            if not self._lane_users[phone]:
+                del self._lane_users[phone]
+                del self._lanes[phone]
+
+    async def _post(self, operation: str, path: str, payload: dict, max_retries: int | None = None) -> Dict[str, Any]:
+        if not self.provider.configured:
+            return self._failure(f"Credenciais do provedor '{self.provider.name}' não configuradas")
+
+        url = f"{self.provider.base_url}{path}"
+        last_error = None
+        status_code = None
+
+        max_retries = self.max_retries if max_retries is None else max_retries
+        # No turno com prazo, cada tentativa usa no máximo o tempo que resta; depois do prazo
+        # (resposta de contingência) vale o timeout normal, para a resposta não se perder
+        turn = current_turn.get()
+        for attempt in range(max_retries + 1):
+            start = time.perf_counter()
+            outcome = "ok"
+            remaining = turn.remaining() if turn is not None else None
+            timeout = min(self.timeout, max(remaining, 1.0)) if remaining is not None and remaining > 0 else self.timeout
+            try:
+                response = await self._http.post(
+                    url,
+                    json=payload,
+                    headers=self.provider.headers,
+                    timeout=httpx.Timeout(timeout, connect=min(timeout, 5.0))
+                )
+                status_code = response.status_code
+                if status_code in RETRYABLE_STATUS:
+                    outcome = "retryable_status"
+                    last_error = f"HTTP {status_code}"
+                elif response.is_error:
+                    outcome = "error_status"
+                    return self._failure(
+                        f"HTTP {status_code}: {response.text[:200]}",
+                        status_code,
+                        provider_error=status_code >= 500 or status_code in (401, 403)
+                    )
+                else:
+                    try:
+                        body = response.json()
+                    except ValueError:
+                        body = None
+                    return {
+                        "status": "sent",
+                        "provider": self.provider.name,
+                        "message_id": self.provider.parse_message_id(body),
+                        "status_code": status_code,
+                        "error": None,
+                    }
+            except httpx.TransportError as e:
+                outcome = "transport_error"
+                last_error = f"{type(e).__name__}: {e}"
+            finally:
+                metrics.observe(
+                    "whatsapp_request_seconds",
+                    time.perf_counter() - start,
+                    provider=self.provider.name,
+                    operation=operation
+                )
+                metrics.increment("whatsapp_requests", provider=self.provider.name, operation=operation, outcome=outcome)
+
+            if attempt < max_retries:
+                delay = self.backoff * (2 ** attempt) * (1 + random.random() * 0.25)
+                remaining = turn.remaining() if turn is not None else None
+                if remaining is not None and 0 < remaining < delay:
+                    # A próxima tentativa já sairia depois do prazo do turno
+                    metrics.increment("turn_deadline_misses", stage="whatsapp_send")
+                    break
+                print(f"[{self.provider.name.upper()}] Tentativa {attempt + 1} falhou ({last_error}); nova tentativa em {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+        print(f"[{self.provider.name.upper()}] ❌ Falha ao enviar após {max_retries + 1} tentativas: {last_error}")
+        return self._failure(last_error or "Falha desconhecida", status_code, retryable=True)
+
+    async def send_message(self, phone: str, message: str, media_url: Optional[str] = None) -> Dict[str, Any]:
+        if not message or not message.strip():
+            print("❌ Dados incompletos: A mensagem é obrigatória.")
+            return self._failure("Mensagem vazia", provider_error=False)
+        if not valid_cell_number(phone):
+            return self._failure("Telefone inválido", provider_error=False)
+
+        phone = canonical_phone(phone)
+        chunks = split_message(message)
+        metrics.observe("whatsapp_message_chunks", len(chunks), provider=self.provider.name)
+
+        # As partes saem em sequência pela fila do telefone: a primeira é enviada
+        # imediatamente e cada uma só segue após a confirmação da anterior
+        async with self._lane(phone):
+            message_ids = []
+            for index, chunk in enumerate(chunks):
+                path, payload = self.provider.text_request(phone, chunk, media_url if index == 0 else None)
+                result = await self._post("send_message", path, payload)
+                if result["status"] != "sent":
+                    result["chunks_sent"] = index
+                    return result
+                message_ids.append(result["message_id"])
+                if result["message_id"]:
+                    message_status_service.record_sent(result["message_id"], self.provider.name, phone)
+
+        result["message_id"] = message_ids[0]
+        result["message_ids"] = message_ids
+        result["chunks_sent"] = len(chunks)
+        return result
+
+    async def send_document(
+        self,
+        phone: str,
+        filename: str,
+        document_base64: Optional[str] = None,
+        document_url: Optional[str] = None,
+        caption: Optional[str] = None,
+        document: Optional[bytes] = None
+    ) -> Dict[str, Any]:
+        if document and not document_base64:
+            document_base64 = base64.b64encode(document).decode("ascii")
+        if not document_base64 and not document_url:
+            return self._failure("Documento vazio", provider_error=False)
+        if not valid_cell_number(phone):
+            return self._failure("Telefone inválido", provider_error=False)
+
+        phone = canonical_phone(phone)
+        path, payload = self.provider.document_request(phone, filename, document_base64, document_url, caption)
+        async with self._lane(phone):
+            result = await self._post("send_document", path, payload)
+        if result["status"] == "sent" and result["message_id"]:
+            message_status_service.record_sent(result["message_id"], self.provider.name, phone)
+        return result
+
+    async def send_presence(self, phone: str, presence: str = "composing") -> Dict[str, Any]:
+        request = self.provider.presence_request(canonical_phone(phone), presence)
+        if request is None:
+            return {"status": "unsupported", "provider": self.provider.name}
+        # Presença é efêmera: uma única tentativa, sem backoff
+        return await self._post("send_presence", *request, max_retries=0)
+
+    async def get_message_status(self, message_id: str) -> Dict[str, Any]:
+        # Os provedores não oferecem consulta de status; os eventos chegam por webhook
+        # e ficam no índice do MessageStatusService
+        record = await message_status_service.lookup(message_id)
+        if not record:
+            return {"message_id": message_id, "provider": self.provider.name, "status": "unknown"}
+        return {"message_id": message_id, **record}
+
+    async def close(self) -> None:
+        await self._http.aclose()
+
@@ -0,0 +1,139 @@
+# clients/whatsapp_router.py
+import time
+from typing import Any, Dict, List, Optional
+
+from clients.whatsapp_client import WhatsAppClient
+from interfaces.clients.chat_interface import IChat
+from utils.circuit_breaker import CircuitBreaker, OPEN
+from utils.message_chunker import split_message
+from utils.metrics import metrics
+
+
+class WhatsAppRouter(IChat):
+    """
+    Roteia os envios entre vários provedores de WhatsApp (ex: Z-API e Evolution).
+
+    Cada provedor tem um circuit breaker alimentado pela taxa de sucesso e pela
+    latência das últimas chamadas. Os envios vão para o primeiro provedor com o
+    circuito fechado; se ele falhar, o próximo é tentado na mesma chamada.
+    """
+
+    def __init__(self, providers: List[WhatsAppClient], **breaker_options):
+        if not providers:
+            raise ValueError("O roteador precisa de pelo menos um provedor de WhatsApp")
+        self.providers = providers
+        self.breakers = {
+            client.name: CircuitBreaker(f"whatsapp_{client.name}", **breaker_options)
+            for client in providers
+        }
+
+    @property
+    def name(self) -> str:
+        return "router"
+
+    async def _route(self, operation: str, send) -> Dict[str, Any]:
+        result = None
+        # Ordem de preferência; o circuito decide quem está apto. Um provedor preferido que
+        # se recupera volta a receber tráfego pela chamada de teste do estado half_open
+        for client in self.providers:
+            breaker = self.breakers[client.name]
+            if not breaker.allow():
+                continue
+
+            start = time.perf_counter()
+            try:
+                result = await send(client)
+            except BaseException:
+                breaker.release()
+                raise
+            elapsed = time.perf_counter() - start
+            metrics.observe("whatsapp_router_seconds", elapsed, provider=client.name, operation=operation)
+
+            if result["status"] == "sent":
+                breaker.record_success(elapsed)
+                metrics.increment("whatsapp_router_sends", provider=client.name, outcome="sent")
+                return result
+            if not result.get("provider_error", True):
+                # Erro nos dados do envio: outro provedor falharia igual
+                breaker.release()
+                return result
+
+            breaker.record_failure(elapsed)
+            metrics.increment("whatsapp_router_sends", provider=client.name, outcome="failover")
+            print(f"[WHATSAPP ROUTER] ⚠️ Falha no provedor '{client.name}' ({result.get('error')}); tentando o próximo")
+
+        if result is None:
+            metrics.increment("whatsapp_router_sends", provider="none", outcome="all_open")
+            return {
+                "status": "failed",
+                "provider": None,
+                "message_id": None,
+                "status_code": None,
+                "error": "Todos os provedores de WhatsApp estão com o circuito aberto",
+                "retryable": True,
+                "provider_error": True,
+            }
+        return result
+
+    async def send_message(self, phone: str, message: str, media_url: Optional[str] = None) -> Dict[str, Any]:
+        remaining = {"message": message, "media_url": media_url, "sent": 0}
+
+        async def send(client: WhatsAppClient) -> Dict[str, Any]:
+            result = await client.send_message(phone, remaining["message"], remaining["media_url"])
+            sent = result.get("chunks_sent", 0)
+            if result["status"] != "sent" and sent:
+                # Parte da resposta já saiu por este provedor: o próximo envia só o restante
+                remaining["message"] = "\n\n".join(split_message(remaining["message"])[sent:])
+                remaining["media_url"] = None
+                remaining["sent"] += sent
+            return result
+
+        result = await self._route("send_message", send)
+        if remaining["sent"]:
+            result["chunks_sent"] = result.get("chunks_sent", 0) + remaining["sent"]
+        return result
+
+    async def send_document(
+        self,
+        phone: str,
+        filename: str,
+        document_base64: Optional[str] = None,
+        document_url: Optional[str] = None,
+        caption: Optional[str] = None,
+        document: Optional[bytes] = None
+    ) -> Dict[str, Any]:
+        return await self._route(
+            "send_document",
+            lambda client: client.send_document(phone, filename, document_base64, document_url, caption, document)
+        )
+
+    async def send_presence(self, phone: str, presence: str = "composing") -> Dict[str, Any]:
+        # Melhor esforço: não alimenta os circuitos, só evita provedores com o circuito aberto
+        result = {"status": "unsupported"}
+        for client in self.providers:
+            if self.breakers[client.name].state == OPEN:
+                continue
+            result = await client.send_presence(phone, presence)
+            if result["status"] == "sent":
+                return result
+        return result
+
+    async def get_message_status(self, message_id: str) -> Dict[str, Any]:
+        # O índice de status é compartilhado por todos os provedores
+        return await self.providers[0].get_message_status(message_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado dos circuitos e histogramas de latência de cada provedor."""
+        return {
+            client.name: {
+                **self.breakers[client.name].snapshot(),
+                "latency_seconds": {
+                    operation: metrics.histogram("whatsapp_router_seconds", provider=client.name, operation=operation)
+                    for operation in ("send_message", "send_document")
+                },
+            }
+            for client in self.providers
+        }
+
+    def healthy(self) -> bool:
+        return any(breaker.state != OPEN for breaker in self.breakers.values())
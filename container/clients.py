@@ -1,20 +1,63 @@
 # container/clients.py
 
-from openai import OpenAI, AsyncOpenAI 
+from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
+from clients.whatsapp_client import WhatsAppClient, ZAPIProvider, EvolutionProvider
+from clients.whatsapp_router import WhatsAppRouter
+import httpx
 import os
 
 class ClientContainer:
     def __init__(self):
-        load_dotenv() 
+        load_dotenv()
 
+        # Pool de conexões HTTP compartilhado por todos os provedores de WhatsApp
+        self._http = httpx.AsyncClient(
+            timeout=httpx.Timeout(float(os.getenv("WHATSAPP_TIMEOUT", 10)), connect=5.0),
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60)
+        )
+        whatsapp_clients = {
+            "zapi": WhatsAppClient(ZAPIProvider(), http_client=self._http),
+            "evolution": WhatsAppClient(EvolutionProvider(), http_client=self._http),
+        }
+        provider_name = os.getenv("WHATSAPP_PROVIDER", "zapi").lower()
+        if provider_name not in whatsapp_clients:
+            raise ValueError(f"Provedor de WhatsApp desconhecido: {provider_name}")
+
+        # O provedor escolhido é o preferido; os demais configurados entram como reserva
+        providers = [whatsapp_clients[provider_name]] + [
+            client for name, client in whatsapp_clients.items()
+            if name != provider_name and client.provider.configured
+        ]
         self.clients = {
-            "openai": OpenAI(), 
-            "async_openai": AsyncOpenAI() 
+            "openai": OpenAI(),
+            "async_openai": AsyncOpenAI(),
+            **whatsapp_clients,
+            "whatsapp": WhatsAppRouter(
+                providers,
+                recovery_timeout=float(os.getenv("WHATSAPP_BREAKER_RECOVERY_SECONDS", 30))
+            )
         }
 
     def get(self, client_name: str):
         client = self.clients.get(client_name)
         if not client:
             raise ValueError(f"Cliente '{client_name}' não registrado.")
-        return client
\ No newline at end of file
+        return client
+
+    def use_outbox(self, outbox_repository, document_store=None) -> "OutboxDispatcher":
+        """
+        Passa a enfileirar os envios de WhatsApp na outbox durável (documentos pelo hash
+        no `document_store`, quando informado).
+        Deve ser chamado antes de criar os agentes; retorna o dispatcher a ser iniciado.
+        """
+        from clients.outbox_chat import OutboxChat
+        from services.outbox_dispatcher import OutboxDispatcher
+
+        delegate = self.clients["whatsapp"]
+        dispatcher = OutboxDispatcher(outbox_repository, delegate, document_store)
+        self.clients["whatsapp"] = OutboxChat(outbox_repository, dispatcher, delegate, document_store)
+        return dispatcher
+
+    async def close(self) -> None:
+        await self._http.aclose()
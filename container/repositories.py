@@ -1,8 +1,16 @@
 # container/repositories.py
 
 from repositories.message_repository import MessageRepository
+from repositories.cached_message_repository import CachedMessageRepository
 from repositories.conversation_repository import InMemoryConversationRepository, FileSystemConversationRepository
-from repositories.user_repository import UserRepository
+from repositories.user_repository import UserRepository, DatabaseUserRepository
+from repositories.cached_user_repository import CachedUserRepository
+from repositories.document_store import FileSystemDocumentStore
+from repositories.outbox_repository import OutboxRepository
+from repositories.message_status_repository import MessageStatusRepository
+from repositories.conversation_context_repository import ConversationContextRepository
+from utils.history_cache import HistoryCache
+import os
 
 class RepositoryContainer:
     def __init__(self):
@@ -11,21 +19,62 @@ class RepositoryContainer:
         # Inicializa o repositório de mensagens
         self._repositories["message"] = None  # Será inicializado quando um cliente DB for fornecido
         
-        # Inicializa o repositório de conversas (em memória por padrão)
-        self._repositories["conversation"] = InMemoryConversationRepository()
+        # Inicializa o repositório de conversas (em memória por padrão), limitado em bytes:
+        # as sessões menos usadas vão para logs em disco e voltam no próximo acesso
+        self._repositories["conversation"] = InMemoryConversationRepository(
+            max_bytes=int(os.getenv("CONVERSATION_MEMORY_MAX_BYTES", 128 * 1024 * 1024)),
+            spill=FileSystemConversationRepository(os.getenv("CONVERSATION_SPILL_DIR", "./data/conversations/spill"))
+        )
         
         # Inicializa o repositório de usuários
         self._repositories["user"] = UserRepository()
         print("INFO: Repositório de usuários em memória inicializado.")
         
+        # Inicializa o armazenamento de documentos endereçado por conteúdo (SHA-256)
+        self._repositories["document"] = FileSystemDocumentStore(
+            storage_dir=os.getenv("DOCUMENT_STORE_DIR", "./data/documents"),
+            compress=os.getenv("DOCUMENT_STORE_COMPRESS", "false").lower() == "true"
+        )
+        
     def initialize_db_repositories(self, db_client):
         """
         Inicializa repositórios que dependem do cliente de banco de dados.
+        O cliente (DatabaseClient) oferece sessões assíncronas para os repositórios usados
+        no event loop e síncronas para os que rodam em threads (outbox, status).
         """
-        # Inicializa o repositório de mensagens com o cliente de banco de dados
-        self._repositories["message"] = MessageRepository(db_client)
+        # Inicializa o repositório de mensagens com o cliente de banco de dados, com as
+        # últimas mensagens de cada cliente em cache (limitado pela memória total, LRU)
+        self._repositories["message"] = CachedMessageRepository(
+            MessageRepository(db_client),
+            HistoryCache(
+                "messages",
+                window=int(os.getenv("CONTEXT_SIZE", 80)),
+                max_bytes=int(os.getenv("HISTORY_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+            )
+        )
         print("INFO: Repositório de mensagens inicializado com o cliente de banco de dados.")
         
+        # Inicializa o repositório de usuários na tabela `users`, com cache TTL por telefone
+        # (inclusive de telefones sem usuário) na frente do banco
+        self._repositories["user"] = CachedUserRepository(
+            DatabaseUserRepository(db_client),
+            ttl=float(os.getenv("USER_CACHE_TTL_SECONDS", 300)),
+            negative_ttl=float(os.getenv("USER_CACHE_NEGATIVE_TTL_SECONDS", 30))
+        )
+        print("INFO: Repositório de usuários inicializado com o cliente de banco de dados.")
+        
+        # Inicializa o repositório de contextos de conversa (mensagens e documentos por sessão)
+        self._repositories["context"] = ConversationContextRepository(db_client, self._repositories["document"])
+        print("INFO: Repositório de contextos inicializado com o cliente de banco de dados.")
+        
+        # Inicializa a outbox durável de mensagens de saída
+        self._repositories["outbox"] = OutboxRepository(db_client)
+        print("INFO: Outbox de mensagens inicializada com o cliente de banco de dados.")
+        
+        # Inicializa o armazenamento dos status de entrega (callbacks do provedor)
+        self._repositories["message_status"] = MessageStatusRepository(db_client)
+        print("INFO: Repositório de status de mensagens inicializado com o cliente de banco de dados.")
+        
         # Opcionalmente, você pode substituir o repositório de conversas em memória por um baseado em banco de dados
         # from repositories.conversation_repository import DatabaseConversationRepository
         # self._repositories["conversation"] = DatabaseConversationRepository(db_client)
@@ -1,5 +1,6 @@
 import os
 import sys
+from contextlib import contextmanager
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.pool import QueuePool
@@ -29,24 +30,22 @@ Base = declarative_base()
 
 def create_tables():
     """
-    Cria todas as tabelas no banco de dados.
-    Importe todos os modelos aqui para garantir que serão registrados no metadata.
+    Cria as tabelas e aplica as migrações pendentes do esquema (database/migrations).
     """
-    from database.models.user_model import User
-    from database.models.message_model import Message
-    from database.models.conversation_context import ConversationContext
-    from database.models.context_message import ContextMessage
-    from database.models.context_document import ContextDocument
-    # Importe outros modelos se existirem
-    Base.metadata.create_all(bind=engine)
+    from database.migrations import run_migrations
+    run_migrations(engine)
 
+@contextmanager
 def get_db_session():
     """
-    Obtém uma sessão de banco de dados.
-    Deve ser usado em um contexto 'with'.
+    Obtém uma sessão de banco de dados síncrona, fechada ao sair do bloco 'with'.
+    No código assíncrono, use DatabaseClient.session() (clients/database_client.py).
     """
     db = SessionLocal()
     try:
-        return db
+        yield db
+    except Exception:
+        db.rollback()
+        raise
     finally:
         db.close()
\ No newline at end of file
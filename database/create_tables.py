@@ -2,7 +2,8 @@ from sqlalchemy import create_engine, inspect
 import urllib.parse
 from dotenv import load_dotenv
 from database.config import Base
-from models import User, Message, ConversationContext, ContextMessage, ContextDocument
+from database.migrations import current_version, run_migrations
+from models import User, Message, ConversationContext, ContextMessage, ContextDocument, OutboundMessage, MessageStatus
 import sys
 import os
 
@@ -23,7 +24,7 @@ DATABASE_URL = f"postgresql://{DB_USERNAME}:{password}@{DB_HOST}:{DB_PORT}/{DB_D
 engine = create_engine(DATABASE_URL)
 
 def create_tables():
-    print("Criando tabelas para contexto de conversas...")
+    print("Criando tabelas e aplicando migrações...")
     try:
         # Verificar quais tabelas já existem
         inspector = inspect(engine)
@@ -31,27 +32,10 @@ def create_tables():
         
         print(f"Tabelas existentes: {', '.join(existing_tables)}")
         
-        # Criar apenas as tabelas que não existem
-        # Para evitar erros com tabelas users e messages que já existem
-        if 'users' not in existing_tables:
-            Base.metadata.tables['users'].create(bind=engine)
-            print("✓ Tabela 'users' criada")
-            
-        if 'messages' not in existing_tables:
-            Base.metadata.tables['messages'].create(bind=engine)
-            print("✓ Tabela 'messages' criada")
-            
-        if 'conversation_contexts' not in existing_tables:
-            Base.metadata.tables['conversation_contexts'].create(bind=engine)
-            print("✓ Tabela 'conversation_contexts' criada")
-            
-        if 'context_messages' not in existing_tables:
-            Base.metadata.tables['context_messages'].create(bind=engine)
-            print("✓ Tabela 'context_messages' criada")
-            
-        if 'context_documents' not in existing_tables:
-            Base.metadata.tables['context_documents'].create(bind=engine)
-            print("✓ Tabela 'context_documents' criada")
+        # Cria apenas as tabelas que não existem e aplica as migrações pendentes
+        # (colunas e índices das tabelas já existentes)
+        applied = run_migrations(engine)
+        print(f"✓ {len(applied)} migração(ões) aplicada(s), esquema na versão {current_version(engine)}")
         
         # Verificar tabelas após a criação
         inspector = inspect(engine)
@@ -0,0 +1,85 @@
+# database/migrations/__init__.py
+"""
+Migrações versionadas do esquema.
+
+Cada migração é um módulo com VERSION, NAME e upgrade(connection). As versões
+aplicadas ficam na tabela `schema_migrations`; cada migração roda na sua própria
+transação e é registrada junto, então uma falha não deixa a versão pela metade.
+
+Uso:
+    python -m database.migrations            # aplica as pendentes
+    python -m database.migrations --check    # confere o uso dos índices (EXPLAIN)
+"""
+import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+
+from database.migrations import (
+    v0001_baseline,
+    v0002_lowercase_context_columns,
+    v0003_context_message_count,
+    v0004_hot_query_indexes,
+    v0005_session_windowing,
+    v0006_conversation_messages,
+    v0007_context_document_hashes,
+    v0008_context_rolling_summary,
+)
+
+MIGRATIONS = [
+    v0001_baseline,
+    v0002_lowercase_context_columns,
+    v0003_context_message_count,
+    v0004_hot_query_indexes,
+    v0005_session_windowing,
+    v0006_conversation_messages,
+    v0007_context_document_hashes,
+    v0008_context_rolling_summary,
+]
+
+# Chave do advisory lock do Postgres: impede duas instâncias migrando ao mesmo tempo
+MIGRATION_LOCK_KEY = 7_310_402
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+
+def applied_versions(connection) -> set[int]:
+    if not inspect(connection).has_table(schema_migrations.name):
+        return set()
+    return set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+
+def current_version(engine) -> int:
+    with engine.connect() as connection:
+        return max(applied_versions(connection), default=0)
+
+
+def run_migrations(engine, target: int | None = None) -> list[int]:
+    """Aplica, em ordem, as migrações pendentes até `target` (padrão: a mais recente)."""
+    with engine.begin() as connection:
+        schema_migrations.create(connection, checkfirst=True)
+
+    applied = []
+    for migration in MIGRATIONS:
+        if target is not None and migration.VERSION > target:
+            break
+        with engine.begin() as connection:
+            if connection.dialect.name == "postgresql":
+                connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            # Confere de novo dentro da transação: outra instância pode ter acabado de aplicar
+            if migration.VERSION in applied_versions(connection):
+                continue
+            migration.upgrade(connection)
+            connection.execute(schema_migrations.insert().values(
+                version=migration.VERSION,
+                name=migration.NAME,
+                applied_at=datetime.datetime.now(datetime.timezone.utc)
+            ))
+        applied.append(migration.VERSION)
+        print(f"✓ Migração {migration.VERSION:04d} aplicada: {migration.NAME}")
+    return applied
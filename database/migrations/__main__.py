@@ -0,0 +1,41 @@
+# database/migrations/__main__.py
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from database.config import engine
+from database.migrations import current_version, run_migrations
+from database.migrations.explain import check_index_usage
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Migrações do esquema do banco")
+    parser.add_argument("--target", type=int, default=None, help="Versão final (padrão: a mais recente)")
+    parser.add_argument("--check", action="store_true", help="Confere o uso dos índices com EXPLAIN")
+    args = parser.parse_args()
+
+    try:
+        applied = run_migrations(engine, target=args.target)
+    except Exception as e:
+        print(f"❌ Erro ao aplicar migrações: {str(e)}")
+        return 1
+    if not applied:
+        print("Nenhuma migração pendente.")
+    print(f"Versão do esquema: {current_version(engine)}")
+
+    if not args.check:
+        return 0
+
+    failures = 0
+    for name, result in check_index_usage(engine).items():
+        mark = "✓" if result["used"] else "❌"
+        print(f"{mark} {name}: {result['index']}")
+        print("   " + result["plan"].replace("\n", "\n   "))
+        failures += not result["used"]
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
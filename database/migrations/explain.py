@@ -0,0 +1,64 @@
+# database/migrations/explain.py
+"""
+Confere, via EXPLAIN, se as consultas mais frequentes usam os índices criados
+pelas migrações. No Postgres o seq scan é desligado durante a checagem: em tabelas
+pequenas o planner preferiria varrer a tabela mesmo com o índice disponível.
+"""
+from sqlalchemy import text
+
+HOT_QUERIES = {
+    "latest_context_by_session": {
+        "sql": "SELECT id FROM conversation_contexts WHERE session_id = :session_id ORDER BY created_at DESC LIMIT 1",
+        "params": {"session_id": "session_explain"},
+        "index": "ix_conversation_contexts_session_created",
+    },
+    "messages_by_context": {
+        "sql": "SELECT id, role, content, sequence FROM context_messages WHERE context_id = :context_id ORDER BY sequence",
+        "params": {"context_id": 1},
+        "index": "ix_context_messages_context_sequence",
+    },
+    "latest_user_messages": {
+        "sql": (
+            "SELECT messages.id, messages.role, messages.content FROM messages "
+            "JOIN users ON users.id = messages.user_id "
+            "WHERE users.phone = :phone ORDER BY messages.id DESC LIMIT 20"
+        ),
+        "params": {"phone": "5511999999999"},
+        "index": "ix_messages_user_id_id",
+    },
+    "conversation_history_page": {
+        "sql": (
+            "SELECT sequence, role, content FROM conversation_messages "
+            "WHERE session_id = :session_id AND sequence < :before ORDER BY sequence DESC LIMIT 50"
+        ),
+        "params": {"session_id": "session_explain", "before": 1000},
+        "index": "ix_conversation_messages_session_sequence",
+    },
+}
+
+
+def explain(connection, sql: str, params: dict) -> str:
+    """Plano de execução da consulta em texto."""
+    if connection.dialect.name == "sqlite":
+        rows = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params)
+        return "\n".join(row[-1] for row in rows)
+    rows = connection.execute(text(f"EXPLAIN {sql}"), params)
+    return "\n".join(row[0] for row in rows)
+
+
+def check_index_usage(engine) -> dict:
+    """Retorna, para cada consulta, o índice esperado, se ele foi usado e o plano."""
+    results = {}
+    with engine.connect() as connection:
+        with connection.begin() as transaction:
+            if connection.dialect.name == "postgresql":
+                connection.execute(text("SET LOCAL enable_seqscan = off"))
+            for name, query in HOT_QUERIES.items():
+                plan = explain(connection, query["sql"], query["params"])
+                results[name] = {
+                    "index": query["index"],
+                    "used": query["index"] in plan,
+                    "plan": plan,
+                }
+            transaction.rollback()
+    return results
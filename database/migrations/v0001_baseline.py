@@ -0,0 +1,110 @@
+# database/migrations/v0001_baseline.py
+"""
+Cria as tabelas que ainda não existem, no esquema da época em que as migrações
+versionadas foram introduzidas.
+
+As tabelas ficam congeladas aqui (num MetaData próprio), sem importar os modelos:
+mudanças posteriores nos modelos entram em migrações novas, e um banco criado do
+zero passa pelas mesmas etapas que um banco antigo.
+"""
+from sqlalchemy import (
+    Boolean, Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, Text, func
+)
+
+VERSION = 1
+NAME = "baseline"
+
+metadata = MetaData()
+
+Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, nullable=False),
+    Column("phone", String, unique=True, index=True, nullable=False),
+    Column("email", String),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True)),
+    Column("welcome_message_sent", Boolean),
+)
+
+Table(
+    "messages", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("role", String, nullable=False),
+    Column("content", Text, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "conversation_contexts", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("session_id", String, nullable=False),
+    Column("agent_id", String, nullable=False),
+    Column("created_at", DateTime(timezone=True)),
+    Column("message_count", Integer, nullable=False, server_default="0"),
+)
+
+Table(
+    "context_messages", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("context_id", Integer, ForeignKey("conversation_contexts.id"), nullable=False),
+    Column("role", String, nullable=False),
+    Column("content", Text, nullable=False),
+    Column("function_call_id", String, nullable=True),
+    Column("sequence", Integer, nullable=False),
+    Column("created_at", DateTime(timezone=True)),
+)
+
+Table(
+    "context_documents", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("context_id", Integer, ForeignKey("conversation_contexts.id"), nullable=False),
+    Column("document_metadata", Text, nullable=True),
+    Column("content_hash", String(64), nullable=True, index=True),
+    Column("filename", String, nullable=True),
+    Column("content_type", String, nullable=True),
+    Column("size", Integer, nullable=True),
+    Column("content", Text, nullable=True),
+    Column("created_at", DateTime(timezone=True)),
+)
+
+Table(
+    "outbound_messages", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("phone", String, nullable=False),
+    Column("kind", String, nullable=False),
+    Column("payload", Text, nullable=False),
+    Column("status", String, nullable=False),
+    Column("attempts", Integer, nullable=False),
+    Column("next_attempt_at", DateTime(timezone=True)),
+    Column("locked_until", DateTime(timezone=True), nullable=True),
+    Column("provider", String, nullable=True),
+    Column("provider_message_id", String, nullable=True),
+    Column("last_error", Text, nullable=True),
+    Column("created_at", DateTime(timezone=True)),
+    Column("sent_at", DateTime(timezone=True), nullable=True),
+    Index("ix_outbound_messages_status_phone_id", "status", "phone", "id"),
+    Index("ix_outbound_messages_provider_message_id", "provider_message_id"),
+)
+
+Table(
+    "message_statuses", metadata,
+    Column("provider_message_id", String(128), primary_key=True),
+    Column("provider", String, nullable=True),
+    Column("phone", String, nullable=True),
+    Column("status", String, nullable=False),
+    Column("error", Text, nullable=True),
+    Column("queued_at", DateTime(timezone=True), nullable=True),
+    Column("sent_at", DateTime(timezone=True), nullable=True),
+    Column("delivered_at", DateTime(timezone=True), nullable=True),
+    Column("read_at", DateTime(timezone=True), nullable=True),
+    Column("failed_at", DateTime(timezone=True), nullable=True),
+    Column("updated_at", DateTime(timezone=True)),
+    Index("ix_message_statuses_phone_updated_at", "phone", "updated_at"),
+)
+
+
+def upgrade(connection) -> None:
+    metadata.create_all(bind=connection, checkfirst=True)
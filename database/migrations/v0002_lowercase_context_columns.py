@@ -0,0 +1,21 @@
+# database/migrations/v0002_lowercase_context_columns.py
+"""
+Renomeia as colunas em maiúsculas de conversation_contexts ("ID", "USER_ID", ...)
+para os nomes em minúsculas usados pelo modelo e pelos repositórios.
+"""
+from sqlalchemy import inspect, text
+
+VERSION = 2
+NAME = "lowercase conversation_contexts columns"
+
+TABLE = "conversation_contexts"
+
+
+def upgrade(connection) -> None:
+    columns = {column["name"] for column in inspect(connection).get_columns(TABLE)}
+    quote = connection.dialect.identifier_preparer.quote
+    for column in sorted(columns):
+        lowered = column.lower()
+        if column == lowered or lowered in columns:
+            continue
+        connection.execute(text(f"ALTER TABLE {TABLE} RENAME COLUMN {quote(column)} TO {quote(lowered)}"))
@@ -0,0 +1,22 @@
+# database/migrations/v0003_context_message_count.py
+"""
+Adiciona o contador de mensagens de conversation_contexts e o preenche com a
+próxima sequência livre de cada contexto.
+"""
+from sqlalchemy import inspect, text
+
+VERSION = 3
+NAME = "conversation_contexts.message_count"
+
+
+def upgrade(connection) -> None:
+    columns = {column["name"] for column in inspect(connection).get_columns("conversation_contexts")}
+    if "message_count" not in columns:
+        connection.execute(text(
+            "ALTER TABLE conversation_contexts ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0"
+        ))
+    connection.execute(text(
+        "UPDATE conversation_contexts SET message_count = COALESCE("
+        "(SELECT MAX(sequence) + 1 FROM context_messages WHERE context_messages.context_id = conversation_contexts.id), 0"
+        ")"
+    ))
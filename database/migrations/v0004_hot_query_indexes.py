@@ -0,0 +1,25 @@
+# database/migrations/v0004_hot_query_indexes.py
+"""
+Índices compostos das consultas mais frequentes:
+
+- context_messages(context_id, sequence): histórico de um contexto em ordem
+- conversation_contexts(session_id, created_at): contexto mais recente da sessão
+- messages(user_id, id): últimas mensagens de um usuário
+
+As definições ficam congeladas aqui, sem depender dos modelos atuais.
+"""
+from sqlalchemy import text
+
+VERSION = 4
+NAME = "hot query indexes"
+
+INDEXES = {
+    "ix_context_messages_context_sequence": ("context_messages", ("context_id", "sequence")),
+    "ix_conversation_contexts_session_created": ("conversation_contexts", ("session_id", "created_at")),
+    "ix_messages_user_id_id": ("messages", ("user_id", "id")),
+}
+
+
+def upgrade(connection) -> None:
+    for index_name, (table, columns) in INDEXES.items():
+        connection.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({', '.join(columns)})"))
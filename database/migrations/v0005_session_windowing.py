@@ -0,0 +1,24 @@
+# database/migrations/v0005_session_windowing.py
+"""
+Janelas de sessão: conversation_contexts ganha a data da última mensagem (preenchida
+com a da última mensagem gravada) e o resumo da janela anterior.
+"""
+from sqlalchemy import inspect, text
+
+VERSION = 5
+NAME = "conversation_contexts.last_message_at and summary"
+
+
+def upgrade(connection) -> None:
+    columns = {column["name"] for column in inspect(connection).get_columns("conversation_contexts")}
+    timestamp = "TIMESTAMP WITH TIME ZONE" if connection.dialect.name == "postgresql" else "DATETIME"
+    if "last_message_at" not in columns:
+        connection.execute(text(f"ALTER TABLE conversation_contexts ADD COLUMN last_message_at {timestamp}"))
+    if "summary" not in columns:
+        connection.execute(text("ALTER TABLE conversation_contexts ADD COLUMN summary TEXT"))
+    connection.execute(text(
+        "UPDATE conversation_contexts SET last_message_at = COALESCE("
+        "(SELECT MAX(created_at) FROM context_messages WHERE context_messages.context_id = conversation_contexts.id), "
+        "created_at"
+        ") WHERE last_message_at IS NULL"
+    ))
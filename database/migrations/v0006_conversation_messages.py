@@ -0,0 +1,29 @@
+# database/migrations/v0006_conversation_messages.py
+"""
+Tabela conversation_messages (DatabaseConversationRepository) com índice único
+(session_id, sequence): appends e leituras paginadas por faixa de sequência.
+Bancos que já tinham a tabela criada à mão ganham só o índice.
+
+A tabela fica congelada aqui, sem depender do modelo atual.
+"""
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, Text
+
+VERSION = 6
+NAME = "conversation_messages with (session_id, sequence) index"
+
+table = Table(
+    "conversation_messages", MetaData(),
+    Column("id", Integer, primary_key=True, index=True),
+    Column("session_id", String, nullable=False),
+    Column("sequence", Integer, nullable=False),
+    Column("role", String, nullable=False),
+    Column("content", Text, nullable=False),
+    Column("created_at", DateTime(timezone=True)),
+    Index("ix_conversation_messages_session_sequence", "session_id", "sequence", unique=True),
+)
+
+
+def upgrade(connection) -> None:
+    table.create(connection, checkfirst=True)
+    for index in table.indexes:
+        index.create(connection, checkfirst=True)
@@ -0,0 +1,63 @@
+# database/migrations/v0007_context_document_hashes.py
+"""
+context_documents passa a guardar só a referência ao armazenamento de documentos:
+ganha content_hash (com índice), filename, content_type e size, e o conteúdo inline
+legado (content) deixa de ser obrigatório.
+
+O SQLite não altera a nulidade de uma coluna: lá a tabela é recriada com os dados.
+"""
+from sqlalchemy import inspect, text
+
+VERSION = 7
+NAME = "context_documents content_hash, filename, content_type and size"
+
+TABLE = "context_documents"
+
+NEW_COLUMNS = {
+    "content_hash": "VARCHAR(64)",
+    "filename": "VARCHAR",
+    "content_type": "VARCHAR",
+    "size": "INTEGER",
+}
+
+
+def _rebuild_sqlite(connection, columns: list[str]) -> None:
+    connection.execute(text(
+        "CREATE TABLE context_documents_v7 ("
+        "id INTEGER NOT NULL PRIMARY KEY, "
+        "context_id INTEGER NOT NULL REFERENCES conversation_contexts (id), "
+        "document_metadata TEXT, "
+        "content_hash VARCHAR(64), "
+        "filename VARCHAR, "
+        "content_type VARCHAR, "
+        "size INTEGER, "
+        "content TEXT, "
+        "created_at DATETIME)"
+    ))
+    copied = ", ".join(columns)
+    connection.execute(text(f"INSERT INTO context_documents_v7 ({copied}) SELECT {copied} FROM {TABLE}"))
+    connection.execute(text(f"DROP TABLE {TABLE}"))
+    connection.execute(text(f"ALTER TABLE context_documents_v7 RENAME TO {TABLE}"))
+    connection.execute(text(f"CREATE INDEX IF NOT EXISTS ix_context_documents_id ON {TABLE} (id)"))
+
+
+def upgrade(connection) -> None:
+    inspector = inspect(connection)
+    if not inspector.has_table(TABLE):
+        return
+    columns = {column["name"]: column for column in inspector.get_columns(TABLE)}
+
+    for name, ddl in NEW_COLUMNS.items():
+        if name not in columns:
+            connection.execute(text(f"ALTER TABLE {TABLE} ADD COLUMN {name} {ddl}"))
+
+    if "content" in columns and not columns["content"]["nullable"]:
+        if connection.dialect.name == "sqlite":
+            known = ["id", "context_id", "document_metadata", *NEW_COLUMNS, "content", "created_at"]
+            _rebuild_sqlite(connection, [name for name in known if name in columns or name in NEW_COLUMNS])
+        else:
+            connection.execute(text(f"ALTER TABLE {TABLE} ALTER COLUMN content DROP NOT NULL"))
+
+    connection.execute(text(
+        f"CREATE INDEX IF NOT EXISTS ix_context_documents_content_hash ON {TABLE} (content_hash)"
+    ))
@@ -0,0 +1,18 @@
+# database/migrations/v0008_context_rolling_summary.py
+"""
+conversation_contexts ganha o resumo acumulado dos turnos que saíram do orçamento de
+tokens (ContextBuilderService) e a impressão digital da última mensagem resumida, para
+o resumo sobreviver a reinícios.
+"""
+from sqlalchemy import inspect, text
+
+VERSION = 8
+NAME = "conversation_contexts.rolling_summary"
+
+
+def upgrade(connection) -> None:
+    columns = {column["name"] for column in inspect(connection).get_columns("conversation_contexts")}
+    if "rolling_summary" not in columns:
+        connection.execute(text("ALTER TABLE conversation_contexts ADD COLUMN rolling_summary TEXT"))
+    if "rolling_summary_covered" not in columns:
+        connection.execute(text("ALTER TABLE conversation_contexts ADD COLUMN rolling_summary_covered VARCHAR(40)"))
@@ -3,4 +3,7 @@ from .message_model import Message
 from .conversation_context import ConversationContext
 from .context_message import ContextMessage
 from .context_document import ContextDocument
-__all__ = ['User', 'Message', 'ConversationContext', 'ContextMessage', 'ContextDocument']
\ No newline at end of file
+from .outbound_message import OutboundMessage
+from .message_status import MessageStatus
+from .conversation_message import ConversationMessage
+__all__ = ['User', 'Message', 'ConversationContext', 'ContextMessage', 'ContextDocument', 'OutboundMessage', 'MessageStatus', 'ConversationMessage']
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from database.config import Base
 import datetime
@@ -14,6 +14,11 @@ class ContextMessage(Base):
     sequence = Column(Integer, nullable=False)
     created_at = Column(DateTime(timezone=True), default=datetime.datetime.now)
     
+    __table_args__ = (
+        # Histórico do contexto em ordem: WHERE context_id = ? ORDER BY sequence
+        Index("ix_context_messages_context_sequence", "context_id", "sequence"),
+    )
+    
     # Relacionamentos
     context = relationship("ConversationContext", back_populates="messages")
     
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from database.config import Base
 import datetime
@@ -6,11 +6,26 @@ import datetime
 class ConversationContext(Base):
     __tablename__ = "conversation_contexts"
     
-    ID = Column(Integer, primary_key=True, index=True)
-    USER_ID = Column(Integer, ForeignKey("users.id"), nullable=False)
-    SESSION_ID = Column(String, nullable=False)
-    AGENT_ID = Column(String, nullable=False)
-    CREATED_AT = Column(DateTime(timezone=True), default=datetime.datetime.now) 
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    session_id = Column(String, nullable=False)
+    agent_id = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), default=datetime.datetime.now)
+    # Próxima sequência livre do contexto, incrementada atomicamente a cada mensagem
+    message_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Última mensagem do contexto: depois de um intervalo ocioso a sessão abre um contexto novo
+    last_message_at = Column(DateTime(timezone=True), default=datetime.datetime.now)
+    # Resumo da janela anterior da sessão, trazido para este contexto
+    summary = Column(Text, nullable=True)
+    # Resumo acumulado dos turnos deste contexto que já saíram do orçamento de tokens do
+    # agente, até a mensagem `rolling_summary_covered` (impressão digital SHA-1)
+    rolling_summary = Column(Text, nullable=True)
+    rolling_summary_covered = Column(String(40), nullable=True)
+    
+    __table_args__ = (
+        # Contexto mais recente da sessão: WHERE session_id = ? ORDER BY created_at DESC LIMIT 1
+        Index("ix_conversation_contexts_session_created", "session_id", "created_at"),
+    )
     
     #relationships
     user = relationship("User", back_populates="contexts")
@@ -19,11 +34,15 @@ class ConversationContext(Base):
     
     def to_dict(self):
         return {
-            "id": self.ID,
-            "user_id": self.USER_ID,
-            "session_id": self.SESSION_ID,
-            "agent_id": self.AGENT_ID,
-            "created_at": self.CREATED_AT.isoformat() if self.CREATED_AT else None,
+            "id": self.id,
+            "user_id": self.user_id,
+            "session_id": self.session_id,
+            "agent_id": self.agent_id,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "message_count": self.message_count,
+            "last_message_at": self.last_message_at.isoformat() if self.last_message_at else None,
+            "summary": self.summary,
+            "rolling_summary": self.rolling_summary,
             "messages": [message.to_dict() for message in self.messages],
             "documents": [document.to_dict() for document in self.documents],
         }
\ No newline at end of file
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from database.config import Base
+import datetime
+
+class ConversationMessage(Base):
+    __tablename__ = "conversation_messages"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(String, nullable=False)
+    sequence = Column(Integer, nullable=False)
+    role = Column(String, nullable=False)
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), default=datetime.datetime.now)
+    
+    __table_args__ = (
+        # Leitura por faixa: WHERE session_id = ? AND sequence < ? ORDER BY sequence DESC LIMIT ?
+        # Único: dois appends concorrentes não gravam a mesma posição
+        Index("ix_conversation_messages_session_sequence", "session_id", "sequence", unique=True),
+    )
+    
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "session_id": self.session_id,
+            "sequence": self.sequence,
+            "role": self.role,
+            "content": self.content,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, func
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 from database.config import Base
 
@@ -10,4 +10,18 @@ class Message(Base):
     content = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    user = relationship("User", back_populates="messages")
\ No newline at end of file
+    __table_args__ = (
+        # Últimas mensagens do usuário: WHERE user_id = ? ORDER BY id DESC LIMIT ?
+        Index("ix_messages_user_id_id", "user_id", "id"),
+    )
+
+    user = relationship("User", back_populates="messages")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "role": self.role,
+            "content": self.content,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
@@ -0,0 +1,39 @@
+from sqlalchemy import Column, String, Text, DateTime, Index
+from database.config import Base
+import datetime
+
+class MessageStatus(Base):
+    """Último status de entrega conhecido de uma mensagem enviada pelo WhatsApp."""
+    __tablename__ = "message_statuses"
+
+    # Chave primária = ID da mensagem no provedor: consulta direta pelo índice da PK
+    provider_message_id = Column(String(128), primary_key=True)
+    provider = Column(String, nullable=True)
+    phone = Column(String, nullable=True)
+    status = Column(String, nullable=False)  # sent | delivered | read | failed
+    error = Column(Text, nullable=True)
+    queued_at = Column(DateTime(timezone=True), nullable=True)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+    delivered_at = Column(DateTime(timezone=True), nullable=True)
+    read_at = Column(DateTime(timezone=True), nullable=True)
+    failed_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), default=datetime.datetime.now, onupdate=datetime.datetime.now)
+
+    __table_args__ = (
+        Index("ix_message_statuses_phone_updated_at", "phone", "updated_at"),
+    )
+
+    def to_dict(self):
+        return {
+            "provider_message_id": self.provider_message_id,
+            "provider": self.provider,
+            "phone": self.phone,
+            "status": self.status,
+            "error": self.error,
+            "queued_at": self.queued_at.isoformat() if self.queued_at else None,
+            "sent_at": self.sent_at.isoformat() if self.sent_at else None,
+            "delivered_at": self.delivered_at.isoformat() if self.delivered_at else None,
+            "read_at": self.read_at.isoformat() if self.read_at else None,
+            "failed_at": self.failed_at.isoformat() if self.failed_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+        }
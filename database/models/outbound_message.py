@@ -0,0 +1,44 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from database.config import Base
+import datetime
+
+class OutboundMessage(Base):
+    """Mensagem de saída aguardando envio pelo WhatsApp (outbox durável)."""
+    __tablename__ = "outbound_messages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    phone = Column(String, nullable=False)
+    kind = Column(String, nullable=False)  # text | document
+    payload = Column(Text, nullable=False)  # argumentos do envio em JSON
+    status = Column(String, nullable=False, default="pending")  # pending | in_flight | sent | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), default=datetime.datetime.now)
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    provider = Column(String, nullable=True)
+    provider_message_id = Column(String, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=datetime.datetime.now)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Cabeça da fila de cada telefone: WHERE status IN (...) GROUP BY phone, MIN(id)
+        Index("ix_outbound_messages_status_phone_id", "status", "phone", "id"),
+        # Callbacks de status chegam pelo ID do provedor
+        Index("ix_outbound_messages_provider_message_id", "provider_message_id"),
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "phone": self.phone,
+            "kind": self.kind,
+            "payload": self.payload,
+            "status": self.status,
+            "attempts": self.attempts,
+            "next_attempt_at": self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            "provider": self.provider,
+            "provider_message_id": self.provider_message_id,
+            "last_error": self.last_error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "sent_at": self.sent_at.isoformat() if self.sent_at else None
+        }
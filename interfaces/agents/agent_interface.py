@@ -1,13 +1,35 @@
 # interfaces/agents/agent_interface.py
+import asyncio
+import json
+import time
 from abc import ABC, abstractmethod
-from typing import TypedDict, Any
+from typing import TypedDict, Any, Awaitable, Callable
+from utils.metrics import metrics
+from utils.circuit_breaker import OPENAI, CircuitBreakerOpen, dependency_breaker
+from utils.turn_context import DeadlineExceeded, SEND_RESERVE, TurnContext, guarded_stage
 
 class AgentResponse(TypedDict):
     status: str
     message: str | None
     tool_data: dict[str, Any] | None
 
+# Handler de tool: recebe os argumentos já decodificados e os kwargs do agente
+ToolHandler = Callable[..., Awaitable[Any]]
+
 class IAgent(ABC):
+    # Timeout padrão (em segundos) de cada tool; pode ser sobrescrito por tool em TOOL_TIMEOUTS
+    TOOL_TIMEOUT: float = 30.0
+    TOOL_TIMEOUTS: dict[str, float] = {}
+    # Latência esperada (em segundos) antes de haver histórico, e o aviso enviado quando a resposta vai demorar
+    EXPECTED_LATENCY: float | None = None
+    INTERIM_MESSAGE: str | None = None
+    # Orçamento de tokens do histórico enviado ao agente (None usa o padrão do ContextBuilderService)
+    CONTEXT_TOKEN_BUDGET: int | None = None
+    # Resposta imediata quando uma dependência do agente está fora do ar (circuito aberto)
+    DEGRADED_MESSAGE: str = (
+        "Estou com uma instabilidade momentânea para responder isso. 😕 Pode tentar de novo em alguns minutos?"
+    )
+
     @property
     @abstractmethod
     def id(self) -> str: ...
@@ -18,6 +40,116 @@ class IAgent(ABC):
 
     # A assinatura correta e padronizada para todos os agentes
     @abstractmethod
-    async def execute(self, context: list[dict], phone: str, user: dict | None) -> AgentResponse:
-        """O principal método de execução do agente."""
-        ...
\ No newline at end of file
+    async def execute(
+        self, context: list[dict], phone: str, user: dict | None, turn: TurnContext | None = None
+    ) -> AgentResponse:
+        """O principal método de execução do agente. `turn` traz os dados já derivados do turno."""
+        ...
+
+    # --- Camada genérica de execução de tools ---
+    def tool_handlers(self) -> dict[str, ToolHandler]:
+        """Mapeia o nome de cada tool para a corrotina que a executa."""
+        return {}
+
+    async def execute_tool_calls(self, tool_calls: list, **kwargs) -> list[dict]:
+        """
+        Executa concorrentemente todas as tool calls retornadas pelo modelo.
+        Retorna as mensagens 'tool' na mesma ordem das chamadas.
+        """
+        return [tool_message for tool_message, _ in await self._run_tool_calls(tool_calls, **kwargs)]
+
+    async def _run_tool_calls(self, tool_calls: list, **kwargs) -> list[tuple[dict, bool]]:
+        """Como execute_tool_calls, indicando também se cada tool devolveu um texto de sucesso."""
+        return list(await asyncio.gather(
+            *(self._execute_tool_call(tool_call, **kwargs) for tool_call in tool_calls)
+        ))
+
+    async def _execute_tool_call(self, tool_call, **kwargs) -> tuple[dict, bool]:
+        tool_name = tool_call.function.name
+        handler = self.tool_handlers().get(tool_name)
+        timeout = self.TOOL_TIMEOUTS.get(tool_name, self.TOOL_TIMEOUT)
+        # A tool não passa do prazo do turno (guardando o tempo do envio da resposta)
+        turn = kwargs.get("turn")
+        if turn is not None and turn.deadline is not None:
+            timeout = max(0.0, min(timeout, turn.stage_timeout(reserve=SEND_RESERVE)))
+        outcome = "ok"
+        start = time.perf_counter()
+
+        try:
+            if handler is None:
+                outcome = "unknown_tool"
+                result = {"error": f"Tool '{tool_name}' não está disponível."}
+            else:
+                arguments = json.loads(tool_call.function.arguments or "{}")
+                result = await asyncio.wait_for(handler(arguments, **kwargs), timeout=timeout)
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            result = {"error": f"Tool '{tool_name}' excedeu o tempo limite de {timeout}s."}
+        except Exception as e:
+            outcome = "error"
+            result = {"error": f"Falha ao executar a tool '{tool_name}': {e}"}
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.observe("agent_tool_latency_seconds", elapsed, agent=self.name, tool=tool_name)
+            metrics.increment("agent_tool_calls", agent=self.name, tool=tool_name, outcome=outcome)
+            print(f"INFO: Tool '{tool_name}' do agente {self.name} finalizada em {elapsed:.2f}s ({outcome})")
+
+        tool_message = {
+            "role": "tool",
+            "tool_call_id": tool_call.id,
+            "content": result if isinstance(result, str) else json.dumps(result, ensure_ascii=False, default=str),
+        }
+        return tool_message, outcome == "ok" and isinstance(result, str)
+
+    async def complete_tool_calls(
+        self,
+        client,
+        messages: list[dict],
+        message,
+        tool_kwargs: dict[str, Any] | None = None,
+        **completion_kwargs
+    ) -> tuple[str | None, list[dict]]:
+        """
+        Executa as tool calls de `message` e devolve os resultados ao modelo em uma
+        única completion de acompanhamento. Com `turn` em tool_kwargs, a completion
+        respeita o prazo do turno e o circuito da OpenAI; se o prazo acabar ou o circuito
+        estiver aberto, o texto final é o da última tool que devolveu um texto de sucesso
+        ou, sem nenhuma, DEGRADED_MESSAGE (erros das tools, em JSON, não vão ao usuário).
+
+        Returns:
+            tuple: (texto final do modelo, mensagens 'tool' geradas)
+        """
+        results = await self._run_tool_calls(message.tool_calls, **(tool_kwargs or {}))
+        tool_messages = [tool_message for tool_message, _ in results]
+
+        assistant_message = {
+            "role": "assistant",
+            "content": message.content,
+            "tool_calls": [
+                {
+                    "id": tool_call.id,
+                    "type": "function",
+                    "function": {
+                        "name": tool_call.function.name,
+                        "arguments": tool_call.function.arguments,
+                    },
+                }
+                for tool_call in message.tool_calls
+            ],
+        }
+
+        try:
+            response = await guarded_stage(
+                dependency_breaker(OPENAI),
+                (tool_kwargs or {}).get("turn"),
+                "agent_llm",
+                lambda: client.chat.completions.create(
+                    messages=[*messages, assistant_message, *tool_messages],
+                    **completion_kwargs
+                ),
+                reserve=SEND_RESERVE
+            )
+        except (DeadlineExceeded, CircuitBreakerOpen):
+            replies = [tool_message["content"] for tool_message, succeeded in results if succeeded]
+            return (replies[-1] if replies else self.DEGRADED_MESSAGE), tool_messages
+        return response.choices[0].message.content, tool_messages
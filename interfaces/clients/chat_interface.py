@@ -3,9 +3,29 @@ from typing import Optional, Dict, Any
 
 class IChat(ABC):
     @abstractmethod
-    def send_message(self, phone: str, message: str, media_url: Optional[str] = None) -> Dict[str, Any]:
+    async def send_message(self, phone: str, message: str, media_url: Optional[str] = None) -> Dict[str, Any]:
         pass
-    
+
+    @abstractmethod
+    async def send_document(
+        self,
+        phone: str,
+        filename: str,
+        document_base64: Optional[str] = None,
+        document_url: Optional[str] = None,
+        caption: Optional[str] = None,
+        document: Optional[bytes] = None
+    ) -> Dict[str, Any]:
+        """
+        Envia um documento por URL, em base64 ou como bytes (`document`). Os bytes só são
+        codificados em base64 na chamada ao provedor.
+        """
+        pass
+
+    async def send_presence(self, phone: str, presence: str = "composing") -> Dict[str, Any]:
+        """Mostra um indicador de presença (ex: "digitando...") ao usuário, quando o canal suporta."""
+        return {"status": "unsupported"}
+
     @abstractmethod
-    def get_message_status(self, message_id: str) -> Dict[str, Any]:
-        pass
\ No newline at end of file
+    async def get_message_status(self, message_id: str) -> Dict[str, Any]:
+        pass
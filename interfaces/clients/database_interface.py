@@ -1,12 +1,35 @@
 from abc import ABC, abstractmethod
-from contextlib import AbstractContextManager
+from contextlib import AbstractContextManager, AbstractAsyncContextManager
 from typing import Any
 
 class IDatabase(ABC):
     @abstractmethod
     def get_session(self) -> AbstractContextManager[Any]:
         pass
-    
+
     @abstractmethod
     def close(self) -> None:
-        pass
\ No newline at end of file
+        pass
+
+
+class IAsyncDatabase(ABC):
+    """
+    Acesso assíncrono ao banco: as consultas não bloqueiam o event loop.
+    """
+
+    @abstractmethod
+    def session(self) -> AbstractAsyncContextManager[Any]:
+        """
+        Abre uma sessão assíncrona com escopo do bloco `async with`.
+        Faz rollback se o bloco levantar exceção e sempre devolve a conexão ao pool.
+        """
+        pass
+
+    @abstractmethod
+    def pool_stats(self) -> dict:
+        """Uso atual do pool de conexões (em uso, livres, overflow, tempo de espera)."""
+        pass
+
+    @abstractmethod
+    async def aclose(self) -> None:
+        pass
@@ -1,7 +1,14 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from utils.turn_context import TurnContext
 
 class IResponseOrchestrator(ABC):
     @abstractmethod
-    async def execute(self, context: List[Dict[str, Any]], phone: str) -> List[Dict[str, Any]]:
+    async def execute(
+        self,
+        context: List[Dict[str, Any]],
+        phone: str,
+        user: Optional[Dict[str, Any]] = None,
+        turn: Optional[TurnContext] = None
+    ) -> List[Dict[str, Any]]:
         pass
\ No newline at end of file
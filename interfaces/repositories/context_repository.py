@@ -1,49 +1,100 @@
 # interfaces/repositories/conversation_context_repository_interface.py
 from abc import ABC, abstractmethod
 from typing import List, Optional, Dict, Any
+import datetime
 
 class IConversationContextRepository(ABC):
     @abstractmethod
-    def create_context(self, user_id: int, session_id: str, agent_id: str):
+    async def create_context(self, user_id: int, session_id: str, agent_id: str, summary: Optional[str] = None):
         """Cria um novo contexto de conversa"""
         pass
     
     @abstractmethod
-    def get_context_by_id(self, context_id: int):
+    async def get_context_by_id(self, context_id: int):
         """Obtém um contexto pelo ID"""
         pass
     
     @abstractmethod
-    def get_latest_context_by_session(self, session_id: str):
+    async def get_latest_context_by_session(self, session_id: str):
         """Obtém o contexto mais recente para uma sessão específica"""
         pass
     
     @abstractmethod
-    def get_contexts_by_user(self, user_id: int):
+    async def get_rolling_summary(self, session_id: str) -> tuple[Optional[str], Optional[str]]:
+        """
+        Obtém o resumo acumulado do contexto mais recente da sessão.
+        Retorna (texto, impressão digital da última mensagem resumida) ou (None, None).
+        """
+        pass
+    
+    @abstractmethod
+    async def save_rolling_summary(self, session_id: str, text: str, covered: str) -> None:
+        """Grava o resumo acumulado no contexto mais recente da sessão."""
+        pass
+    
+    @abstractmethod
+    async def get_contexts_by_user(self, user_id: int):
         """Obtém todos os contextos de um usuário específico"""
         pass
     
     @abstractmethod
-    def add_message(self, context_id: int, role: str, content: str, sequence: int, function_call_id: Optional[str] = None):
+    async def add_message(self, context_id: int, role: str, content: str, sequence: int, function_call_id: Optional[str] = None):
         """Adiciona uma mensagem ao contexto"""
         pass
     
     @abstractmethod
-    def get_messages_by_context(self, context_id: int):
+    async def append_message(
+        self,
+        role: str,
+        content: str,
+        context_id: Optional[int] = None,
+        session_id: Optional[str] = None,
+        function_call_id: Optional[str] = None,
+        active_since: Optional[datetime.datetime] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Adiciona uma mensagem com a próxima sequência do contexto, alocada atomicamente.
+        Recebe o contexto pelo ID ou pela sessão (usa o contexto mais recente).
+        Com `active_since`, ignora o contexto cuja última mensagem seja anterior a ele.
+        Retorna {id, context_id, user_id, sequence} ou None se o contexto não existir.
+        """
+        pass
+
+    @abstractmethod
+    async def add_messages(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Adiciona várias mensagens numa única transação (context_id, role, content,
+        function_call_id e, opcionalmente, sequence). As mensagens sem sequência recebem
+        as próximas do contexto, na ordem da lista. Retorna os registros gravados.
+        """
+        pass
+
+    @abstractmethod
+    async def get_messages_by_context(self, context_id: int):
         """Obtém todas as mensagens de um contexto específico"""
         pass
     
     @abstractmethod
-    def add_document(self, context_id: int, filename: str, content_type: str, data: bytes, metadata: Optional[Dict[str, Any]] = None):
+    async def get_recent_messages(self, context_id: int, limit: int):
+        """Obtém as `limit` mensagens mais recentes do contexto, em ordem de sequência"""
+        pass
+    
+    @abstractmethod
+    async def add_document(self, context_id: int, filename: str, content_type: str, data: bytes, metadata: Optional[Dict[str, Any]] = None):
         """Adiciona um documento ao contexto"""
         pass
     
     @abstractmethod
-    def get_documents_by_context(self, context_id: int):
+    async def add_documents(self, records: List[Dict[str, Any]]) -> int:
+        """Adiciona vários documentos numa única transação (campos de add_document)"""
+        pass
+
+    @abstractmethod
+    async def get_documents_by_context(self, context_id: int):
         """Obtém todos os documentos de um contexto específico"""
         pass
     
     @abstractmethod
-    def delete_context(self, context_id: int) -> bool:
+    async def delete_context(self, context_id: int) -> bool:
         """Exclui um contexto e todos os seus dados relacionados"""
         pass
\ No newline at end of file
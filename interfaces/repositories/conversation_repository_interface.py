@@ -1,7 +1,7 @@
 # interfaces/repositories/conversation_repository_interface.py
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence
 
 class IConversationRepository(ABC):
     """
@@ -10,7 +10,7 @@ class IConversationRepository(ABC):
     """
     
     @abstractmethod
-    def save_history(self, session_id: str, history: List[Dict[str, Any]]) -> bool:
+    async def save_history(self, session_id: str, history: List[Dict[str, Any]]) -> bool:
         """
         Salva o histórico de conversas para uma sessão específica.
         
@@ -24,20 +24,39 @@ class IConversationRepository(ABC):
         pass
     
     @abstractmethod
-    def get_history(self, session_id: str) -> Optional[List[Dict[str, Any]]]:
+    async def get_history(self, session_id: str, limit: Optional[int] = None) -> Optional[Sequence[Dict[str, Any]]]:
         """
         Recupera o histórico de conversas para uma sessão específica.
         
         Args:
             session_id: O ID da sessão
+            limit: Se informado, só as `limit` mensagens mais recentes
             
         Returns:
-            O histórico de conversas se encontrado, None caso contrário
+            O histórico de conversas se encontrado, None caso contrário. É somente
+            leitura (o repositório em memória devolve uma tupla que compartilha as
+            mensagens guardadas): quem precisar alterá-lo deve copiar com list().
         """
         pass
     
+    async def append_messages(self, session_id: str, messages: List[Dict[str, Any]]) -> bool:
+        """
+        Acrescenta mensagens ao fim do histórico de uma sessão.
+        Implementação padrão: lê o histórico e salva tudo de novo; os repositórios
+        com escrita incremental a sobrescrevem.
+        
+        Args:
+            session_id: O ID da sessão
+            messages: As mensagens novas, em ordem
+            
+        Returns:
+            True se as mensagens foram salvas com sucesso, False caso contrário
+        """
+        history = await self.get_history(session_id) or []
+        return await self.save_history(session_id, [*history, *messages])
+    
     @abstractmethod
-    def clear_history(self, session_id: str) -> bool:
+    async def clear_history(self, session_id: str) -> bool:
         """
         Limpa o histórico de conversas para uma sessão específica.
         
@@ -50,7 +69,7 @@ class IConversationRepository(ABC):
         pass
     
     @abstractmethod
-    def list_sessions(self) -> List[str]:
+    async def list_sessions(self) -> List[str]:
         """
         Lista todas as sessões de conversa disponíveis.
         
@@ -0,0 +1,52 @@
+# interfaces/repositories/document_store_interface.py
+
+from abc import ABC, abstractmethod
+from contextlib import AbstractContextManager
+from typing import Iterator
+
+class IDocumentStore(ABC):
+    """
+    Interface para armazenamentos de documentos endereçados por conteúdo.
+    Cada documento é identificado pelo hash SHA-256 dos seus bytes.
+    """
+
+    @abstractmethod
+    def put(self, data: bytes | memoryview) -> str:
+        """
+        Armazena um documento. Documentos idênticos são gravados uma única vez.
+
+        Args:
+            data: Os bytes do documento
+
+        Returns:
+            O hash SHA-256 (hexadecimal) do documento
+        """
+        pass
+
+    @abstractmethod
+    def exists(self, content_hash: str) -> bool:
+        """Verifica se um documento está armazenado."""
+        pass
+
+    @abstractmethod
+    def open(self, content_hash: str) -> AbstractContextManager[memoryview]:
+        """
+        Abre um documento para leitura sem carregá-lo em um novo buffer.
+
+        Args:
+            content_hash: O hash do documento
+
+        Returns:
+            Um context manager que fornece uma memoryview com os bytes do documento
+        """
+        pass
+
+    @abstractmethod
+    def iter_chunks(self, content_hash: str, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """Lê um documento em blocos, para envio em streaming."""
+        pass
+
+    @abstractmethod
+    def delete(self, content_hash: str) -> bool:
+        """Remove um documento do armazenamento."""
+        pass
@@ -10,7 +10,7 @@ class IMessageRepository(ABC):
     """
     
     @abstractmethod
-    def all(self) -> list:
+    async def all(self) -> list:
         """
         Obtém todas as mensagens.
         
@@ -20,7 +20,7 @@ class IMessageRepository(ABC):
         pass
     
     @abstractmethod
-    def get_latest_customer_messages(
+    async def get_latest_customer_messages(
         self, phone: Optional[Union[int, str]] = None, limit: int = 20
     ) -> list:
         """
@@ -36,7 +36,7 @@ class IMessageRepository(ABC):
         pass
     
     @abstractmethod
-    def create(self, phone: str, role: str, content: Union[str, list]) -> dict:
+    async def create(self, phone: str, role: str, content: Union[str, list]) -> dict:
         """
         Cria uma nova mensagem.
         
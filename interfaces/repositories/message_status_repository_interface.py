@@ -0,0 +1,33 @@
+# interfaces/repositories/message_status_repository_interface.py
+
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional
+
+class IMessageStatusRepository(ABC):
+    """
+    Interface para o armazenamento dos status de entrega das mensagens,
+    indexado pelo ID da mensagem no provedor.
+    """
+
+    @abstractmethod
+    def upsert_many(self, records: List[Dict[str, Any]]) -> int:
+        """
+        Grava vários status de uma vez (uma única transação).
+
+        Args:
+            records: Registros completos, um por provider_message_id
+
+        Returns:
+            A quantidade de registros gravados
+        """
+        pass
+
+    @abstractmethod
+    def get(self, provider_message_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca o status de uma mensagem.
+
+        Returns:
+            O registro do status ou None se a mensagem não for conhecida
+        """
+        pass
@@ -0,0 +1,91 @@
+# interfaces/repositories/outbox_repository_interface.py
+
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional
+
+class IOutboxRepository(ABC):
+    """
+    Interface para a fila durável de mensagens de saída (outbox).
+    As mensagens de um mesmo telefone são entregues estritamente na ordem de entrada.
+    """
+
+    @abstractmethod
+    def enqueue(self, phone: str, kind: str, payload: Dict[str, Any]) -> int:
+        """
+        Enfileira uma mensagem para envio.
+
+        Args:
+            phone: O telefone de destino
+            kind: O tipo de envio ("text" ou "document")
+            payload: Os argumentos do envio
+
+        Returns:
+            O ID da mensagem na fila
+        """
+        pass
+
+    @abstractmethod
+    def enqueue_many(self, phone: str, kind: str, payloads: List[Dict[str, Any]]) -> List[int]:
+        """
+        Enfileira várias mensagens de uma vez (mesma transação), preservando a ordem.
+        Usado para as partes de uma resposta longa.
+
+        Returns:
+            Os IDs das mensagens na fila, na ordem de envio
+        """
+        pass
+
+    @abstractmethod
+    def claim_batch(self, limit: int, lease_seconds: float) -> List[Dict[str, Any]]:
+        """
+        Reserva as próximas mensagens prontas para envio: no máximo uma por telefone,
+        sempre a mais antiga ainda não entregue daquele telefone.
+
+        Args:
+            limit: O número máximo de mensagens reservadas
+            lease_seconds: Por quanto tempo a reserva vale antes de ser considerada abandonada
+
+        Returns:
+            As mensagens reservadas
+        """
+        pass
+
+    @abstractmethod
+    def mark_sent(self, message_id: int, provider: Optional[str], provider_message_id: Optional[str]) -> None:
+        """Marca uma mensagem como enviada."""
+        pass
+
+    @abstractmethod
+    def mark_retry(self, message_id: int, error: str, delay_seconds: float) -> None:
+        """Devolve a mensagem à fila para uma nova tentativa após `delay_seconds`."""
+        pass
+
+    @abstractmethod
+    def mark_failed(self, message_id: int, error: str) -> None:
+        """Marca a mensagem como falha definitiva, liberando as próximas do mesmo telefone."""
+        pass
+
+    @abstractmethod
+    def requeue_failed_delivery(self, provider_message_id: str, error: str) -> Optional[int]:
+        """
+        Devolve à fila uma mensagem aceita pelo provedor cuja entrega falhou (callback de status).
+
+        Returns:
+            O ID da mensagem na fila, ou None se ela não for da outbox ou esgotou as tentativas
+        """
+        pass
+
+    @abstractmethod
+    def recover_expired(self) -> int:
+        """
+        Devolve à fila as mensagens cuja reserva expirou (ex: após uma queda do processo).
+
+        Returns:
+            A quantidade de mensagens recuperadas
+        """
+        pass
+
+    @abstractmethod
+    def pending_count(self) -> int:
+        """Retorna quantas mensagens ainda aguardam entrega."""
+        pass
@@ -4,13 +4,19 @@ from abc import ABC, abstractmethod
 class IUserRepository(ABC):
     """
     Define o contrato para o repositório de usuários.
+    Os usuários são dicts (ver User.to_dict), com ao menos "id", "name" e "phone".
     """
     @abstractmethod
-    def get_user_by_phone(self, phone: str) -> dict | None:
+    async def get_user_by_phone(self, phone: str) -> dict | None:
         """Busca um usuário pelo número de telefone."""
         pass
 
     @abstractmethod
-    def save_user(self, phone: str, name: str) -> dict:
-        """Cria ou atualiza um usuário."""
-        pass
\ No newline at end of file
+    async def save_user(self, phone: str, name: str) -> dict:
+        """Cria ou atualiza um usuário (upsert pelo telefone)."""
+        pass
+
+    @abstractmethod
+    async def get_or_create_user(self, phone: str, name: str = "Novo Usuário") -> dict:
+        """Retorna o usuário do telefone, criando-o com `name` se ainda não existir."""
+        pass
@@ -1,16 +1,32 @@
 import asyncio
+import os
 from agents.roteiro_agent import RoteiroAgent
 from agents.web_agent import WebAgent
+from clients.database_client import DatabaseClient
 from container.clients import ClientContainer
 from container.repositories import RepositoryContainer
 from services.response_orchestrator import ResponseOrchestrator
+from services.progressive_reply_service import ProgressiveReplyService
+from services.pdf_render_service import pdf_render_service
+from services.context_builder_service import ContextBuilderService
+from services.session_summary_service import SessionSummaryService
 
 async def main():
     client_container = ClientContainer()
     repository_container = RepositoryContainer()
+    database = None
+    dispatcher = None
+    if os.getenv("DATABASE_URL"):
+        database = DatabaseClient()
+        repository_container.initialize_db_repositories(database)
+        # Os agentes enviam pela outbox durável; o dispatcher faz a entrega
+        dispatcher = client_container.use_outbox(
+            repository_container.get("outbox"), repository_container.get("document")
+        )
+        await dispatcher.start()
     ai_client = client_container.get("async_openai")
 
-    roteiro_agent = RoteiroAgent(ai_client)
+    roteiro_agent = RoteiroAgent.factory(client_container, repository_container)
     web_agent = WebAgent(client_container, repository_container)
 
     agents = {
@@ -21,9 +37,24 @@ async def main():
     orchestrator = ResponseOrchestrator(
         ai_client=ai_client,
         agents=agents,
-        repositories=repository_container
+        repositories=repository_container,
+        progressive_replies=ProgressiveReplyService(client_container.get("whatsapp")),
+        context_builder=ContextBuilderService(
+            SessionSummaryService(ai_client),
+            context_repository=repository_container.get("context")
+        )
     )
+    # Sobe o pool de renderização de PDF antes do primeiro roteiro
+    await pdf_render_service.warm()
     print("Sistema iniciado com sucesso.")
 
+    await asyncio.to_thread(pdf_render_service.shutdown)
+
+    if dispatcher:
+        await dispatcher.stop()
+    if database:
+        await database.aclose()
+    await client_container.close()
+
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,36 @@
+# repositories/cached_message_repository.py
+
+from typing import Optional, Union
+
+from interfaces.repositories.message_repository_interface import IMessageRepository
+from utils.history_cache import HistoryCache
+
+
+class CachedMessageRepository(IMessageRepository):
+    """
+    Repositório de mensagens com cache read-through das últimas mensagens de cada cliente.
+    As mensagens novas entram no cache ao serem criadas, sem invalidar a janela.
+    """
+
+    def __init__(self, repository: IMessageRepository, cache: Optional[HistoryCache] = None):
+        self.repository = repository
+        self.cache = cache or HistoryCache("messages")
+
+    async def all(self) -> list:
+        return await self.repository.all()
+
+    async def get_latest_customer_messages(
+        self, phone: Optional[Union[int, str]] = None, limit: int = 20
+    ) -> list:
+        async def load(count: int) -> list:
+            latest = await self.repository.get_latest_customer_messages(phone=phone, limit=count)
+            return list(reversed(latest))
+
+        # O cache guarda em ordem cronológica; o contrato devolve as mais recentes primeiro
+        messages = await self.cache.get(phone, load, limit=limit or None)
+        return list(reversed(messages))
+
+    async def create(self, phone: str, role: str, content: Union[str, list]) -> dict:
+        message = await self.repository.create(phone=phone, role=role, content=content)
+        self.cache.append(phone, message)
+        return message
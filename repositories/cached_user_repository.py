@@ -0,0 +1,107 @@
+# repositories/cached_user_repository.py
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from interfaces.repositories.user_repository_interface import IUserRepository
+from utils.metrics import metrics
+
+
+class CachedUserRepository(IUserRepository):
+    """
+    Repositório de usuários com cache TTL por telefone na frente de outro repositório.
+
+    - Usuários encontrados ficam `ttl` segundos; telefones sem usuário ficam em cache
+      negativo por `negative_ttl` segundos, para não ir ao banco a cada mensagem de um
+      número desconhecido.
+    - Buscas simultâneas do mesmo telefone compartilham uma única consulta; se quem a
+      iniciou for cancelado, os demais não ficam presos e fazem a própria consulta.
+    - Escritas (save_user, get_or_create_user) atualizam o cache com o resultado.
+    - No máximo `max_entries` telefones; acima disso sai o usado há mais tempo (LRU).
+    """
+
+    def __init__(
+        self,
+        repository: IUserRepository,
+        ttl: float = 300.0,
+        negative_ttl: float = 30.0,
+        max_entries: int = 50_000
+    ):
+        self.repository = repository
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        # telefone -> (expira_em, usuário ou None)
+        self._entries: OrderedDict[str, Tuple[float, Optional[Dict[str, Any]]]] = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _put(self, phone: str, user: Optional[Dict[str, Any]]) -> None:
+        self._entries[phone] = (time.monotonic() + (self.ttl if user else self.negative_ttl), user)
+        self._entries.move_to_end(phone)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _cached(self, phone: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        entry = self._entries.get(phone)
+        if entry is None:
+            return False, None
+        expires_at, user = entry
+        if expires_at <= time.monotonic():
+            del self._entries[phone]
+            return False, None
+        self._entries.move_to_end(phone)
+        return True, user
+
+    async def get_user_by_phone(self, phone: str) -> dict | None:
+        hit, user = self._cached(phone)
+        if hit:
+            metrics.increment("user_cache_hits", negative=user is None)
+            return user
+        metrics.increment("user_cache_misses")
+
+        inflight = self._inflight.get(phone)
+        if inflight is not None:
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # A busca compartilhada foi cancelada junto com quem a iniciou:
+                # este chamador faz a própria consulta
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[phone] = future
+        try:
+            user = await self.repository.get_user_by_phone(phone)
+        except Exception as e:
+            future.set_exception(e)
+            # Marca a exceção como tratada se ninguém mais estiver esperando
+            future.exception()
+            raise
+        except BaseException:
+            # Cancelamento (ou saída do processo): libera quem espera a mesma busca
+            future.cancel()
+            raise
+        finally:
+            if self._inflight.get(phone) is future:
+                del self._inflight[phone]
+        self._put(phone, user)
+        future.set_result(user)
+        return user
+
+    async def save_user(self, phone: str, name: str) -> dict:
+        user = await self.repository.save_user(phone, name)
+        self._put(phone, user)
+        return user
+
+    async def get_or_create_user(self, phone: str, name: str = "Novo Usuário") -> dict:
+        user = await self.get_user_by_phone(phone)
+        if user is None:
+            user = await self.repository.get_or_create_user(phone, name)
+            self._put(phone, user)
+        return user
+
+    def invalidate(self, phone: str) -> None:
+        self._entries.pop(phone, None)
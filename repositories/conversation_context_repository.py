@@ -1,57 +1,99 @@
 # repositories/conversation_context_repository.py
 from interfaces.repositories.context_repository import IConversationContextRepository
-from interfaces.clients.database_interface import IDatabase
+from interfaces.clients.database_interface import IAsyncDatabase
+from interfaces.repositories.document_store_interface import IDocumentStore
 from typing import List, Optional, Dict, Any
 from database.models.conversation_context import ConversationContext
 from database.models.context_message import ContextMessage
 from database.models.context_document import ContextDocument
+from repositories.document_store import FileSystemDocumentStore
+from sqlalchemy import DateTime, String, Text, case, insert, literal, select, update
+from sqlalchemy.orm import selectinload
+import asyncio
+import datetime
+import json
 
 class ConversationContextRepository(IConversationContextRepository):
-    def __init__(self, database_client: IDatabase):
+    def __init__(self, database_client: IAsyncDatabase, document_store: Optional[IDocumentStore] = None):
         self.db = database_client
-    
-    def create_context(self, user_id: int, session_id: str, agent_id: str):
+        self.document_store = document_store or FileSystemDocumentStore()
+
+    async def create_context(self, user_id: int, session_id: str, agent_id: str, summary: Optional[str] = None):
         """Cria um novo contexto de conversa"""
-        with self.db.get_session() as session:
+        async with self.db.session() as session:
             context = ConversationContext(
                 user_id=user_id,
                 session_id=session_id,
-                agent_id=agent_id
+                agent_id=agent_id,
+                summary=summary
             )
             session.add(context)
-            session.commit()
-            session.refresh(context)
+            await session.commit()
             return context
-    
-    def get_context_by_id(self, context_id: int):
+
+    async def get_context_by_id(self, context_id: int):
         """Obtém um contexto pelo ID"""
-        with self.db.get_session() as session:
-            return session.query(ConversationContext).filter(
-                ConversationContext.id == context_id
-            ).first()
-    
-    def get_latest_context_by_session(self, session_id: str):
+        async with self.db.session() as session:
+            return await session.get(ConversationContext, context_id)
+
+    async def get_latest_context_by_session(self, session_id: str):
         """Obtém o contexto mais recente para uma sessão específica"""
-        with self.db.get_session() as session:
-            return session.query(ConversationContext).filter(
-                ConversationContext.session_id == session_id
-            ).order_by(ConversationContext.created_at.desc()).first()
-    
-    def get_contexts_by_user(self, user_id: int):
+        async with self.db.session() as session:
+            result = await session.execute(
+                select(ConversationContext)
+                .where(ConversationContext.session_id == session_id)
+                .order_by(ConversationContext.created_at.desc())
+                .limit(1)
+            )
+            return result.scalars().first()
+
+    def _latest_context_id(self, session_id: str):
+        return (
+            select(ConversationContext.id)
+            .where(ConversationContext.session_id == session_id)
+            .order_by(ConversationContext.created_at.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+
+    async def get_rolling_summary(self, session_id: str) -> tuple[Optional[str], Optional[str]]:
+        """Obtém o resumo acumulado do contexto mais recente da sessão"""
+        async with self.db.session() as session:
+            result = await session.execute(
+                select(ConversationContext.rolling_summary, ConversationContext.rolling_summary_covered)
+                .where(ConversationContext.id == self._latest_context_id(session_id))
+            )
+            row = result.first()
+            return (row[0], row[1]) if row else (None, None)
+
+    async def save_rolling_summary(self, session_id: str, text: str, covered: str) -> None:
+        """Grava o resumo acumulado no contexto mais recente da sessão"""
+        async with self.db.session() as session:
+            await session.execute(
+                update(ConversationContext.__table__)
+                .where(ConversationContext.id == self._latest_context_id(session_id))
+                .values(rolling_summary=text, rolling_summary_covered=covered)
+            )
+            await session.commit()
+
+    async def get_contexts_by_user(self, user_id: int):
         """Obtém todos os contextos de um usuário específico"""
-        with self.db.get_session() as session:
-            return session.query(ConversationContext).filter(
-                ConversationContext.user_id == user_id
-            ).order_by(ConversationContext.created_at.desc()).all()
-    
-    def add_message(self, 
-                   context_id: int, 
-                   role: str, 
-                   content: str, 
-                   sequence: int, 
+        async with self.db.session() as session:
+            result = await session.execute(
+                select(ConversationContext)
+                .where(ConversationContext.user_id == user_id)
+                .order_by(ConversationContext.created_at.desc())
+            )
+            return list(result.scalars().all())
+
+    async def add_message(self,
+                   context_id: int,
+                   role: str,
+                   content: str,
+                   sequence: int,
                    function_call_id: Optional[str] = None):
         """Adiciona uma mensagem ao contexto"""
-        with self.db.get_session() as session:
+        async with self.db.session() as session:
             message = ContextMessage(
                 context_id=context_id,
                 role=role,
@@ -60,53 +102,267 @@ class ConversationContextRepository(IConversationContextRepository):
                 sequence=sequence
             )
             session.add(message)
-            session.commit()
-            session.refresh(message)
+            # Mantém o contador do contexto à frente da sequência informada
+            await session.execute(
+                update(ConversationContext.__table__)
+                .where(ConversationContext.id == context_id)
+                .values({
+                    ConversationContext.message_count: case(
+                        (ConversationContext.message_count > sequence, ConversationContext.message_count),
+                        else_=sequence + 1
+                    ),
+                    ConversationContext.last_message_at: datetime.datetime.now()
+                })
+            )
+            await session.commit()
             return message
-    
-    def get_messages_by_context(self, context_id: int):
+
+    @staticmethod
+    def _allocate_sequence(
+        context_id: Optional[int],
+        session_id: Optional[str],
+        active_since: Optional[datetime.datetime] = None
+    ):
+        """
+        UPDATE que reserva a próxima sequência do contexto. O lock da linha serializa
+        as mensagens concorrentes do mesmo contexto; o RETURNING já traz o valor alocado.
+        Com `active_since`, só usa o contexto se a última mensagem for posterior a ele.
+        """
+        if context_id is not None:
+            target = ConversationContext.id == context_id
+        else:
+            target = ConversationContext.id == (
+                select(ConversationContext.id)
+                .where(ConversationContext.session_id == session_id)
+                .order_by(ConversationContext.created_at.desc())
+                .limit(1)
+                .scalar_subquery()
+            )
+        if active_since is not None:
+            target = target & (ConversationContext.last_message_at >= active_since)
+        return (
+            update(ConversationContext.__table__)
+            .where(target)
+            .values({
+                ConversationContext.message_count: ConversationContext.message_count + 1,
+                ConversationContext.last_message_at: datetime.datetime.now()
+            })
+            .returning(
+                ConversationContext.id.label("context_id"),
+                ConversationContext.user_id.label("user_id"),
+                (ConversationContext.message_count - 1).label("sequence")
+            )
+        )
+
+    async def append_message(self,
+                      role: str,
+                      content: str,
+                      context_id: Optional[int] = None,
+                      session_id: Optional[str] = None,
+                      function_call_id: Optional[str] = None,
+                      active_since: Optional[datetime.datetime] = None) -> Optional[Dict[str, Any]]:
+        """Adiciona uma mensagem com a próxima sequência do contexto, sem carregar o histórico"""
+        if context_id is None and session_id is None:
+            raise ValueError("Informe context_id ou session_id")
+
+        messages = ContextMessage.__table__
+        allocation = self._allocate_sequence(context_id, session_id, active_since)
+        created_at = datetime.datetime.now()
+
+        async with self.db.session() as session:
+            if session.get_bind().dialect.name == "postgresql":
+                # Uma única ida ao banco: busca o contexto, aloca a sequência e insere a mensagem
+                allocated = allocation.cte("allocated")
+                inserted = (
+                    insert(messages)
+                    .from_select(
+                        ["context_id", "role", "content", "function_call_id", "sequence", "created_at"],
+                        select(
+                            allocated.c.context_id,
+                            literal(role, String),
+                            literal(content, Text),
+                            literal(function_call_id, String),
+                            allocated.c.sequence,
+                            literal(created_at, DateTime(timezone=True))
+                        )
+                    )
+                    .returning(messages.c.id, messages.c.context_id, messages.c.sequence)
+                    .cte("inserted")
+                )
+                result = await session.execute(
+                    select(inserted.c.id, inserted.c.context_id, allocated.c.user_id, inserted.c.sequence)
+                    .join_from(inserted, allocated, inserted.c.context_id == allocated.c.context_id)
+                )
+                row = result.first()
+            else:
+                # SQLite não aceita UPDATE dentro de CTE: duas instruções na mesma transação
+                allocated = (await session.execute(allocation)).first()
+                row = None
+                if allocated is not None:
+                    result = await session.execute(
+                        insert(messages)
+                        .values(
+                            context_id=allocated.context_id,
+                            role=role,
+                            content=content,
+                            function_call_id=function_call_id,
+                            sequence=allocated.sequence,
+                            created_at=created_at
+                        )
+                        .returning(messages.c.id)
+                    )
+                    row = (result.scalar_one(), allocated.context_id, allocated.user_id, allocated.sequence)
+            await session.commit()
+
+        if row is None:
+            return None
+        message_id, context_id, user_id, sequence = row
+        return {"id": message_id, "context_id": context_id, "user_id": user_id, "sequence": sequence}
+
+    async def add_messages(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Adiciona várias mensagens: um UPDATE do contador por contexto e um INSERT em lote"""
+        if not records:
+            return []
+
+        # Por contexto: quantas mensagens precisam de sequência e a maior sequência já informada
+        pending: Dict[int, int] = {}
+        highest: Dict[int, int] = {}
+        for record in records:
+            context_id = record["context_id"]
+            pending.setdefault(context_id, 0)
+            if record.get("sequence") is None:
+                pending[context_id] += 1
+            else:
+                highest[context_id] = max(highest.get(context_id, -1), record["sequence"])
+
+        created_at = datetime.datetime.now()
+        async with self.db.session() as session:
+            next_sequence: Dict[int, int] = {}
+            for context_id, count in pending.items():
+                floor = highest.get(context_id, -1) + 1
+                result = await session.execute(
+                    update(ConversationContext.__table__)
+                    .where(ConversationContext.id == context_id)
+                    .values({
+                        ConversationContext.message_count: case(
+                            (ConversationContext.message_count > floor, ConversationContext.message_count),
+                            else_=floor
+                        ) + count,
+                        ConversationContext.last_message_at: created_at
+                    })
+                    .returning(ConversationContext.message_count)
+                )
+                end = result.scalar_one_or_none()
+                if end is not None:
+                    next_sequence[context_id] = end - count
+
+            rows = []
+            for record in records:
+                context_id = record["context_id"]
+                if context_id not in next_sequence:
+                    continue
+                sequence = record.get("sequence")
+                if sequence is None:
+                    sequence = next_sequence[context_id]
+                    next_sequence[context_id] += 1
+                rows.append({
+                    "context_id": context_id,
+                    "role": record["role"],
+                    "content": record["content"],
+                    "function_call_id": record.get("function_call_id"),
+                    "sequence": sequence,
+                    "created_at": record.get("created_at") or created_at,
+                })
+            if rows:
+                await session.execute(insert(ContextMessage.__table__), rows)
+            await session.commit()
+        return rows
+
+    async def get_messages_by_context(self, context_id: int):
         """Obtém todas as mensagens de um contexto específico"""
-        with self.db.get_session() as session:
-            return session.query(ContextMessage).filter(
-                ContextMessage.context_id == context_id
-            ).order_by(ContextMessage.sequence).all()
-    
-    def add_document(self, 
-                    context_id: int, 
-                    filename: str, 
-                    content_type: str, 
-                    data: bytes, 
+        async with self.db.session() as session:
+            result = await session.execute(
+                select(ContextMessage)
+                .where(ContextMessage.context_id == context_id)
+                .order_by(ContextMessage.sequence)
+            )
+            return list(result.scalars().all())
+
+    async def get_recent_messages(self, context_id: int, limit: int):
+        """Obtém as mensagens mais recentes de um contexto, sem carregar o histórico inteiro"""
+        async with self.db.session() as session:
+            result = await session.execute(
+                select(ContextMessage)
+                .where(ContextMessage.context_id == context_id)
+                .order_by(ContextMessage.sequence.desc())
+                .limit(limit)
+            )
+            return list(reversed(result.scalars().all()))
+
+    async def add_document(self,
+                    context_id: int,
+                    filename: str,
+                    content_type: str,
+                    data: bytes,
                     metadata: Optional[Dict[str, Any]] = None):
         """Adiciona um documento ao contexto"""
-        with self.db.get_session() as session:
+        # Os bytes vão para o armazenamento endereçado por conteúdo; o banco guarda só o hash
+        content_hash = await asyncio.to_thread(self.document_store.put, data)
+        async with self.db.session() as session:
             document = ContextDocument(
                 context_id=context_id,
                 filename=filename,
                 content_type=content_type,
-                data=data,
-                metadata=metadata
+                content_hash=content_hash,
+                size=len(data),
+                document_metadata=json.dumps(metadata) if metadata else None
             )
             session.add(document)
-            session.commit()
-            session.refresh(document)
+            await session.commit()
             return document
-    
-    def get_documents_by_context(self, context_id: int):
+
+    async def add_documents(self, records: List[Dict[str, Any]]) -> int:
+        """Adiciona vários documentos numa única transação"""
+        if not records:
+            return 0
+        hashes = await asyncio.to_thread(
+            lambda: [self.document_store.put(record["data"]) for record in records]
+        )
+        async with self.db.session() as session:
+            session.add_all([
+                ContextDocument(
+                    context_id=record["context_id"],
+                    filename=record["filename"],
+                    content_type=record["content_type"],
+                    content_hash=content_hash,
+                    size=len(record["data"]),
+                    document_metadata=json.dumps(record["metadata"]) if record.get("metadata") else None
+                )
+                for record, content_hash in zip(records, hashes)
+            ])
+            await session.commit()
+        return len(records)
+
+    async def get_documents_by_context(self, context_id: int):
         """Obtém todos os documentos de um contexto específico"""
-        with self.db.get_session() as session:
-            return session.query(ContextDocument).filter(
-                ContextDocument.context_id == context_id
-            ).all()
-    
-    def delete_context(self, context_id: int) -> bool:
+        async with self.db.session() as session:
+            result = await session.execute(
+                select(ContextDocument).where(ContextDocument.context_id == context_id)
+            )
+            return list(result.scalars().all())
+
+    async def delete_context(self, context_id: int) -> bool:
         """Exclui um contexto e todos os seus dados relacionados"""
-        with self.db.get_session() as session:
-            context = session.query(ConversationContext).filter(
-                ConversationContext.id == context_id
-            ).first()
+        async with self.db.session() as session:
+            # Carrega as mensagens e documentos junto: o cascade não pode fazer lazy load em sessão assíncrona
+            context = await session.get(
+                ConversationContext,
+                context_id,
+                options=[selectinload(ConversationContext.messages), selectinload(ConversationContext.documents)]
+            )
             if not context:
                 return False
-            
-            session.delete(context)
-            session.commit()
-            return True
\ No newline at end of file
+
+            await session.delete(context)
+            await session.commit()
+            return True
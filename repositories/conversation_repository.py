@@ -1,20 +1,94 @@
 # repositories/conversation_repository.py
 
 from interfaces.repositories.conversation_repository_interface import IConversationRepository
-from typing import List, Dict, Any, Optional
+from interfaces.clients.database_interface import IAsyncDatabase
+from database.models import ConversationMessage
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+from typing import List, Dict, Any, Optional, Tuple
+from utils.metrics import metrics
+from utils.sizeof import deep_sizeof
+import asyncio
+import atexit
+import hashlib
 import json
 import os
+import sys
+import threading
 import datetime
+from collections import OrderedDict
 
 class InMemoryConversationRepository(IConversationRepository):
     """
     Implementação em memória do repositório de conversas.
+    
+    - O uso de memória é medido em bytes (utils/sizeof) e limitado por `max_bytes`;
+      acima do limite, as sessões usadas há mais tempo vão para `spill` (um repositório
+      em disco) e voltam para a memória no próximo acesso.
+    - Quando o histórico salvo é um prefixo do novo, só as mensagens novas são
+      acrescentadas: as mensagens são compartilhadas com quem salvou, sem cópia da lista.
+    - As sessões despejadas são gravadas no disco em ordem (uma de cada vez, fora do
+      event loop); até a gravação terminar, voltam para a memória sem ler o disco.
+    - `get_history` devolve uma tupla, para que quem lê não altere o histórico guardado.
     """
     
-    def __init__(self):
-        self._conversations = {}  # session_id -> history
+    def __init__(self, max_bytes: Optional[int] = None, spill: Optional["FileSystemConversationRepository"] = None):
+        self.max_bytes = max_bytes
+        self.spill = spill
+        self._conversations: OrderedDict[str, List[Dict[str, Any]]] = OrderedDict()  # session_id -> history
+        self._message_bytes: Dict[str, int] = {}
+        self._bytes = 0
+        # Sessões despejadas cuja gravação no disco ainda não terminou
+        self._spilling: Dict[str, List[Dict[str, Any]]] = {}
+        self._spill_lock = asyncio.Lock()
+    
+    def _session_bytes(self, session_id: str) -> int:
+        return sys.getsizeof(self._conversations[session_id]) + self._message_bytes[session_id]
+    
+    def _release(self, session_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Tira a sessão da memória (e da contagem de bytes), retornando o histórico."""
+        if session_id not in self._conversations:
+            return None
+        self._bytes -= self._session_bytes(session_id)
+        del self._message_bytes[session_id]
+        return self._conversations.pop(session_id)
+    
+    async def _store(self, session_id: str, history: List[Dict[str, Any]], message_bytes: int) -> None:
+        self._conversations[session_id] = history
+        self._message_bytes[session_id] = message_bytes
+        self._conversations.move_to_end(session_id)
+        self._bytes += self._session_bytes(session_id)
+        await self._evict()
     
-    def save_history(self, session_id: str, history: List[Dict[str, Any]]) -> bool:
+    async def _evict(self) -> None:
+        """Move as sessões menos usadas para o disco até caber em `max_bytes` (mantém a atual)."""
+        evicted = []
+        while self.max_bytes is not None and self._bytes > self.max_bytes and len(self._conversations) > 1:
+            session_id = next(iter(self._conversations))
+            history = self._release(session_id)
+            if self.spill is not None:
+                self._spilling[session_id] = history
+                evicted.append((session_id, history))
+            else:
+                metrics.increment("conversation_memory_drops")
+        metrics.set_gauge("conversation_memory_bytes", self._bytes)
+        
+        for session_id, history in evicted:
+            # Uma gravação por vez, na ordem dos despejos: uma versão antiga da sessão
+            # nunca sobrescreve uma mais nova
+            async with self._spill_lock:
+                # Sessão que voltou para a memória ou foi limpa enquanto esperava: nada a gravar
+                if self._spilling.get(session_id) is not history:
+                    continue
+                try:
+                    # O repositório em disco só acrescenta o sufixo novo e adia o fsync
+                    await self.spill.save_history(session_id, history)
+                    metrics.increment("conversation_memory_spills")
+                finally:
+                    if self._spilling.get(session_id) is history:
+                        del self._spilling[session_id]
+    
+    async def save_history(self, session_id: str, history: List[Dict[str, Any]]) -> bool:
         """
         Salva o histórico de conversas para uma sessão específica.
         
@@ -26,27 +100,75 @@ class InMemoryConversationRepository(IConversationRepository):
             True se o histórico foi salvo com sucesso, False caso contrário
         """
         try:
-            # Cria uma cópia para evitar problemas de referência
-            self._conversations[session_id] = history.copy()
+            stored = self._conversations.get(session_id)
+            count = len(stored) if stored else 0
+            if stored and count <= len(history) and history[count - 1] == stored[-1]:
+                return await self.append_messages(session_id, history[count:])
+            # A lista fica com o repositório; as mensagens são compartilhadas com quem salvou
+            history = list(history)
+            self._release(session_id)
+            self._spilling.pop(session_id, None)
+            await self._store(session_id, history, sum(deep_sizeof(message) for message in history))
+            return True
+        except Exception:
+            return False
+    
+    async def append_messages(self, session_id: str, messages: List[Dict[str, Any]]) -> bool:
+        """
+        Acrescenta mensagens ao histórico da sessão (recarregando-a do disco se preciso).
+        """
+        try:
+            if session_id not in self._conversations:
+                await self._reload(session_id)
+            message_bytes = self._message_bytes.get(session_id, 0)
+            history = self._release(session_id) or []
+            history.extend(messages)
+            await self._store(session_id, history, message_bytes + sum(deep_sizeof(message) for message in messages))
             return True
         except Exception:
             return False
     
-    def get_history(self, session_id: str) -> Optional[List[Dict[str, Any]]]:
+    async def _reload(self, session_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Traz de volta para a memória uma sessão que foi para o disco."""
+        pending = self._spilling.pop(session_id, None)
+        if pending is not None:
+            # Ainda sendo gravada no disco: volta da memória (numa lista nova, que a
+            # gravação em andamento continua lendo a antiga)
+            history = list(pending)
+            await self._store(session_id, history, sum(deep_sizeof(message) for message in history))
+            return history
+        if self.spill is None:
+            return None
+        history = await self.spill.get_history(session_id)
+        # Outra chamada pode ter salvo a sessão enquanto o disco era lido
+        if history is None or session_id in self._conversations:
+            return self._conversations.get(session_id, history)
+        metrics.increment("conversation_memory_reloads")
+        await self._store(session_id, history, sum(deep_sizeof(message) for message in history))
+        return history
+    
+    async def get_history(self, session_id: str, limit: Optional[int] = None) -> Optional[Tuple[Dict[str, Any], ...]]:
         """
         Recupera o histórico de conversas para uma sessão específica.
         
         Args:
             session_id: O ID da sessão
+            limit: Se informado, só as `limit` mensagens mais recentes
             
         Returns:
-            O histórico de conversas se encontrado, None caso contrário
+            O histórico (somente leitura) se encontrado, None caso contrário
         """
         history = self._conversations.get(session_id)
-        # Retorna uma cópia para evitar problemas de referência
-        return history.copy() if history else None
+        if history is None:
+            history = await self._reload(session_id)
+        else:
+            self._conversations.move_to_end(session_id)
+        # Tupla: quem lê não consegue alterar a lista guardada (as mensagens são as mesmas)
+        if not history:
+            return None
+        return tuple(history[-limit:] if limit else history)
     
-    def clear_history(self, session_id: str) -> bool:
+    async def clear_history(self, session_id: str) -> bool:
         """
         Limpa o histórico de conversas para uma sessão específica.
         
@@ -56,223 +178,647 @@ class InMemoryConversationRepository(IConversationRepository):
         Returns:
             True se o histórico foi limpo com sucesso, False caso contrário
         """
-        if session_id in self._conversations:
-            del self._conversations[session_id]
-            return True
-        return False
+        found = self._release(session_id) is not None
+        if found:
+            metrics.set_gauge("conversation_memory_bytes", self._bytes)
+        found = self._spilling.pop(session_id, None) is not None or found
+        if self.spill is not None:
+            # Espera uma gravação da sessão em andamento, para não ressuscitá-la depois
+            async with self._spill_lock:
+                if session_id in await self.spill.list_sessions():
+                    await self.spill.clear_history(session_id)
+                    found = True
+        return found
     
-    def list_sessions(self) -> List[str]:
+    async def list_sessions(self) -> List[str]:
         """
-        Lista todas as sessões de conversa disponíveis.
+        Lista todas as sessões de conversa disponíveis (em memória e no disco).
         
         Returns:
             Uma lista com os IDs de todas as sessões disponíveis
         """
-        return list(self._conversations.keys())
+        sessions = list(self._conversations.keys()) + list(self._spilling.keys())
+        if self.spill is not None:
+            in_memory = set(sessions)
+            sessions += [session_id for session_id in await self.spill.list_sessions() if session_id not in in_memory]
+        return sessions
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._conversations),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
 
 
 class FileSystemConversationRepository(IConversationRepository):
     """
     Implementação em sistema de arquivos do repositório de conversas.
-    Salva as conversas em arquivos JSON no disco.
+    Cada sessão é um log JSONL só de acréscimo ({safe_id}.jsonl, uma mensagem por linha):
+    - save_history acrescenta só as mensagens novas quando o histórico salvo é um prefixo
+      do novo (conferido pela última mensagem salva); caso contrário grava um marcador de
+      reinício, que também identifica a sessão, seguido do histórico inteiro.
+    - O fsync é feito em lote por uma thread de fundo a cada `fsync_interval` segundos,
+      que também persiste o índice e compacta os logs com muitas linhas mortas.
+    - O índice (index.json) guarda sessões, contagens e o tamanho de cada log, então
+      list_sessions não lista o diretório e get_history(limit) lê só o fim do arquivo.
+    O acesso ao disco roda em threads para não bloquear o event loop.
     """
     
-    def __init__(self, storage_dir="./data/conversations"):
+    INDEX_FILE = "index.json"
+    RESET_MARKER = {"__reset__": True}
+    # Compacta quando há ao menos COMPACT_MIN_DEAD linhas mortas e elas superam as vivas
+    COMPACT_MIN_DEAD = 64
+    TAIL_BLOCK_SIZE = 64 * 1024
+    
+    def __init__(self, storage_dir="./data/conversations", fsync_interval: float = 1.0):
         # Cria o diretório de armazenamento se não existir
         self.storage_dir = storage_dir
+        self.fsync_interval = fsync_interval
         os.makedirs(storage_dir, exist_ok=True)
+        
+        self._index_lock = threading.Lock()
+        self._session_locks: Dict[str, threading.Lock] = {}
+        self._dirty_files: set = set()
+        self._index_dirty = False
+        self._index: Dict[str, Dict[str, Any]] = self._load_index()
+        
+        self._stop = threading.Event()
+        self._worker = threading.Thread(target=self._background_loop, name="conversation-log-sync", daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
     
-    def _get_file_path(self, session_id: str) -> str:
+    def _get_file_name(self, session_id: str) -> str:
         """
-        Obtém o caminho do arquivo para uma sessão específica.
+        Obtém o nome do arquivo de log para uma sessão específica.
         """
         # Sanitiza o session_id para garantir que seja um nome de arquivo válido
         safe_id = ''.join(c if c.isalnum() else '_' for c in session_id)
-        return os.path.join(self.storage_dir, f"{safe_id}.json")
+        return f"{safe_id}.jsonl"
+    
+    def _path(self, file_name: str) -> str:
+        return os.path.join(self.storage_dir, file_name)
+    
+    def _session_lock(self, session_id: str) -> threading.Lock:
+        with self._index_lock:
+            lock = self._session_locks.get(session_id)
+            if lock is None:
+                lock = self._session_locks[session_id] = threading.Lock()
+            return lock
+    
+    @staticmethod
+    def _fingerprint(message: Dict[str, Any]) -> str:
+        raw = json.dumps(message, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+    
+    @staticmethod
+    def _encode(message: Dict[str, Any]) -> str:
+        return json.dumps(message, ensure_ascii=False, default=str) + "\n"
     
-    def save_history(self, session_id: str, history: List[Dict[str, Any]]) -> bool:
+    # --- Índice -----------------------------------------------------------------
+    
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
         """
-        Salva o histórico de conversas para uma sessão específica em um arquivo JSON.
+        Carrega o índice e confere o tamanho de cada log; logs que cresceram depois da
+        última gravação do índice (queda do processo) são relidos. Sem índice, reconstrói
+        a partir do diretório, convertendo os arquivos .json do formato antigo.
         """
+        index_path = self._path(self.INDEX_FILE)
+        index: Dict[str, Dict[str, Any]] = {}
         try:
-            file_path = self._get_file_path(session_id)
-            
-            # Adiciona timestamp à conversa para rastreamento
-            metadata = {
-                "session_id": session_id,
-                "last_updated": datetime.datetime.now().isoformat(),
-                "message_count": len(history)
-            }
-            
-            data_to_save = {
-                "metadata": metadata,
-                "history": history
-            }
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data_to_save, f, ensure_ascii=False, indent=2)
-                
+            with open(index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return self._rebuild_index()
+        except Exception as e:
+            print(f"Erro ao ler índice de conversas, reconstruindo: {str(e)}")
+            return self._rebuild_index()
+        
+        for session_id, entry in list(index.items()):
+            path = self._path(entry["file"])
+            if not os.path.exists(path):
+                del index[session_id]
+            elif os.path.getsize(path) != entry.get("size"):
+                index[session_id] = self._scan_log(entry["file"])
+        return index
+    
+    def _rebuild_index(self) -> Dict[str, Dict[str, Any]]:
+        index: Dict[str, Dict[str, Any]] = {}
+        for filename in os.listdir(self.storage_dir):
+            try:
+                if filename.endswith(".json") and filename != self.INDEX_FILE:
+                    session_id, entry = self._convert_legacy(filename)
+                    index[session_id] = entry
+                elif filename.endswith(".jsonl"):
+                    entry = self._scan_log(filename)
+                    index[entry["session_id"]] = entry
+            except Exception as e:
+                print(f"Erro ao indexar {filename}: {str(e)}")
+        self._index_dirty = True
+        return index
+    
+    def _scan_log(self, file_name: str) -> Dict[str, Any]:
+        """
+        Relê um log inteiro para recalcular a entrada do índice. Descarta uma última
+        linha incompleta, deixada por uma gravação interrompida.
+        """
+        path = self._path(file_name)
+        with open(path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                data = data[:data.rfind(b"\n") + 1]
+                f.truncate(len(data))
+        
+        lines = data.decode("utf-8").splitlines()
+        session_id = file_name[:-len(".jsonl")]
+        history: List[Dict[str, Any]] = []
+        for line in lines:
+            record = json.loads(line)
+            if record.get("__reset__"):
+                session_id = record.get("session_id", session_id)
+                history = []
+            else:
+                history.append(record)
+        return self._entry(session_id, file_name, len(history), len(lines), len(data), history[-1] if history else None)
+    
+    def _convert_legacy(self, file_name: str):
+        """Converte um arquivo .json do formato antigo ({metadata, history}) para JSONL."""
+        with open(self._path(file_name), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        session_id = data.get("metadata", {}).get("session_id") or file_name[:-len(".json")]
+        history = data.get("history", [])
+        entry = self._write_compacted(session_id, self._get_file_name(session_id), history)
+        os.remove(self._path(file_name))
+        return session_id, entry
+    
+    def _entry(self, session_id, file_name, count, lines, size, last) -> Dict[str, Any]:
+        return {
+            "session_id": session_id,
+            "file": file_name,
+            "count": count,
+            "lines": lines,
+            "size": size,
+            "tail": self._fingerprint(last) if last is not None else None,
+            "last_updated": datetime.datetime.now().isoformat()
+        }
+    
+    def _persist_index(self) -> None:
+        with self._index_lock:
+            if not self._index_dirty:
+                return
+            snapshot = json.dumps(self._index, ensure_ascii=False)
+            self._index_dirty = False
+        index_path = self._path(self.INDEX_FILE)
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(snapshot)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, index_path)
+    
+    # --- Escrita ----------------------------------------------------------------
+    
+    def _append_lines(self, session_id: str, entry: Optional[Dict[str, Any]], messages: List[Dict[str, Any]], reset: bool) -> None:
+        """Acrescenta mensagens ao log (precedidas do marcador de reinício se `reset`)."""
+        file_name = entry["file"] if entry else self._get_file_name(session_id)
+        payload = "".join(self._encode(message) for message in messages)
+        if reset:
+            payload = self._encode({**self.RESET_MARKER, "session_id": session_id}) + payload
+        encoded = payload.encode("utf-8")
+        with open(self._path(file_name), 'ab') as f:
+            f.write(encoded)
+        
+        count = 0 if reset or entry is None else entry["count"]
+        lines = entry["lines"] if entry else 0
+        size = entry["size"] if entry else 0
+        new_entry = self._entry(
+            session_id, file_name,
+            count + len(messages),
+            lines + len(messages) + (1 if reset else 0),
+            size + len(encoded),
+            messages[-1] if messages else None
+        )
+        if not messages and entry and not reset:
+            new_entry["tail"] = entry["tail"]
+        with self._index_lock:
+            self._index[session_id] = new_entry
+            self._dirty_files.add(file_name)
+            self._index_dirty = True
+    
+    def _write_compacted(self, session_id: str, file_name: str, history: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Regrava o log só com o histórico vivo (arquivo temporário + os.replace)."""
+        payload = (
+            self._encode({**self.RESET_MARKER, "session_id": session_id})
+            + "".join(self._encode(message) for message in history)
+        ).encode("utf-8")
+        path = self._path(file_name)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return self._entry(session_id, file_name, len(history), len(history) + 1, len(payload), history[-1] if history else None)
+    
+    async def save_history(self, session_id: str, history: List[Dict[str, Any]]) -> bool:
+        return await asyncio.to_thread(self._save_history, session_id, history)
+
+    def _save_history(self, session_id: str, history: List[Dict[str, Any]]) -> bool:
+        """
+        Salva o histórico de conversas para uma sessão específica.
+        Se a última mensagem já salva coincide com a mensagem de mesma posição em
+        `history`, só o sufixo novo é acrescentado ao log.
+        """
+        try:
+            with self._session_lock(session_id):
+                entry = self._index.get(session_id)
+                count = entry["count"] if entry else 0
+                if entry and 0 < count <= len(history) and self._fingerprint(history[count - 1]) == entry["tail"]:
+                    if len(history) > count:
+                        self._append_lines(session_id, entry, history[count:], reset=False)
+                else:
+                    self._append_lines(session_id, entry, history, reset=True)
             return True
         except Exception as e:
             print(f"Erro ao salvar histórico: {str(e)}")
             return False
     
-    def get_history(self, session_id: str) -> Optional[List[Dict[str, Any]]]:
+    async def append_messages(self, session_id: str, messages: List[Dict[str, Any]]) -> bool:
+        return await asyncio.to_thread(self._append_messages, session_id, messages)
+    
+    def _append_messages(self, session_id: str, messages: List[Dict[str, Any]]) -> bool:
         """
-        Recupera o histórico de conversas para uma sessão específica de um arquivo JSON.
+        Acrescenta mensagens ao fim do log da sessão, sem ler o histórico.
         """
-        file_path = self._get_file_path(session_id)
-        
-        if not os.path.exists(file_path):
+        if not messages:
+            return True
+        try:
+            with self._session_lock(session_id):
+                entry = self._index.get(session_id)
+                self._append_lines(session_id, entry, messages, reset=entry is None)
+            return True
+        except Exception as e:
+            print(f"Erro ao salvar histórico: {str(e)}")
+            return False
+    
+    # --- Leitura ----------------------------------------------------------------
+    
+    async def get_history(self, session_id: str, limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        return await asyncio.to_thread(self._get_history, session_id, limit)
+
+    def _get_history(self, session_id: str, limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Recupera o histórico de conversas para uma sessão específica.
+        Com `limit`, lê o log de trás para frente em blocos até juntar as mensagens
+        pedidas ou encontrar o último marcador de reinício.
+        """
+        if session_id not in self._index:
             return None
-            
+        
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get("history", [])
+            with self._session_lock(session_id):
+                entry = self._index.get(session_id)
+                if entry is None:
+                    return None
+                wanted = min(limit, entry["count"]) if limit else entry["count"]
+                lines = self._read_tail(entry["file"], entry["size"], wanted)
         except Exception as e:
             print(f"Erro ao ler histórico: {str(e)}")
             return None
+        
+        history: List[Dict[str, Any]] = []
+        for line in reversed(lines):
+            record = json.loads(line)
+            if record.get("__reset__"):
+                break
+            history.append(record)
+            if len(history) == wanted:
+                break
+        history.reverse()
+        return history
     
-    def clear_history(self, session_id: str) -> bool:
+    def _read_tail(self, file_name: str, size: int, wanted: int) -> List[bytes]:
         """
-        Remove o arquivo de histórico para uma sessão específica.
+        Lê as linhas finais do log (até `size`, o tamanho conhecido pelo índice) até ter
+        `wanted` mensagens ou alcançar um marcador de reinício.
         """
-        file_path = self._get_file_path(session_id)
-        
-        if os.path.exists(file_path):
+        lines: List[bytes] = []
+        pending = b""
+        position = size
+        with open(self._path(file_name), 'rb') as f:
+            while position > 0:
+                step = min(self.TAIL_BLOCK_SIZE, position)
+                position -= step
+                f.seek(position)
+                chunk = f.read(step) + pending
+                parts = chunk.split(b"\n")
+                # A primeira parte pode ser uma linha cortada pelo início do bloco
+                pending = parts[0] if position > 0 else b""
+                block_lines = [part for part in (parts[1:] if position > 0 else parts) if part]
+                lines = block_lines + lines
+                if len(lines) > wanted or any(b'"__reset__"' in line for line in block_lines):
+                    break
+        return lines
+    
+    # --- Remoção e listagem -----------------------------------------------------
+    
+    async def clear_history(self, session_id: str) -> bool:
+        return await asyncio.to_thread(self._clear_history, session_id)
+
+    def _clear_history(self, session_id: str) -> bool:
+        """
+        Remove o log e a entrada do índice para uma sessão específica.
+        """
+        try:
+            with self._session_lock(session_id):
+                with self._index_lock:
+                    entry = self._index.pop(session_id, None)
+                    self._index_dirty = True
+                    if entry:
+                        self._dirty_files.discard(entry["file"])
+                if entry and os.path.exists(self._path(entry["file"])):
+                    os.remove(self._path(entry["file"]))
+            return True  # Se o arquivo não existe, consideramos que a limpeza foi bem-sucedida
+        except Exception as e:
+            print(f"Erro ao remover histórico: {str(e)}")
+            return False
+    
+    async def list_sessions(self) -> List[str]:
+        """
+        Lista as sessões a partir do índice em memória, sem acessar o disco.
+        """
+        with self._index_lock:
+            return list(self._index.keys())
+    
+    # --- Manutenção em segundo plano --------------------------------------------
+    
+    def _background_loop(self) -> None:
+        while not self._stop.wait(self.fsync_interval):
             try:
-                os.remove(file_path)
-                return True
+                self._sync()
+                self._compact()
             except Exception as e:
-                print(f"Erro ao remover histórico: {str(e)}")
-                return False
-        return True  # Se o arquivo não existe, consideramos que a limpeza foi bem-sucedida
+                print(f"Erro na manutenção dos logs de conversa: {str(e)}")
+    
+    def _sync(self) -> None:
+        """fsync em lote dos logs alterados desde a última rodada, depois o índice."""
+        with self._index_lock:
+            dirty, self._dirty_files = self._dirty_files, set()
+        for file_name in dirty:
+            try:
+                with open(self._path(file_name), 'ab') as f:
+                    os.fsync(f.fileno())
+            except FileNotFoundError:
+                pass
+        self._persist_index()
     
-    def list_sessions(self) -> List[str]:
+    def _compact(self) -> None:
+        """Regrava os logs cujas linhas mortas (históricos substituídos) superam as vivas."""
+        with self._index_lock:
+            candidates = [
+                session_id for session_id, entry in self._index.items()
+                if entry["lines"] - entry["count"] >= max(self.COMPACT_MIN_DEAD, entry["count"])
+            ]
+        for session_id in candidates:
+            before = self._index.get(session_id)
+            history = self._get_history(session_id)
+            if history is None:
+                continue
+            with self._session_lock(session_id):
+                entry = self._index.get(session_id)
+                # Descarta a compactação se a sessão mudou depois da leitura
+                if entry is None or entry is not before:
+                    continue
+                new_entry = self._write_compacted(session_id, entry["file"], history)
+                with self._index_lock:
+                    self._index[session_id] = new_entry
+                    self._index_dirty = True
+    
+    def close(self) -> None:
         """
-        Lista todas as sessões de conversa disponíveis com base nos arquivos no diretório.
+        Para a thread de manutenção e garante fsync dos logs e do índice.
         """
-        sessions = []
-        
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._worker.join(timeout=self.fsync_interval + 1)
         try:
-            for filename in os.listdir(self.storage_dir):
-                if filename.endswith(".json"):
-                    session_id = filename[:-5]  # Remove a extensão .json
-                    sessions.append(session_id)
+            self._sync()
         except Exception as e:
-            print(f"Erro ao listar sessões: {str(e)}")
-        
-        return sessions
+            print(f"Erro ao sincronizar logs de conversa: {str(e)}")
 
 
 class DatabaseConversationRepository(IConversationRepository):
     """
     Implementação em banco de dados do repositório de conversas.
+    As mensagens de uma sessão ocupam as sequências 0..n-1 em conversation_messages;
+    o índice único (session_id, sequence) atende tanto os appends quanto as leituras
+    por faixa (paginação com `before_sequence`).
+    
+    As escritas de uma sessão são serializadas no processo (um lock por sessão); entre
+    processos, um append que perde a corrida pela sequência viola o índice único e é
+    refeito com a sequência seguinte (até `SEQUENCE_RETRIES` vezes).
     """
     
-    def __init__(self, database_client):
+    # Linhas por INSERT multi-linha (o SQLite limita as variáveis por instrução)
+    INSERT_BATCH_SIZE = 1000
+    # Novas tentativas quando outra escrita ocupou a mesma sequência
+    SEQUENCE_RETRIES = 5
+    
+    def __init__(self, database_client: IAsyncDatabase):
         self.db = database_client
+        self._session_locks: Dict[str, asyncio.Lock] = {}
     
-    def save_history(self, session_id: str, history: List[Dict[str, Any]]) -> bool:
+    def _session_lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._session_locks.get(session_id)
+        if lock is None:
+            lock = self._session_locks[session_id] = asyncio.Lock()
+        return lock
+    
+    async def _write(self, session_id: str, operation) -> None:
+        """Roda `operation(session)` numa transação, refazendo-a se a sequência já foi ocupada."""
+        async with self._session_lock(session_id):
+            for attempt in range(self.SEQUENCE_RETRIES + 1):
+                try:
+                    async with self.db.session() as session:
+                        await operation(session)
+                        await session.commit()
+                    return
+                except IntegrityError:
+                    if attempt == self.SEQUENCE_RETRIES:
+                        raise
+                    metrics.increment("conversation_sequence_conflicts")
+    
+    @staticmethod
+    def _rows(session_id: str, messages: List[Dict[str, Any]], start: int) -> List[Dict[str, Any]]:
+        now = datetime.datetime.now()
+        return [
+            {
+                "session_id": session_id,
+                "sequence": start + i,
+                "role": message.get("role", "unknown"),
+                "content": json.dumps(message.get("content", "")),
+                "created_at": now
+            }
+            for i, message in enumerate(messages)
+        ]
+    
+    async def _insert(self, session, rows: List[Dict[str, Any]]) -> None:
+        """Um INSERT multi-linha por lote de INSERT_BATCH_SIZE mensagens."""
+        for start in range(0, len(rows), self.INSERT_BATCH_SIZE):
+            await session.execute(insert(ConversationMessage).values(rows[start:start + self.INSERT_BATCH_SIZE]))
+    
+    async def _last_message(self, session, session_id: str):
+        result = await session.execute(
+            select(ConversationMessage.sequence, ConversationMessage.role, ConversationMessage.content)
+            .where(ConversationMessage.session_id == session_id)
+            .order_by(ConversationMessage.sequence.desc())
+            .limit(1)
+        )
+        return result.first()
+    
+    async def save_history(self, session_id: str, history: List[Dict[str, Any]]) -> bool:
         """
         Salva o histórico de conversas para uma sessão específica no banco de dados.
         
-        Esta implementação é apenas um esboço e precisa ser adaptada para o seu ORM
-        ou camada de acesso a dados específica.
+        Se a última mensagem gravada coincide com a de mesma posição em `history`, só as
+        mensagens novas são inseridas; caso contrário o histórico da sessão é regravado.
         """
-        try:
-            with self.db.get_session() as session:
-                # Limpa o histórico existente
-                session.execute(
-                    "DELETE FROM conversation_messages WHERE session_id = :session_id",
-                    {"session_id": session_id}
-                )
-                
-                # Insere as novas mensagens
-                for i, message in enumerate(history):
-                    session.execute(
-                        """
-                        INSERT INTO conversation_messages 
-                        (session_id, sequence, role, content, created_at)
-                        VALUES (:session_id, :sequence, :role, :content, :created_at)
-                        """,
-                        {
-                            "session_id": session_id,
-                            "sequence": i,
-                            "role": message.get("role", "unknown"),
-                            "content": json.dumps(message.get("content", "")),
-                            "created_at": datetime.datetime.now()
-                        }
+        async def save(session) -> None:
+            last = await self._last_message(session, session_id)
+            count = last.sequence + 1 if last else 0
+            if last and count <= len(history) and (last.role, last.content) == (
+                history[count - 1].get("role", "unknown"),
+                json.dumps(history[count - 1].get("content", ""))
+            ):
+                rows = self._rows(session_id, history[count:], count)
+            else:
+                # O histórico mudou antes do fim: regrava a sessão
+                if last:
+                    await session.execute(
+                        delete(ConversationMessage).where(ConversationMessage.session_id == session_id)
                     )
-                
-                session.commit()
-                return True
+                rows = self._rows(session_id, history, 0)
+            
+            if rows:
+                await self._insert(session, rows)
+        
+        try:
+            await self._write(session_id, save)
+            return True
         except Exception as e:
             print(f"Erro ao salvar histórico no banco de dados: {str(e)}")
             return False
     
-    def get_history(self, session_id: str) -> Optional[List[Dict[str, Any]]]:
+    async def append_messages(self, session_id: str, messages: List[Dict[str, Any]]) -> bool:
+        """
+        Acrescenta mensagens ao fim do histórico da sessão com um INSERT multi-linha,
+        sem ler o histórico (só a última sequência, pelo índice).
+        """
+        if not messages:
+            return True
+        async def append(session) -> None:
+            last = await self._last_message(session, session_id)
+            await self._insert(session, self._rows(session_id, messages, last.sequence + 1 if last else 0))
+        
+        try:
+            await self._write(session_id, append)
+            return True
+        except Exception as e:
+            print(f"Erro ao salvar histórico no banco de dados: {str(e)}")
+            return False
+    
+    async def _fetch(self, session_id: str, limit: Optional[int], before_sequence: Optional[int]):
+        """Mensagens da sessão em ordem, as `limit` mais recentes antes de `before_sequence`."""
+        query = select(
+            ConversationMessage.sequence, ConversationMessage.role, ConversationMessage.content
+        ).where(ConversationMessage.session_id == session_id)
+        if before_sequence is not None:
+            query = query.where(ConversationMessage.sequence < before_sequence)
+        if limit:
+            query = query.order_by(ConversationMessage.sequence.desc()).limit(limit)
+        else:
+            query = query.order_by(ConversationMessage.sequence.asc())
+        
+        async with self.db.session() as session:
+            rows = (await session.execute(query)).all()
+        return rows[::-1] if limit else rows
+    
+    @staticmethod
+    def _to_message(row) -> Dict[str, Any]:
+        content = row.content
+        try:
+            # Tenta desserializar o conteúdo se for JSON
+            content = json.loads(content)
+        except (TypeError, ValueError):
+            pass
+        return {"role": row.role, "content": content}
+    
+    async def get_history(
+        self,
+        session_id: str,
+        limit: Optional[int] = None,
+        before_sequence: Optional[int] = None
+    ) -> Optional[List[Dict[str, Any]]]:
         """
         Recupera o histórico de conversas para uma sessão específica do banco de dados.
+        
+        Args:
+            session_id: O ID da sessão
+            limit: Se informado, só as `limit` mensagens mais recentes
+            before_sequence: Se informado, só mensagens com sequência menor (página anterior)
         """
         try:
-            with self.db.get_session() as session:
-                result = session.execute(
-                    """
-                    SELECT role, content 
-                    FROM conversation_messages 
-                    WHERE session_id = :session_id 
-                    ORDER BY sequence ASC
-                    """,
-                    {"session_id": session_id}
-                )
-                
-                history = []
-                for row in result:
-                    content = row[1]
-                    try:
-                        # Tenta desserializar o conteúdo se for JSON
-                        content = json.loads(content)
-                    except:
-                        pass
-                        
-                    history.append({
-                        "role": row[0],
-                        "content": content
-                    })
-                
-                return history if history else None
+            rows = await self._fetch(session_id, limit, before_sequence)
+            history = [self._to_message(row) for row in rows]
+            return history if history else None
         except Exception as e:
             print(f"Erro ao recuperar histórico do banco de dados: {str(e)}")
             return None
     
-    def clear_history(self, session_id: str) -> bool:
+    async def get_history_page(
+        self,
+        session_id: str,
+        limit: int,
+        before_sequence: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Página do histórico, da mais recente para trás.
+        
+        Returns:
+            (mensagens em ordem, before_sequence da página anterior ou None se esta é a primeira)
+        """
+        try:
+            rows = await self._fetch(session_id, limit, before_sequence)
+        except Exception as e:
+            print(f"Erro ao recuperar histórico do banco de dados: {str(e)}")
+            return [], None
+        previous = rows[0].sequence if rows and rows[0].sequence > 0 else None
+        return [self._to_message(row) for row in rows], previous
+    
+    async def clear_history(self, session_id: str) -> bool:
         """
         Limpa o histórico de conversas para uma sessão específica no banco de dados.
         """
         try:
-            with self.db.get_session() as session:
-                session.execute(
-                    "DELETE FROM conversation_messages WHERE session_id = :session_id",
-                    {"session_id": session_id}
+            async with self.db.session() as session:
+                await session.execute(
+                    delete(ConversationMessage).where(ConversationMessage.session_id == session_id)
                 )
-                session.commit()
+                await session.commit()
                 return True
         except Exception as e:
             print(f"Erro ao limpar histórico no banco de dados: {str(e)}")
             return False
     
-    def list_sessions(self) -> List[str]:
+    async def list_sessions(self) -> List[str]:
         """
         Lista todas as sessões de conversa disponíveis no banco de dados.
         """
         try:
-            with self.db.get_session() as session:
-                result = session.execute(
-                    "SELECT DISTINCT session_id FROM conversation_messages"
-                )
+            async with self.db.session() as session:
+                result = await session.execute(select(ConversationMessage.session_id).distinct())
                 return [row[0] for row in result]
         except Exception as e:
             print(f"Erro ao listar sessões no banco de dados: {str(e)}")
-            return []
\ No newline at end of file
+            return []
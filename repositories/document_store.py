@@ -0,0 +1,113 @@
+# repositories/document_store.py
+
+from interfaces.repositories.document_store_interface import IDocumentStore
+from contextlib import contextmanager
+from typing import Iterator
+import gzip
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+
+HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+class FileSystemDocumentStore(IDocumentStore):
+    """
+    Armazenamento de documentos em sistema de arquivos, endereçado por SHA-256.
+    Os arquivos ficam em `<storage_dir>/<2 primeiros caracteres do hash>/<hash>`,
+    com sufixo `.gz` quando a compressão está ativada.
+    """
+
+    def __init__(self, storage_dir: str = "./data/documents", compress: bool = False):
+        self.storage_dir = storage_dir
+        self.compress = compress
+        os.makedirs(storage_dir, exist_ok=True)
+
+    def _get_file_path(self, content_hash: str, compressed: bool) -> str:
+        if not HASH_PATTERN.match(content_hash):
+            raise ValueError(f"Hash de documento inválido: {content_hash}")
+        suffix = ".gz" if compressed else ""
+        return os.path.join(self.storage_dir, content_hash[:2], f"{content_hash}{suffix}")
+
+    def _find(self, content_hash: str) -> tuple[str, bool] | None:
+        """Localiza o arquivo do documento, esteja ele comprimido ou não."""
+        for compressed in (False, True):
+            file_path = self._get_file_path(content_hash, compressed)
+            if os.path.exists(file_path):
+                return file_path, compressed
+        return None
+
+    def put(self, data: bytes | memoryview) -> str:
+        content_hash = hashlib.sha256(data).hexdigest()
+        if self._find(content_hash):
+            return content_hash  # Documento idêntico já armazenado
+
+        file_path = self._get_file_path(content_hash, self.compress)
+        directory = os.path.dirname(file_path)
+        os.makedirs(directory, exist_ok=True)
+
+        # Grava em arquivo temporário e renomeia, para nunca expor um documento pela metade
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if self.compress:
+                    with gzip.GzipFile(fileobj=f, mode="wb", mtime=0) as gz:
+                        gz.write(data)
+                else:
+                    f.write(data)
+            os.replace(tmp_path, file_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        return content_hash
+
+    def exists(self, content_hash: str) -> bool:
+        return self._find(content_hash) is not None
+
+    @contextmanager
+    def open(self, content_hash: str) -> Iterator[memoryview]:
+        found = self._find(content_hash)
+        if not found:
+            raise FileNotFoundError(f"Documento não encontrado: {content_hash}")
+        file_path, compressed = found
+
+        if compressed:
+            with gzip.open(file_path, "rb") as gz:
+                view = memoryview(gz.read())
+            try:
+                yield view
+            finally:
+                view.release()
+            return
+
+        with open(file_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield memoryview(b"")
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    yield view
+                finally:
+                    view.release()
+
+    def iter_chunks(self, content_hash: str, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        found = self._find(content_hash)
+        if not found:
+            raise FileNotFoundError(f"Documento não encontrado: {content_hash}")
+        file_path, compressed = found
+
+        opener = gzip.open if compressed else open
+        with opener(file_path, "rb") as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+
+    def delete(self, content_hash: str) -> bool:
+        found = self._find(content_hash)
+        if not found:
+            return False
+        os.remove(found[0])
+        return True
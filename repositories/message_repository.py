@@ -1,42 +1,56 @@
 # repositories/message_repository.py
 
 from interfaces.repositories.message_repository_interface import IMessageRepository
-from interfaces.clients.database_interface import IDatabase
+from interfaces.clients.database_interface import IAsyncDatabase
 from database.models.message_model import Message
+from database.models.user_model import User
+from sqlalchemy import select
 import json
 
 class MessageRepository(IMessageRepository):
-    def __init__(self, database_client: IDatabase):
+    """
+    Mensagens da tabela `messages`, que guarda o usuário (user_id) e não o telefone:
+    o telefone é resolvido em `users` (índice único), e as últimas mensagens saem do
+    índice (user_id, id).
+    """
+    def __init__(self, database_client: IAsyncDatabase):
         self.db = database_client
 
-    def all(self) -> list:
-        with self.db.get_session() as session:
-            messages = session.query(Message).all()
-            return [message for message in messages] or []
+    async def all(self) -> list:
+        async with self.db.session() as session:
+            result = await session.execute(select(Message))
+            return list(result.scalars().all())
 
-    def get_latest_customer_messages(
+    async def get_latest_customer_messages(
         self, phone: int | None = None, limit: int = 20
     ) -> list:
-        with self.db.get_session() as session:
+        async with self.db.session() as session:
             query = (
-                session.query(Message)
-                .filter_by(phone=phone)
+                select(Message)
+                .join(User, User.id == Message.user_id)
+                .where(User.phone == str(phone))
                 .order_by(Message.id.desc())
             )
 
             if limit:
                 query = query.limit(limit)
 
-            messages = query.all()
+            result = await session.execute(query)
 
-            return [message.to_dict() for message in messages] or []
+            return [message.to_dict() for message in result.scalars().all()] or []
+
+    async def create(self, phone: str, role: str, content: str | list) -> dict:
+        async with self.db.session() as session:
+            user_id = await session.scalar(select(User.id).where(User.phone == str(phone)))
+            if user_id is None:
+                raise ValueError(f"Nenhum usuário com o telefone {phone}")
 
-    def create(self, phone: str, role: str, content: str | list) -> dict:
-        with self.db.get_session() as session:
             message = Message(
-                phone=phone,
+                user_id=user_id,
                 role=role,
                 content=content if isinstance(content, str) else json.dumps(content),
             )
             session.add(message)
-            return message.to_dict()
\ No newline at end of file
+            await session.commit()
+            await session.refresh(message)
+            return message.to_dict()
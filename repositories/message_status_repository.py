@@ -0,0 +1,43 @@
+# repositories/message_status_repository.py
+
+from interfaces.repositories.message_status_repository_interface import IMessageStatusRepository
+from interfaces.clients.database_interface import IDatabase
+from database.models.message_status import MessageStatus
+from typing import List, Dict, Any, Optional
+
+FIELDS = (
+    "provider", "phone", "status", "error",
+    "queued_at", "sent_at", "delivered_at", "read_at", "failed_at"
+)
+
+class MessageStatusRepository(IMessageStatusRepository):
+    def __init__(self, database_client: IDatabase):
+        self.db = database_client
+
+    def upsert_many(self, records: List[Dict[str, Any]]) -> int:
+        if not records:
+            return 0
+        by_id = {record["provider_message_id"]: record for record in records}
+        with self.db.get_session() as session:
+            # Uma única consulta (IN pela PK) para saber quais já existem
+            existing = {
+                row.provider_message_id: row
+                for row in session.query(MessageStatus).filter(
+                    MessageStatus.provider_message_id.in_(list(by_id))
+                )
+            }
+            for provider_message_id, record in by_id.items():
+                row = existing.get(provider_message_id)
+                if row is None:
+                    row = MessageStatus(provider_message_id=provider_message_id)
+                    session.add(row)
+                for field in FIELDS:
+                    if record.get(field) is not None:
+                        setattr(row, field, record[field])
+            session.commit()
+        return len(by_id)
+
+    def get(self, provider_message_id: str) -> Optional[Dict[str, Any]]:
+        with self.db.get_session() as session:
+            row = session.get(MessageStatus, provider_message_id)
+            return row.to_dict() if row else None
@@ -0,0 +1,161 @@
+# repositories/outbox_repository.py
+
+from interfaces.repositories.outbox_repository_interface import IOutboxRepository
+from interfaces.clients.database_interface import IDatabase
+from database.models.outbound_message import OutboundMessage
+from sqlalchemy import func, update
+from typing import List, Dict, Any, Optional
+import datetime
+import json
+
+ACTIVE_STATUSES = ("pending", "in_flight")
+
+class OutboxRepository(IOutboxRepository):
+    def __init__(self, database_client: IDatabase, max_attempts: int = 8):
+        self.db = database_client
+        self.max_attempts = max_attempts
+
+    def enqueue(self, phone: str, kind: str, payload: Dict[str, Any]) -> int:
+        return self.enqueue_many(phone, kind, [payload])[0]
+
+    def enqueue_many(self, phone: str, kind: str, payloads: List[Dict[str, Any]]) -> List[int]:
+        now = datetime.datetime.now()
+        with self.db.get_session() as session:
+            messages = [
+                OutboundMessage(
+                    phone=phone,
+                    kind=kind,
+                    payload=json.dumps(payload, ensure_ascii=False),
+                    status="pending",
+                    attempts=0,
+                    next_attempt_at=now
+                )
+                for payload in payloads
+            ]
+            # Inserção uma a uma para que os IDs (ordem FIFO) sigam a ordem das partes
+            for message in messages:
+                session.add(message)
+                session.flush()
+            session.commit()
+            return [message.id for message in messages]
+
+    def claim_batch(self, limit: int, lease_seconds: float) -> List[Dict[str, Any]]:
+        now = datetime.datetime.now()
+        with self.db.get_session() as session:
+            # Cabeça da fila de cada telefone (mensagem mais antiga ainda não entregue)
+            heads = (
+                session.query(OutboundMessage.phone, func.min(OutboundMessage.id).label("head_id"))
+                .filter(OutboundMessage.status.in_(ACTIVE_STATUSES))
+                .group_by(OutboundMessage.phone)
+                .subquery()
+            )
+            # Só a cabeça pendente e vencida pode sair; se ela estiver em voo, o telefone espera
+            candidates = (
+                session.query(OutboundMessage)
+                .join(heads, OutboundMessage.id == heads.c.head_id)
+                .filter(
+                    OutboundMessage.status == "pending",
+                    OutboundMessage.next_attempt_at <= now
+                )
+                .order_by(OutboundMessage.id)
+                .limit(limit)
+                .all()
+            )
+
+            claimed = []
+            locked_until = now + datetime.timedelta(seconds=lease_seconds)
+            for message in candidates:
+                attempts = message.attempts + 1
+                # Reserva atômica: outro dispatcher pode ter pego a mesma mensagem
+                result = session.execute(
+                    update(OutboundMessage)
+                    .where(OutboundMessage.id == message.id, OutboundMessage.status == "pending")
+                    .values(status="in_flight", locked_until=locked_until, attempts=attempts)
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount == 1:
+                    claimed.append({
+                        "id": message.id,
+                        "phone": message.phone,
+                        "kind": message.kind,
+                        "payload": json.loads(message.payload),
+                        "attempts": attempts,
+                        "provider": message.provider,
+                        "provider_message_id": message.provider_message_id,
+                        "created_at": message.created_at
+                    })
+            session.commit()
+            return claimed
+
+    def mark_sent(self, message_id: int, provider: Optional[str], provider_message_id: Optional[str]) -> None:
+        with self.db.get_session() as session:
+            session.execute(
+                update(OutboundMessage)
+                .where(OutboundMessage.id == message_id)
+                .values(
+                    status="sent",
+                    provider=provider,
+                    provider_message_id=provider_message_id,
+                    locked_until=None,
+                    last_error=None,
+                    sent_at=datetime.datetime.now()
+                )
+            )
+            session.commit()
+
+    def mark_retry(self, message_id: int, error: str, delay_seconds: float) -> None:
+        with self.db.get_session() as session:
+            message = session.get(OutboundMessage, message_id)
+            if not message:
+                return
+            if message.attempts >= self.max_attempts:
+                message.status = "failed"
+            else:
+                message.status = "pending"
+                message.next_attempt_at = datetime.datetime.now() + datetime.timedelta(seconds=delay_seconds)
+            message.locked_until = None
+            message.last_error = error
+            session.commit()
+
+    def mark_failed(self, message_id: int, error: str) -> None:
+        with self.db.get_session() as session:
+            session.execute(
+                update(OutboundMessage)
+                .where(OutboundMessage.id == message_id)
+                .values(status="failed", locked_until=None, last_error=error)
+            )
+            session.commit()
+
+    def requeue_failed_delivery(self, provider_message_id: str, error: str) -> Optional[int]:
+        with self.db.get_session() as session:
+            message = (
+                session.query(OutboundMessage)
+                .filter(OutboundMessage.provider_message_id == provider_message_id)
+                .first()
+            )
+            if not message or message.status != "sent" or message.attempts >= self.max_attempts:
+                return None
+            message.status = "pending"
+            message.next_attempt_at = datetime.datetime.now()
+            message.last_error = error
+            session.commit()
+            return message.id
+
+    def recover_expired(self) -> int:
+        with self.db.get_session() as session:
+            result = session.execute(
+                update(OutboundMessage)
+                .where(
+                    OutboundMessage.status == "in_flight",
+                    OutboundMessage.locked_until < datetime.datetime.now()
+                )
+                .values(status="pending", locked_until=None)
+            )
+            session.commit()
+            return result.rowcount
+
+    def pending_count(self) -> int:
+        with self.db.get_session() as session:
+            return session.query(func.count(OutboundMessage.id)).filter(
+                OutboundMessage.status.in_(ACTIVE_STATUSES)
+            ).scalar() or 0
@@ -1,4 +1,10 @@
+# repositories/user_repository.py
+
 from interfaces.repositories.user_repository_interface import IUserRepository
+from interfaces.clients.database_interface import IAsyncDatabase
+from database.models.user_model import User
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
 
 class UserRepository(IUserRepository):
     """
@@ -7,21 +13,69 @@ class UserRepository(IUserRepository):
     """
     def __init__(self):
         self._users = {
-            "12345": {"name": "Luana", "phone": "12345"},
-            "67890": {"name": "Caroline", "phone": "67890"},
-            "cli_test": {"name": "Amigo(a)", "phone": "cli_test"}
+            "12345": {"id": 1, "name": "Luana", "phone": "12345"},
+            "67890": {"id": 2, "name": "Caroline", "phone": "67890"},
+            "cli_test": {"id": 3, "name": "Amigo(a)", "phone": "cli_test"}
         }
         print("INFO: Repositório de usuários em memória inicializado.")
 
-    def get_user_by_phone(self, phone: str) -> dict | None:
+    async def get_user_by_phone(self, phone: str) -> dict | None:
         return self._users.get(phone)
 
-    def save_user(self, phone: str, name: str) -> dict:
+    async def save_user(self, phone: str, name: str) -> dict:
         """Cria um novo usuário ou atualiza o nome de um existente."""
         if phone in self._users:
             self._users[phone]['name'] = name
         else:
-            self._users[phone] = {"name": name, "phone": phone}
+            self._users[phone] = {"id": len(self._users) + 1, "name": name, "phone": phone}
         
         print(f"INFO: Usuário salvo/atualizado: {self._users[phone]}")
-        return self._users[phone]
\ No newline at end of file
+        return self._users[phone]
+
+    async def get_or_create_user(self, phone: str, name: str = "Novo Usuário") -> dict:
+        return self._users.get(phone) or await self.save_user(phone, name)
+
+
+class DatabaseUserRepository(IUserRepository):
+    """
+    Repositório de usuários na tabela `users`. As escritas são upserts pelo telefone
+    (INSERT ... ON CONFLICT), então duas mensagens simultâneas de um número novo não
+    criam usuários duplicados nem falham pela restrição única.
+    """
+    def __init__(self, database_client: IAsyncDatabase):
+        self.db = database_client
+
+    def _insert(self, dialect: str):
+        return (postgresql if dialect == "postgresql" else sqlite).insert(User)
+
+    async def get_user_by_phone(self, phone: str) -> dict | None:
+        async with self.db.session() as session:
+            user = (await session.execute(select(User).where(User.phone == phone))).scalar_one_or_none()
+            return user.to_dict() if user else None
+
+    async def save_user(self, phone: str, name: str) -> dict:
+        """Cria um novo usuário ou atualiza o nome de um existente."""
+        async with self.db.session() as session:
+            statement = self._insert(session.bind.dialect.name).values(phone=phone, name=name)
+            statement = statement.on_conflict_do_update(
+                index_elements=[User.phone],
+                set_={"name": statement.excluded.name, "updated_at": func.now()}
+            ).returning(User)
+            user = (await session.execute(statement)).scalar_one()
+            await session.commit()
+            return user.to_dict()
+
+    async def get_or_create_user(self, phone: str, name: str = "Novo Usuário") -> dict:
+        """Cria o usuário se não existir; se já existir (inclusive criado por outra requisição), só o lê."""
+        async with self.db.session() as session:
+            statement = (
+                self._insert(session.bind.dialect.name)
+                .values(phone=phone, name=name)
+                .on_conflict_do_nothing(index_elements=[User.phone])
+                .returning(User)
+            )
+            user = (await session.execute(statement)).scalar_one_or_none()
+            await session.commit()
+            if user is None:
+                user = (await session.execute(select(User).where(User.phone == phone))).scalar_one()
+            return user.to_dict()
@@ -0,0 +1,222 @@
+# services/context_builder_service.py
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from interfaces.repositories.context_repository import IConversationContextRepository
+from services.session_summary_service import SessionSummaryService
+from utils.logger import logger
+from utils.metrics import metrics
+from utils.tokenizer import count_message_tokens, count_tokens
+from utils.turn_context import TurnContext, session_id_for
+
+
+def _fingerprint(message: Dict[str, Any]) -> str:
+    raw = f"{message.get('role')}\x00{message.get('content')}"
+    return hashlib.sha1(raw.encode("utf-8", "replace")).hexdigest()
+
+
+@dataclass
+class RollingSummary:
+    """Resumo das mensagens que já saíram do orçamento, até `covered` (impressão digital)."""
+    text: Optional[str] = None
+    covered: Optional[str] = None
+    refreshing: bool = False
+    loaded: bool = False
+    task: Optional[asyncio.Task] = None
+
+
+class ContextBuilderService:
+    """
+    Monta o contexto enviado a cada agente dentro de um orçamento de tokens.
+
+    - Conta os tokens localmente (utils/tokenizer) e mantém os turnos mais recentes que
+      cabem no orçamento do agente (`CONTEXT_TOKEN_BUDGET`); um turno é uma mensagem do
+      usuário com as respostas que vieram depois dela, e o último turno sempre entra.
+    - As mensagens de sistema do início do histórico (ex: o resumo da janela anterior da
+      sessão) sempre entram e ficam fora dos turnos que podem ser descartados.
+    - Os turnos mais antigos viram um resumo acumulado por telefone, atualizado de forma
+      incremental em segundo plano: só as mensagens que saíram do orçamento desde o último
+      resumo são enviadas ao modelo, junto com o resumo anterior. Com o repositório de
+      contextos, o resumo é gravado no contexto da sessão e sobrevive a reinícios; no
+      primeiro estouro do orçamento, o contexto espera o resumo por até
+      `FIRST_SUMMARY_TIMEOUT` segundos, sem passar do prazo do turno.
+    - Reporta, por agente, os tokens do histórico recebido e os efetivamente enviados.
+    """
+
+    SUMMARY_TOKEN_BUDGET = 400
+    FIRST_SUMMARY_TIMEOUT = 5.0
+
+    def __init__(
+        self,
+        summarizer: Optional[SessionSummaryService] = None,
+        default_budget: Optional[int] = None,
+        max_sessions: int = 10_000,
+        context_repository: Optional[IConversationContextRepository] = None
+    ):
+        self.summarizer = summarizer
+        self.context_repository = context_repository
+        self.default_budget = default_budget or int(os.getenv("CONTEXT_TOKEN_BUDGET", 4000))
+        self.max_sessions = max_sessions
+        self._summaries: OrderedDict[str, RollingSummary] = OrderedDict()
+        self._tasks: set[asyncio.Task] = set()
+        self._totals: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def _turns(context: List[Dict[str, Any]]) -> tuple[List[Dict[str, Any]], List[List[Dict[str, Any]]]]:
+        """Separa as mensagens de sistema iniciais dos turnos do histórico."""
+        start = 0
+        while start < len(context) and context[start].get("role") == "system":
+            start += 1
+        turns: List[List[Dict[str, Any]]] = []
+        for message in context[start:]:
+            if message.get("role") == "user" or not turns:
+                turns.append([])
+            turns[-1].append(message)
+        return context[:start], turns
+
+    def _summary_for(self, key: str) -> RollingSummary:
+        summary = self._summaries.get(key)
+        if summary is None:
+            summary = self._summaries[key] = RollingSummary()
+        self._summaries.move_to_end(key)
+        while len(self._summaries) > self.max_sessions:
+            self._summaries.popitem(last=False)
+        return summary
+
+    async def _load_summary(self, key: str) -> RollingSummary:
+        """Resumo da conversa, carregado do contexto da sessão no primeiro uso."""
+        summary = self._summary_for(key)
+        if not summary.loaded and self.context_repository is not None:
+            summary.loaded = True
+            try:
+                text, covered = await self.context_repository.get_rolling_summary(session_id_for(key))
+            except Exception as e:
+                logger.warning(f"[CONTEXT BUILDER] Falha ao carregar o resumo de {key}: {e}")
+            else:
+                if text and summary.text is None:
+                    summary.text, summary.covered = text, covered
+        return summary
+
+    def _budget(self, agent) -> int:
+        return getattr(agent, "CONTEXT_TOKEN_BUDGET", None) or self.default_budget
+
+    async def build(
+        self, key: str, context: List[Dict[str, Any]], agent, turn: Optional[TurnContext] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Retorna o contexto do agente: [resumo dos turnos antigos] + turnos recentes no orçamento.
+
+        Args:
+            key: Identificador da conversa (telefone)
+            context: Histórico em ordem cronológica
+            agent: Agente que vai receber o contexto
+            turn: Turno em andamento; limita a espera pelo primeiro resumo ao que resta do prazo
+        """
+        model = getattr(agent, "MODEL", None) or getattr(agent, "model", None) or "gpt-4o-mini"
+        leading, turns = self._turns(context)
+        leading_tokens = sum(count_message_tokens(message, model) for message in leading)
+        turn_tokens = [sum(count_message_tokens(message, model) for message in turn) for turn in turns]
+
+        summary = await self._load_summary(key)
+        available = self._budget(agent) - leading_tokens - (
+            self.SUMMARY_TOKEN_BUDGET if summary.text or self.summarizer else 0
+        )
+        kept = 0
+        used = 0
+        for tokens in reversed(turn_tokens):
+            if kept and used + tokens > available:
+                break
+            used += tokens
+            kept += 1
+
+        recent = [message for turn in turns[len(turns) - kept:] for message in turn]
+        dropped = [message for turn in turns[:len(turns) - kept] for message in turn]
+        if dropped:
+            self._refresh(key, summary, dropped)
+            if summary.text is None and summary.task is not None:
+                # Primeiro estouro do orçamento: sem resumo ainda, espera por ele (com limite)
+                # em vez de mandar os turnos recentes sem nada do que ficou para trás
+                await self._wait_first_summary(summary, turn)
+
+        built = list(leading)
+        if dropped and summary.text:
+            built.append({"role": "system", "content": f"Resumo da conversa anterior:\n{summary.text}"})
+        built.extend(recent)
+
+        self._record(
+            agent, leading_tokens + sum(turn_tokens), sum(count_message_tokens(message, model) for message in built)
+        )
+        return built
+
+    async def _wait_first_summary(self, summary: RollingSummary, turn: Optional[TurnContext]) -> None:
+        timeout = self.FIRST_SUMMARY_TIMEOUT
+        if turn is not None:
+            timeout = turn.stage_timeout(cap=timeout)
+        if timeout <= 0:
+            # Prazo do turno esgotado: segue sem o resumo, que continua sendo gerado em segundo plano
+            metrics.increment("context_summary_waits", outcome="skipped")
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(summary.task), timeout=timeout)
+        except asyncio.TimeoutError:
+            metrics.increment("context_summary_waits", outcome="timeout")
+
+    def _refresh(self, key: str, summary: RollingSummary, dropped: List[Dict[str, Any]]) -> None:
+        """Agenda a atualização do resumo com as mensagens que saíram do orçamento desde a última."""
+        if self.summarizer is None or summary.refreshing:
+            return
+        fingerprints = [_fingerprint(message) for message in dropped]
+        start = 0
+        if summary.covered in fingerprints:
+            start = len(fingerprints) - fingerprints[::-1].index(summary.covered)
+        pending = dropped[start:]
+        if not pending:
+            return
+
+        summary.refreshing = True
+        task = summary.task = asyncio.create_task(self._summarize(key, summary, pending, fingerprints[-1]))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _summarize(self, key: str, summary: RollingSummary, pending: List[Dict[str, Any]], covered: str) -> None:
+        try:
+            text = await self.summarizer.summarize(pending, previous_summary=summary.text)
+            if text:
+                summary.text = text
+                summary.covered = covered
+                metrics.increment("context_summary_refreshes")
+                metrics.observe("context_summary_tokens", count_tokens(text))
+                if self.context_repository is not None:
+                    await self.context_repository.save_rolling_summary(session_id_for(key), text, covered)
+        except Exception as e:
+            logger.warning(f"[CONTEXT BUILDER] Falha ao atualizar o resumo de {key}: {e}")
+        finally:
+            summary.refreshing = False
+            summary.task = None
+
+    def _record(self, agent, original: int, sent: int) -> None:
+        agent_id = getattr(agent, "id", None) or type(agent).__name__
+        metrics.increment("context_tokens_original", original, agent=agent_id)
+        metrics.increment("context_tokens_sent", sent, agent=agent_id)
+        totals = self._totals.setdefault(agent_id, {"calls": 0, "original_tokens": 0, "sent_tokens": 0})
+        totals["calls"] += 1
+        totals["original_tokens"] += original
+        totals["sent_tokens"] += sent
+
+    def stats(self) -> Dict[str, Any]:
+        """Economia de tokens por agente (histórico recebido vs. contexto enviado)."""
+        return {
+            agent_id: {
+                **totals,
+                "saved_tokens": totals["original_tokens"] - totals["sent_tokens"],
+                "savings_ratio": (
+                    1 - totals["sent_tokens"] / totals["original_tokens"]
+                    if totals["original_tokens"] else None
+                ),
+            }
+            for agent_id, totals in self._totals.items()
+        }
@@ -1,126 +1,153 @@
 # services/context_management_service.py
 from interfaces.repositories.context_repository import IConversationContextRepository
 from interfaces.repositories.user_repository_interface import IUserRepository
+from services.context_write_buffer import ContextWriteBuffer
 from utils.logger import logger, to_json_dump
+from utils.turn_context import TurnContext, session_id_for
 from typing import List, Dict, Any, Optional
+import datetime
 import json
+import os
 
 class ContextManagementService:
     def __init__(
         self,
         context_repository: IConversationContextRepository,
-        user_repository: IUserRepository
+        user_repository: IUserRepository,
+        write_buffer: Optional[ContextWriteBuffer] = None,
+        idle_gap: Optional[float] = None
     ) -> None:
         self.context_repository = context_repository
         self.user_repository = user_repository
+        self.write_buffer = write_buffer
+        # Intervalo ocioso (segundos) depois do qual a sessão abre um contexto novo; 0 desativa
+        self.idle_gap = idle_gap if idle_gap is not None else float(os.getenv("SESSION_IDLE_GAP_HOURS", 24)) * 3600
     
     async def create_or_update_context(
         self, 
         phone: str, 
         message: str, 
         agent_id: str,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        turn: Optional[TurnContext] = None
     ) -> Dict:
         """
         Cria um novo contexto de conversa ou atualiza um existente
         """
         logger.info(f"[CONTEXT MANAGEMENT SERVICE] Processando contexto para o telefone: {phone}")
         
-        # Obtém ou cria o usuário
-        user = self.user_repository.get_user_by_phone(phone)
-        if not user:
-            user = self.user_repository.create_user(
-                phone=phone,
-                name="Novo Usuário"
-            )
+        # ID de sessão (o do turno, quando houver)
+        session_id = turn.session_id if turn else session_id_for(phone)
         
-        # Cria um ID de sessão
-        session_id = f"session_{phone}"  # Você pode usar um identificador mais elaborado
+        # Grava antes as respostas da sessão ainda no buffer, para a mensagem nova entrar
+        # depois delas (as das outras conversas ficam para o worker)
+        if self.write_buffer and self.write_buffer.has_pending(session_id=session_id):
+            await self.write_buffer.flush(session_id)
         
-        # Obtém ou cria um contexto para a sessão
-        context = self.context_repository.get_latest_context_by_session(session_id)
+        # Adiciona a mensagem ao contexto mais recente da sessão; a sequência vem do
+        # contador do contexto, sem carregar as mensagens existentes
+        active_since = (
+            datetime.datetime.now() - datetime.timedelta(seconds=self.idle_gap)
+            if self.idle_gap else None
+        )
+        appended = await self.context_repository.append_message(
+            role="user",
+            content=message,
+            session_id=session_id,
+            active_since=active_since
+        )
         
-        if not context:
+        if appended is None:
+            previous = await self.context_repository.get_latest_context_by_session(session_id)
+            if previous:
+                # Sessão ociosa além do intervalo: o contexto novo continua com o mesmo usuário
+                user_id = previous.user_id
+            else:
+                # Obtém ou cria o usuário (o do turno, se já foi buscado)
+                user = (turn.user if turn else None) or await self.user_repository.get_or_create_user(phone)
+                user_id = user["id"]
+            
             # Cria um novo contexto se não existir
             logger.info(f"[CONTEXT MANAGEMENT SERVICE] Criando novo contexto para sessão: {session_id}")
-            context = self.context_repository.create_context(
-                user_id=user.id,
+            context = await self.context_repository.create_context(
+                user_id=user_id,
                 session_id=session_id,
                 agent_id=agent_id
             )
-            message_sequence = 0
-        else:
-            # Conta mensagens existentes para determinar a próxima sequência
-            messages = self.context_repository.get_messages_by_context(context.id)
-            message_sequence = len(messages)
-        
-        # Adiciona a mensagem ao contexto
-        self.context_repository.add_message(
-            context_id=context.id,
-            role="user",
-            content=message,
-            sequence=message_sequence
-        )
+            appended = await self.context_repository.append_message(
+                role="user",
+                content=message,
+                context_id=context.id
+            )
         
         return {
-            "context_id": context.id,
-            "user_id": user.id,
+            "context_id": appended["context_id"],
+            "user_id": appended["user_id"],
             "session_id": session_id,
-            "message_sequence": message_sequence,
+            "message_sequence": appended["sequence"],
             "agent_id": agent_id
         }
     
-    def save_assistant_response(
+    async def save_assistant_response(
         self, 
         context_id: int, 
         content: str, 
         sequence: int,
         function_calls: List[Dict] = None,
-        documents: List[Dict] = None
+        documents: List[Dict] = None,
+        session_id: Optional[str] = None
     ) -> Dict:
         """
         Salva a resposta do assistente no contexto
         """
         logger.info(f"[CONTEXT MANAGEMENT SERVICE] Salvando resposta do assistente para contexto: {context_id}")
         
-        # Salva a resposta principal
-        message = self.context_repository.add_message(
-            context_id=context_id,
-            role="assistant",
-            content=content,
-            sequence=sequence
-        )
+        # Resposta principal seguida das chamadas de função, na ordem das sequências
+        messages = [{
+            "context_id": context_id,
+            "role": "assistant",
+            "content": content,
+            "sequence": sequence
+        }]
+        for i, function_call in enumerate(function_calls or []):
+            messages.append({
+                "context_id": context_id,
+                "role": "function_call",
+                "content": json.dumps(function_call),
+                "sequence": sequence + i + 1,
+                "function_call_id": function_call.get("id", f"func_{i}")
+            })
+        
+        documents = [
+            {
+                "context_id": context_id,
+                "filename": doc.get("filename", "documento.pdf"),
+                "content_type": doc.get("content_type", "application/pdf"),
+                "data": doc.get("data"),
+                "metadata": doc.get("metadata")
+            }
+            for doc in documents or []
+        ]
         
-        # Salva chamadas de função, se houver
-        if function_calls:
-            for i, function_call in enumerate(function_calls):
-                self.context_repository.add_message(
-                    context_id=context_id,
-                    role="function_call",
-                    content=json.dumps(function_call),
-                    sequence=sequence + i + 1,
-                    function_call_id=function_call.get("id", f"func_{i}")
-                )
+        if self.write_buffer:
+            # Gravação em lote fora do caminho da resposta
+            queued = [self.write_buffer.add_message(**message, session_id=session_id) for message in messages]
+            for document in documents:
+                self.write_buffer.add_document(**document, session_id=session_id)
+            return queued[0]
         
-        # Salva documentos, se houver
-        if documents:
-            for doc in documents:
-                self.context_repository.add_document(
-                    context_id=context_id,
-                    filename=doc.get("filename", "documento.pdf"),
-                    content_type=doc.get("content_type", "application/pdf"),
-                    data=doc.get("data"),
-                    metadata=doc.get("metadata")
-                )
+        # Sem buffer: uma transação para as mensagens e outra para os documentos
+        saved = await self.context_repository.add_messages(messages)
+        await self.context_repository.add_documents(documents)
         
-        return message.to_dict() if hasattr(message, "to_dict") else message
+        return saved[0] if saved else None
     
-    def get_conversation_history(self, context_id: int) -> List[Dict]:
+    async def get_conversation_history(self, context_id: int) -> List[Dict]:
         """
         Obtém o histórico completo de uma conversa
         """
         logger.info(f"[CONTEXT MANAGEMENT SERVICE] Obtendo histórico de conversa para contexto: {context_id}")
         
-        messages = self.context_repository.get_messages_by_context(context_id)
+        messages = await self.context_repository.get_messages_by_context(context_id)
         
         return [message.to_dict() if hasattr(message, "to_dict") else message for message in messages]
\ No newline at end of file
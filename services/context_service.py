@@ -1,94 +1,235 @@
 # dikas-orlando/services/context_service.py
 
+import datetime
 import json
+import os
 from interfaces.repositories.context_repository import IConversationContextRepository
 from interfaces.repositories.user_repository_interface import IUserRepository
+from services.context_write_buffer import ContextWriteBuffer
+from services.session_summary_service import SessionSummaryService
 from typing import Dict, List, Any, Optional
+from utils.history_cache import HistoryCache
 from utils.logger import logger
+from utils.metrics import metrics
+from utils.turn_context import TurnContext, session_id_for
 
 class ContextService:
     def __init__(
         self,
         context_repository: IConversationContextRepository,
-        user_repository: IUserRepository
+        user_repository: IUserRepository,
+        write_buffer: Optional[ContextWriteBuffer] = None,
+        history_cache: Optional[HistoryCache] = None,
+        idle_gap: Optional[float] = None,
+        summarizer: Optional[SessionSummaryService] = None
     ):
         self.context_repository = context_repository
         self.user_repository = user_repository
+        # Com o buffer, respostas, chamadas de função e documentos são gravados em lote
+        self.write_buffer = write_buffer
+        # Janela recente do histórico de cada sessão, atualizada a cada mensagem armazenada
+        self.history_cache = history_cache
+        # Intervalo ocioso (segundos) depois do qual a sessão abre um contexto novo; 0 desativa
+        self.idle_gap = idle_gap if idle_gap is not None else float(os.getenv("SESSION_IDLE_GAP_HOURS", 24)) * 3600
+        # Opcional: resume a janela anterior para o contexto novo
+        self.summarizer = summarizer
     
-    def store_user_message(self, phone: str, message: str, agent_id: str) -> Dict[str, Any]:
-        """Armazena uma mensagem do usuário no contexto"""
+    def _active_since(self) -> Optional[datetime.datetime]:
+        if not self.idle_gap:
+            return None
+        return datetime.datetime.now() - datetime.timedelta(seconds=self.idle_gap)
+    
+    @staticmethod
+    def _summary_history(summary: Optional[str]) -> List[Dict[str, Any]]:
+        if not summary:
+            return []
+        return [{
+            "role": "system",
+            "content": f"Resumo da conversa anterior:\n{summary}",
+            "sequence": None,
+            "created_at": None
+        }]
+    
+    async def _summarize_window(self, context) -> Optional[str]:
+        """Resumo da janela que está sendo encerrada (inclui o resumo que ela já trazia)"""
+        if not self.summarizer:
+            return None
+        recent = await self.context_repository.get_recent_messages(context.id, self.summarizer.WINDOW)
+        return await self.summarizer.summarize(
+            [{"role": msg.role, "content": msg.content} for msg in recent],
+            previous_summary=context.summary
+        )
+    
+    @staticmethod
+    def _to_history(role: str, content: str, sequence: Optional[int], created_at: Any) -> Dict[str, Any]:
+        return {
+            "role": role,
+            "content": content,
+            "sequence": sequence,
+            "created_at": created_at.isoformat() if hasattr(created_at, 'isoformat') else str(created_at)
+        }
+    
+    def _remember(self, session_id: Optional[str], role: str, content: str, sequence: Optional[int], new_session: bool = False) -> None:
+        """Acrescenta a mensagem à janela em cache da sessão (sem invalidar)"""
+        if self.history_cache and session_id:
+            self.history_cache.append(
+                session_id,
+                self._to_history(role, content, sequence, datetime.datetime.now()),
+                new_session=new_session
+            )
+    
+    async def store_user_message(
+        self, phone: str, message: str, agent_id: str, turn: Optional[TurnContext] = None
+    ) -> Dict[str, Any]:
+        """
+        Armazena uma mensagem do usuário no contexto.
+        O usuário do telefone é obtido (ou criado) uma vez aqui e volta em "user", para
+        o resto do turno não buscá-lo de novo; com `turn`, usuário e contexto também são
+        registrados nele.
+        """
         logger.info(f"Armazenando mensagem do usuário com telefone {phone}")
+        user = (turn.user if turn else None) or await self.user_repository.get_or_create_user(phone)
         
-        # Obtém ou cria o usuário
-        user = self.user_repository.get_user_by_phone(phone)
-        if not user:
-            user = self.user_repository.create_user(phone=phone, name="Novo Usuário")
+        # ID de sessão (o do turno, quando houver)
+        session_id = turn.session_id if turn else session_id_for(phone)
         
-        # ID de sessão simples
-        session_id = f"session_{phone}"
+        # Grava antes as respostas da sessão ainda no buffer, para a mensagem nova entrar
+        # depois delas (as das outras conversas ficam para o worker)
+        if self.write_buffer and self.write_buffer.has_pending(session_id=session_id):
+            await self.write_buffer.flush(session_id)
         
-        # Obtém ou cria contexto
-        context = self.context_repository.get_latest_context_by_session(session_id)
+        # Caminho comum: o contexto da sessão está ativo e a mensagem entra numa única ida
+        # ao banco, com a sequência alocada pelo contador do contexto (sem carregar o histórico)
+        appended = await self.context_repository.append_message(
+            role="user",
+            content=message,
+            session_id=session_id,
+            active_since=self._active_since()
+        )
         
-        if not context:
-            context = self.context_repository.create_context(
-                user_id=user.id,
+        new_window = appended is None
+        if new_window:
+            previous = await self.context_repository.get_latest_context_by_session(session_id)
+            summary = None
+            if previous:
+                # Sessão ociosa além do intervalo: abre uma janela nova, com o resumo da anterior
+                user_id = previous.user_id
+                summary = await self._summarize_window(previous)
+                metrics.increment("session_windows_opened", summarized=bool(summary))
+            else:
+                # Primeira mensagem da sessão: obtém ou cria o usuário
+                user_id = user["id"]
+            
+            context = await self.context_repository.create_context(
+                user_id=user_id,
                 session_id=session_id,
-                agent_id=agent_id
+                agent_id=agent_id,
+                summary=summary
+            )
+            if self.history_cache:
+                self.history_cache.put(session_id, self._summary_history(summary), complete=True)
+            appended = await self.context_repository.append_message(
+                role="user",
+                content=message,
+                context_id=context.id
             )
-            sequence = 0
-        else:
-            messages = self.context_repository.get_messages_by_context(context.id)
-            sequence = len(messages)
         
-        # Armazena a mensagem
-        self.context_repository.add_message(
-            context_id=context.id,
-            role="user",
-            content=message,
-            sequence=sequence
-        )
+        self._remember(session_id, "user", message, appended["sequence"], new_session=new_window)
+        if turn:
+            turn.user = user
+            turn.user_id = appended["user_id"]
+            turn.context_id = appended["context_id"]
         
         return {
-            "context_id": context.id,
-            "user_id": user.id,
+            "context_id": appended["context_id"],
+            "user_id": appended["user_id"],
             "session_id": session_id,
-            "sequence": sequence,
-            "agent_id": agent_id
+            "sequence": appended["sequence"],
+            "agent_id": agent_id,
+            "new_window": new_window,
+            "user": user
         }
     
-    def store_assistant_message(self, context_id: int, message: str, sequence: int) -> Dict[str, Any]:
-        """Armazena uma resposta do assistente"""
+    async def store_assistant_message(self, context_id: int, message: str, sequence: Optional[int] = None, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Armazena uma resposta do assistente (sem sequência, usa a próxima do contexto)"""
         logger.info(f"Armazenando resposta do assistente para contexto {context_id}")
         
-        message = self.context_repository.add_message(
-            context_id=context_id,
-            role="assistant",
-            content=message,
-            sequence=sequence
-        )
+        if self.write_buffer:
+            stored = self.write_buffer.add_message(
+                context_id=context_id,
+                role="assistant",
+                content=message,
+                sequence=sequence,
+                session_id=session_id
+            )
+        elif sequence is None:
+            stored = await self.context_repository.append_message(
+                role="assistant",
+                content=message,
+                context_id=context_id
+            )
+        else:
+            stored = await self.context_repository.add_message(
+                context_id=context_id,
+                role="assistant",
+                content=message,
+                sequence=sequence
+            )
+            stored = stored.to_dict() if hasattr(stored, "to_dict") else stored
         
-        return message.to_dict() if hasattr(message, "to_dict") else message
+        self._remember(session_id, "assistant", message, stored.get("sequence") if stored else sequence)
+        return stored
     
-    def store_function_call(self, context_id: int, function_call: Dict[str, Any], sequence: int) -> Dict[str, Any]:
-        """Armazena uma chamada de função"""
+    async def store_function_call(self, context_id: int, function_call: Dict[str, Any], sequence: Optional[int] = None, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Armazena uma chamada de função (sem sequência, usa a próxima do contexto)"""
         logger.info(f"Armazenando chamada de função para contexto {context_id}")
         
-        message = self.context_repository.add_message(
-            context_id=context_id,
-            role="function_call",
-            content=json.dumps(function_call),
-            sequence=sequence,
-            function_call_id=function_call.get("id", f"func_{sequence}")
-        )
+        content = json.dumps(function_call)
+        if self.write_buffer:
+            stored = self.write_buffer.add_message(
+                context_id=context_id,
+                role="function_call",
+                content=content,
+                function_call_id=function_call.get("id", f"func_{sequence}" if sequence is not None else None),
+                sequence=sequence,
+                session_id=session_id
+            )
+        elif sequence is None:
+            stored = await self.context_repository.append_message(
+                role="function_call",
+                content=content,
+                context_id=context_id,
+                function_call_id=function_call.get("id")
+            )
+        else:
+            stored = await self.context_repository.add_message(
+                context_id=context_id,
+                role="function_call",
+                content=content,
+                sequence=sequence,
+                function_call_id=function_call.get("id", f"func_{sequence}")
+            )
+            stored = stored.to_dict() if hasattr(stored, "to_dict") else stored
         
-        return message.to_dict() if hasattr(message, "to_dict") else message
+        self._remember(session_id, "function_call", content, stored.get("sequence") if stored else sequence)
+        return stored
     
-    def store_document(self, context_id: int, filename: str, content_type: str, data: bytes, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def store_document(self, context_id: int, filename: str, content_type: str, data: bytes, metadata: Optional[Dict[str, Any]] = None, session_id: Optional[str] = None) -> Dict[str, Any]:
         """Armazena um documento"""
         logger.info(f"Armazenando documento {filename} para contexto {context_id}")
         
-        document = self.context_repository.add_document(
+        if self.write_buffer:
+            record = self.write_buffer.add_document(
+                context_id=context_id,
+                filename=filename,
+                content_type=content_type,
+                data=data,
+                metadata=metadata,
+                session_id=session_id
+            )
+            return {key: value for key, value in record.items() if key != "data"}
+        
+        document = await self.context_repository.add_document(
             context_id=context_id,
             filename=filename,
             content_type=content_type,
@@ -98,40 +239,45 @@ class ContextService:
         
         return document.to_dict() if hasattr(document, "to_dict") else document
     
-    def get_conversation_history(self, phone: str) -> List[Dict[str, Any]]:
-        """Obtém o histórico de conversa para um número"""
+    async def get_conversation_history(self, phone: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Obtém o histórico de conversa para um número (as `limit` mensagens mais recentes, se informado)"""
         # ID de sessão
-        session_id = f"session_{phone}"
+        session_id = session_id_for(phone)
         
-        # Obtém o contexto
-        context = self.context_repository.get_latest_context_by_session(session_id)
-        if not context:
-            return []
-        
-        # Obtém mensagens
-        messages = self.context_repository.get_messages_by_context(context.id)
+        async def load(count: Optional[int]) -> List[Dict[str, Any]]:
+            # Obtém o contexto
+            context = await self.context_repository.get_latest_context_by_session(session_id)
+            if not context:
+                return []
+            
+            # Obtém mensagens
+            if count:
+                messages = await self.context_repository.get_recent_messages(context.id, count)
+            else:
+                messages = await self.context_repository.get_messages_by_context(context.id)
+            
+            # Converte para dicionários, com o resumo da janela anterior no início
+            return self._summary_history(context.summary) + [
+                self._to_history(msg.role, msg.content, msg.sequence, msg.created_at)
+                for msg in messages
+            ]
         
-        # Converte para dicionários
-        return [
-            {
-                "role": msg.role,
-                "content": msg.content,
-                "sequence": msg.sequence,
-                "created_at": msg.created_at.isoformat() if hasattr(msg.created_at, 'isoformat') else str(msg.created_at)
-            }
-            for msg in messages
-        ]
+        if self.history_cache:
+            return await self.history_cache.get(session_id, load, limit=limit)
+        return await load(limit)
     
-    def get_documents_by_context_id(self, context_id: int) -> List[Dict[str, Any]]:
+    async def get_documents_by_context_id(self, context_id: int) -> List[Dict[str, Any]]:
         """Obtém documentos de um contexto"""
-        documents = self.context_repository.get_documents_by_context(context_id)
+        documents = await self.context_repository.get_documents_by_context(context_id)
         
         return [
             {
                 "id": doc.id,
                 "filename": doc.filename,
                 "content_type": doc.content_type,
-                "metadata": doc.metadata,
+                "content_hash": doc.content_hash,
+                "size": doc.size,
+                "metadata": doc.document_metadata,
                 "created_at": doc.created_at.isoformat() if hasattr(doc.created_at, 'isoformat') else str(doc.created_at)
             }
             for doc in documents
@@ -0,0 +1,253 @@
+# services/context_write_buffer.py
+import asyncio
+import datetime
+from typing import Any, Dict, List, Optional
+
+from interfaces.repositories.context_repository import IConversationContextRepository
+from utils.logger import logger
+from utils.metrics import metrics
+
+# Tentativas do flush final no desligamento antes de desistir do que restou
+SHUTDOWN_FLUSH_ATTEMPTS = 3
+# Falhas de gravação de um mesmo registro antes de descartá-lo (dead-letter no log)
+MAX_RECORD_ATTEMPTS = 8
+# Espera máxima (segundos) entre flushes do worker enquanto as gravações falham
+MAX_RETRY_BACKOFF = 30.0
+
+
+class ContextWriteBuffer:
+    """
+    Persistência write-behind das mensagens e documentos do contexto.
+
+    - Os registros de um turno (resposta do assistente, chamadas de função, documentos)
+      entram num buffer em memória sem ida ao banco.
+    - Um worker grava o buffer em lote (um INSERT por tabela) a cada `flush_interval`
+      segundos ou quando ele chega a `batch_size` registros; `flush_soon()` antecipa a
+      gravação, que então roda em paralelo com o envio da resposta.
+    - A ordem dos registros é preservada: as sequências são alocadas no flush, na ordem
+      em que os registros entraram.
+    - Registros que falham `MAX_RECORD_ATTEMPTS` vezes são descartados (com log e a
+      métrica `context_write_buffer_dropped`); enquanto as gravações falham, o worker
+      espaça as tentativas (backoff exponencial).
+    - `flush(session_id)` grava só os registros de uma sessão, sem pôr a escrita das
+      outras conversas no caminho da resposta.
+    - `stop()` grava o que restou antes de o processo encerrar.
+    """
+
+    def __init__(
+        self,
+        repository: Optional[IConversationContextRepository] = None,
+        batch_size: int = 100,
+        flush_interval: float = 0.2
+    ):
+        self.repository = repository
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._messages: List[Dict[str, Any]] = []
+        self._documents: List[Dict[str, Any]] = []
+        self._flush_requested = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        self._consecutive_failures = 0
+
+    def attach_repository(self, repository: IConversationContextRepository) -> None:
+        self.repository = repository
+
+    @property
+    def pending(self) -> int:
+        return len(self._messages) + len(self._documents)
+
+    def has_pending(self, context_id: Optional[int] = None, session_id: Optional[str] = None) -> bool:
+        if context_id is None and session_id is None:
+            return self.pending > 0
+        return any(self._matches(record, context_id, session_id) for record in self._messages + self._documents)
+
+    @staticmethod
+    def _matches(record: Dict[str, Any], context_id: Optional[int], session_id: Optional[str]) -> bool:
+        if context_id is not None and record["context_id"] != context_id:
+            return False
+        return session_id is None or record.get("session_id") == session_id
+
+    def _queued(self) -> None:
+        metrics.set_gauge("context_write_buffer_pending", self.pending)
+        if self.pending >= self.batch_size:
+            self._flush_requested.set()
+
+    def add_message(
+        self,
+        context_id: int,
+        role: str,
+        content: str,
+        function_call_id: Optional[str] = None,
+        sequence: Optional[int] = None,
+        session_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Enfileira uma mensagem; sem `sequence`, recebe a próxima do contexto no flush."""
+        record = {
+            "context_id": context_id,
+            "session_id": session_id,
+            "role": role,
+            "content": content,
+            "function_call_id": function_call_id,
+            "sequence": sequence,
+            "created_at": datetime.datetime.now(),
+        }
+        self._messages.append(record)
+        self._queued()
+        return record
+
+    def add_document(
+        self,
+        context_id: int,
+        filename: str,
+        content_type: str,
+        data: bytes,
+        metadata: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        record = {
+            "context_id": context_id,
+            "session_id": session_id,
+            "filename": filename,
+            "content_type": content_type,
+            "data": data,
+            "metadata": metadata,
+        }
+        self._documents.append(record)
+        self._queued()
+        return record
+
+    def flush_soon(self) -> None:
+        """Pede ao worker que grave o buffer agora, sem esperar a gravação."""
+        if self.pending:
+            self._flush_requested.set()
+
+    async def start(self) -> None:
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._stopping = True
+        self._flush_requested.set()
+        if self._task:
+            await self._task
+            self._task = None
+        for _ in range(SHUTDOWN_FLUSH_ATTEMPTS):
+            if not self.pending:
+                return
+            await self.flush()
+        if self.pending:
+            logger.error(
+                f"[CONTEXT WRITE BUFFER] {self.pending} registro(s) não gravado(s) no desligamento"
+            )
+
+    async def flush(self, session_id: Optional[str] = None) -> int:
+        """Grava em lote tudo o que está no buffer (com `session_id`, só os registros da sessão)."""
+        if self.repository is None:
+            return 0
+        async with self._flush_lock:
+            if session_id is None:
+                messages, self._messages = self._messages, []
+                documents, self._documents = self._documents, []
+            else:
+                messages, self._messages = self._split(self._messages, session_id)
+                documents, self._documents = self._split(self._documents, session_id)
+            if not messages and not documents:
+                return 0
+
+            with metrics.timer("context_write_buffer_flush_seconds"):
+                written_messages, failed_messages = await self._write("message", messages, self._add_messages)
+                written_documents, failed_documents = await self._write(
+                    "document", documents, self.repository.add_documents
+                )
+            written = written_messages + written_documents
+
+            # Devolve ao início do buffer o que não foi gravado, preservando a ordem,
+            # menos os registros que já esgotaram as tentativas
+            self._messages = failed_messages + self._messages
+            self._documents = failed_documents + self._documents
+            if session_id is None:
+                failed = bool(failed_messages or failed_documents)
+                self._consecutive_failures = self._consecutive_failures + 1 if failed else 0
+            metrics.increment("context_write_buffer_writes", written)
+            metrics.set_gauge("context_write_buffer_pending", self.pending)
+            return written
+
+    @staticmethod
+    def _split(records: List[Dict[str, Any]], session_id: str) -> tuple[list, list]:
+        """Separa os registros da sessão (na ordem) dos demais."""
+        selected, remaining = [], []
+        for record in records:
+            (selected if record.get("session_id") == session_id else remaining).append(record)
+        return selected, remaining
+
+    async def _add_messages(self, records: List[Dict[str, Any]]) -> int:
+        return len(await self.repository.add_messages(records))
+
+    async def _write(self, kind: str, records: List[Dict[str, Any]], write) -> tuple[int, List[Dict[str, Any]]]:
+        """
+        Grava os registros em lote. Se o lote falhar, tenta de novo contexto a contexto,
+        para que um registro com problema (ex: contexto inexistente) não derrube os
+        demais; só os registros dos contextos que falharam contam a tentativa.
+
+        Returns:
+            tuple: (registros gravados, registros a tentar de novo)
+        """
+        if not records:
+            return 0, []
+        try:
+            return await write(records), []
+        except Exception as e:
+            metrics.increment("context_write_buffer_failures")
+            logger.exception(f"[CONTEXT WRITE BUFFER] Falha ao gravar {len(records)} registro(s) ({kind}): {e}")
+            error = e
+
+        groups: Dict[int, List[Dict[str, Any]]] = {}
+        for record in records:
+            groups.setdefault(record["context_id"], []).append(record)
+        if len(groups) == 1:
+            return 0, self._retry(kind, records, error)
+
+        written, failed = 0, []
+        for group in groups.values():
+            try:
+                written += await write(group)
+            except Exception as e:
+                failed.extend(self._retry(kind, group, e))
+        # Preserva a ordem original entre os registros devolvidos ao buffer
+        order = {id(record): index for index, record in enumerate(records)}
+        return written, sorted(failed, key=lambda record: order[id(record)])
+
+    @staticmethod
+    def _retry(kind: str, records: List[Dict[str, Any]], error: Exception) -> List[Dict[str, Any]]:
+        """Conta uma falha em cada registro e descarta os que chegaram a MAX_RECORD_ATTEMPTS."""
+        retained = []
+        for record in records:
+            record["attempts"] = record.get("attempts", 0) + 1
+            if record["attempts"] < MAX_RECORD_ATTEMPTS:
+                retained.append(record)
+                continue
+            metrics.increment("context_write_buffer_dropped", kind=kind)
+            logger.error(
+                f"[CONTEXT WRITE BUFFER] Registro descartado após {record['attempts']} falhas "
+                f"({kind}, contexto {record['context_id']}, sessão {record.get('session_id')}): {error}"
+            )
+        return retained
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            if self._consecutive_failures:
+                # Gravações falhando: espaça as tentativas em vez de repetir a cada flush_interval
+                await asyncio.sleep(min(self.flush_interval * 2 ** self._consecutive_failures, MAX_RETRY_BACKOFF))
+            else:
+                try:
+                    await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._flush_requested.clear()
+            await self.flush()
+
+
+# Instância global: o ciclo de vida (start/stop) acompanha o do servidor
+context_write_buffer = ContextWriteBuffer()
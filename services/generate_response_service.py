@@ -1,5 +1,6 @@
 # dikas-orlando/services/generate_response_service.py
 
+import asyncio
 import os
 import re
 import json
@@ -7,37 +8,63 @@ from interfaces.clients.chat_interface import IChat
 from interfaces.repositories.message_repository_interface import IMessageRepository
 from interfaces.orchestrators.response_orchestrator_interface import IResponseOrchestrator
 from services.context_service import ContextService  # NOVA IMPORTAÇÃO
+from services.progressive_reply_service import ProgressiveReplyService
+from contextlib import nullcontext
 from utils.logger import logger, to_json_dump
+from utils.metrics import metrics
+from utils.turn_context import DEFAULT_TURN_BUDGET, DeadlineExceeded, TurnContext, current_turn
 
 class GenerateResponseService:
+    # Resposta de contingência quando o turno estoura o prazo (em vez de silêncio)
+    DEGRADED_REPLY = (
+        "Desculpe, estou demorando mais do que o normal para responder. 😕 "
+        "Pode tentar de novo em alguns minutos?"
+    )
+
     def __init__(
         self,
         chat_client: IChat,
         message_repository: IMessageRepository,
         response_orchestrator: IResponseOrchestrator,
-        context_service: ContextService = None  # NOVO PARÂMETRO OPCIONAL
+        context_service: ContextService = None,  # NOVO PARÂMETRO OPCIONAL
+        progressive_replies: ProgressiveReplyService = None
     ) -> None:
         self.chat = chat_client
         self.message_repository = message_repository
         self.response_orchestrator = response_orchestrator
         self.context_service = context_service  # NOVO ATRIBUTO
+        # Acompanha a mensagem em andamento para medir reenvios do usuário
+        self.progressive_replies = progressive_replies
 
     # Mantém os métodos existentes
 
-    # Modifica o método execute
-    async def execute(self, phone: str, message: str) -> None:
+    async def execute(self, phone: str, message: str, turn: TurnContext | None = None) -> None:
+        """
+        Processa uma mensagem recebida. O turno (telefone canônico, sessão, usuário, IDs de
+        rastreio) é criado aqui se quem chamou não o criou, e vale para toda a resposta.
+        """
+        turn = turn or TurnContext.start(phone, budget=DEFAULT_TURN_BUDGET)
+        token = current_turn.set(turn)
+        try:
+            await self._execute_turn(turn, message)
+        finally:
+            current_turn.reset(token)
+
+    async def _execute_turn(self, turn: TurnContext, message: str) -> None:
+        phone = turn.phone
         # Inicializa informações de contexto
         context_info = None
         if self.context_service:  # Verifica se o serviço de contexto está disponível
             # Armazena a mensagem no sistema de contexto
-            context_info = self.context_service.store_user_message(
+            context_info = await self.context_service.store_user_message(
                 phone=phone,
                 message=message,
-                agent_id="default"  # Temporário, será atualizado
+                agent_id="default",  # Temporário, será atualizado
+                turn=turn
             )
         
         # Código existente para obter mensagens
-        messages: list = self.message_repository.get_latest_customer_messages(
+        messages: list = await self.message_repository.get_latest_customer_messages(
             phone=phone, limit=int(os.getenv("CONTEXT_SIZE", 80))
         )
 
@@ -47,20 +74,37 @@ class GenerateResponseService:
         )
 
         logger.info(
-            f"[GENERATE RESPONSE SERVICE] Gerando resposta para o número: {phone}"
+            f"[GENERATE RESPONSE SERVICE] Gerando resposta para o número: {phone} (trace {turn.trace_id})"
         )
 
+        tracking = (
+            self.progressive_replies.turn(phone, message)
+            if self.progressive_replies else nullcontext()
+        )
         try:
-            full_output: list[dict] = await self.response_orchestrator.execute(
-                context=context, phone=phone
-            )
+            async with tracking:
+                try:
+                    full_output: list[dict] = await self.response_orchestrator.execute(
+                        context=context, phone=phone, user=turn.user, turn=turn
+                    )
+                except DeadlineExceeded as e:
+                    # Prazo esgotado: o trabalho pendente já foi cancelado; responde algo em vez de silêncio
+                    logger.warning(
+                        f"[GENERATE RESPONSE SERVICE] Prazo do turno esgotado na etapa '{e.stage}' (trace {turn.trace_id})"
+                    )
+                    metrics.increment("turn_degraded_replies", stage=e.stage)
+                    full_output = [{"role": "assistant", "content": self.DEGRADED_REPLY}]
 
-            resolved_output_content = self._resolve_output_content(full_output)
+                resolved_output_content = self._resolve_output_content(full_output)
 
-            self.chat.send_message(
-                phone=phone,
-                message=resolved_output_content,
-            )
+                # A gravação do contexto roda em paralelo com o envio, fora do caminho da resposta
+                await asyncio.gather(
+                    self.chat.send_message(
+                        phone=phone,
+                        message=resolved_output_content,
+                    ),
+                    self._store_context_outputs(context_info, full_output),
+                )
 
             # Armazenar no sistema tradicional
             self._save_messages_to_database(
@@ -68,41 +112,6 @@ class GenerateResponseService:
                 input=context[-1],
                 outputs=full_output,
             )
-            
-            # Se o serviço de contexto estiver disponível, armazena resposta no novo sistema
-            if self.context_service and context_info:
-                # Identifica tipos de saídas
-                assistant_content = ""
-                function_calls = []
-                next_sequence = context_info["sequence"] + 1
-                
-                for output in full_output:
-                    # Encontra a resposta do assistente
-                    if output.get("role") == "assistant":
-                        assistant_content = output.get("content", "")
-                        agent_id = output.get("agent_id", "unknown_agent")
-                    
-                    # Identifica chamadas de função
-                    elif output.get("type", "") == "function_call":
-                        function_calls.append(output)
-                
-                # Armazena a resposta
-                if assistant_content:
-                    self.context_service.store_assistant_message(
-                        context_id=context_info["context_id"],
-                        message=assistant_content,
-                        sequence=next_sequence
-                    )
-                    next_sequence += 1
-                
-                # Armazena chamadas de função
-                for func_call in function_calls:
-                    self.context_service.store_function_call(
-                        context_id=context_info["context_id"],
-                        function_call=func_call,
-                        sequence=next_sequence
-                    )
-                    next_sequence += 1
 
             logger.info(
                 f"[GENERATE RESPONSE SERVICE] Resposta final: \ninput: {to_json_dump(context[-1])} \noutput: {to_json_dump(resolved_output_content)}"
@@ -113,4 +122,42 @@ class GenerateResponseService:
                 f"[GENERATE RESPONSE SERVICE] ❌ Erro ao gerar resposta: \n{to_json_dump(e)}"
             )
 
-            raise e
\ No newline at end of file
+            raise e
+
+    async def _store_context_outputs(self, context_info: dict | None, full_output: list[dict]) -> None:
+        """Armazena a resposta e as chamadas de função do turno no sistema de contexto."""
+        if not self.context_service or not context_info:
+            return
+
+        # Identifica tipos de saídas
+        assistant_content = ""
+        function_calls = []
+
+        for output in full_output:
+            # Encontra a resposta do assistente
+            if output.get("role") == "assistant":
+                assistant_content = output.get("content", "")
+
+            # Identifica chamadas de função
+            elif output.get("type", "") == "function_call":
+                function_calls.append(output)
+
+        # Armazena a resposta (a sequência é alocada pelo contador do contexto)
+        if assistant_content:
+            await self.context_service.store_assistant_message(
+                context_id=context_info["context_id"],
+                message=assistant_content,
+                session_id=context_info["session_id"]
+            )
+
+        # Armazena chamadas de função
+        for func_call in function_calls:
+            await self.context_service.store_function_call(
+                context_id=context_info["context_id"],
+                function_call=func_call,
+                session_id=context_info["session_id"]
+            )
+
+        # Com o buffer de escrita, o lote do turno começa a ser gravado agora
+        if self.context_service.write_buffer:
+            self.context_service.write_buffer.flush_soon()
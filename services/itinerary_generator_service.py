@@ -2,9 +2,10 @@
 import json
 from openai import AsyncOpenAI
 from openai.types.chat import ChatCompletionMessageParam
-from typing import TypedDict
+from typing import TypedDict, AsyncIterator
 import os
 import sys
+from utils.circuit_breaker import OPENAI, dependency_breaker
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
@@ -39,16 +40,21 @@ class ItineraryGeneratorService:
 - Lembre o usuário sobre a necessidade de agendar restaurantes e o Genie+/Lightning Lanes com antecedência.
 """
 
-    async def generate(self, itinerary_data: dict) -> str:
-        """Recebe os dados e chama a API da OpenAI para gerar o roteiro."""
-        system_prompt = self._get_generator_prompt(itinerary_data)
-        
-        messages: list[ChatCompletionMessageParam] = [
-            {"role": "system", "content": system_prompt}
+    def _build_messages(self, itinerary_data: dict) -> list[ChatCompletionMessageParam]:
+        return [
+            {"role": "system", "content": self._get_generator_prompt(itinerary_data)}
         ]
 
+    async def generate(self, itinerary_data: dict) -> str:
+        """
+        Recebe os dados e chama a API da OpenAI para gerar o roteiro.
+        Com o circuito da OpenAI aberto, falha na hora com CircuitBreakerOpen.
+        """
+        messages = self._build_messages(itinerary_data)
+
         print("INFO: Gerando o roteiro final com Chat Completions...")
-        response = await self.client.chat.completions.create(
+        response = await dependency_breaker(OPENAI).call_async(
+            self.client.chat.completions.create,
             model="gpt-4o-mini",
             messages=messages,
             temperature=0.5,
@@ -56,4 +62,28 @@ class ItineraryGeneratorService:
         )
 
         final_itinerary = response.choices[0].message.content
-        return final_itinerary or "Não foi possível gerar o roteiro neste momento."
\ No newline at end of file
+        return final_itinerary or "Não foi possível gerar o roteiro neste momento."
+
+    async def generate_stream(self, itinerary_data: dict) -> AsyncIterator[str]:
+        """
+        Gera o roteiro em streaming, devolvendo os trechos de texto à medida que chegam.
+        Com o circuito da OpenAI aberto, falha na hora com CircuitBreakerOpen.
+        """
+        messages = self._build_messages(itinerary_data)
+
+        print("INFO: Gerando o roteiro final em streaming...")
+        stream = dependency_breaker(OPENAI).stream_async(
+            self.client.chat.completions.create,
+            model=self.MODEL,
+            messages=messages,
+            temperature=self.TEMPERATURE,
+            max_tokens=self.MAX_TOKENS,
+            stream=True
+        )
+
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
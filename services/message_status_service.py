@@ -0,0 +1,233 @@
+# services/message_status_service.py
+import asyncio
+import datetime
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from interfaces.repositories.message_status_repository_interface import IMessageStatusRepository
+from utils.logger import logger
+from utils.metrics import metrics
+
+# Ordem de progresso da entrega; um status nunca regride (ex: "sent" atrasado depois de "read")
+STATUS_RANK = {"sent": 1, "delivered": 2, "read": 3}
+TIMESTAMP_FIELDS = ("queued_at", "sent_at", "delivered_at", "read_at", "failed_at")
+
+
+def _seconds_between(start: datetime.datetime, end: datetime.datetime) -> float:
+    if (start.tzinfo is None) != (end.tzinfo is None):
+        start, end = start.astimezone(), end.astimezone()
+    return (end - start).total_seconds()
+
+
+class MessageStatusService:
+    """
+    Índice dos status de entrega das mensagens enviadas pelo WhatsApp.
+
+    - Os eventos (envio confirmado e callbacks do provedor) atualizam um índice em
+      memória por provider_message_id: consulta O(1), sem ida ao banco.
+    - A persistência é em lote: os registros alterados se acumulam e um worker os grava
+      de uma vez a cada `flush_interval` segundos ou `batch_size` registros.
+    - Mede a latência de entrega (envio -> entregue) e ponta a ponta (fila -> entregue).
+    """
+
+    def __init__(
+        self,
+        repository: Optional[IMessageStatusRepository] = None,
+        cache_size: int = 100_000,
+        batch_size: int = 200,
+        flush_interval: float = 1.0
+    ):
+        self.repository = repository
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._cache: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self._dirty: Dict[str, Dict[str, Any]] = {}
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._flush_requested = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+
+    def attach_repository(self, repository: IMessageStatusRepository) -> None:
+        self.repository = repository
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """Registra uma função chamada a cada mudança de status (ex: a outbox reagindo a falhas)."""
+        self._listeners.append(listener)
+
+    def record_sent(
+        self,
+        provider_message_id: str,
+        provider: Optional[str],
+        phone: Optional[str],
+        queued_at: Optional[datetime.datetime] = None
+    ) -> None:
+        """Registra que o provedor aceitou a mensagem."""
+        self.ingest([{
+            "provider_message_id": provider_message_id,
+            "provider": provider,
+            "phone": phone,
+            "status": "sent",
+            "queued_at": queued_at,
+        }])
+
+    def ingest(self, events: List[Dict[str, Any]]) -> int:
+        """
+        Aplica eventos de status ao índice.
+
+        Args:
+            events: Eventos normalizados (provider_message_id, status, timestamp, provider, phone, error)
+
+        Returns:
+            int: Quantos eventos mudaram algum registro
+        """
+        applied = 0
+        for event in events:
+            if event.get("provider_message_id") and self._apply(event):
+                applied += 1
+        if len(self._dirty) >= self.batch_size:
+            self._flush_requested.set()
+        return applied
+
+    async def ingest_async(self, events: List[Dict[str, Any]]) -> int:
+        """Como `ingest`, mas antes carrega do banco os registros que não estão em memória."""
+        for provider_message_id in {event.get("provider_message_id") for event in events} - {None}:
+            if provider_message_id not in self._cache:
+                await self.lookup(provider_message_id)
+        return self.ingest(events)
+
+    def _apply(self, event: Dict[str, Any]) -> bool:
+        provider_message_id = event["provider_message_id"]
+        status = event["status"]
+        timestamp = event.get("timestamp") or datetime.datetime.now()
+        metrics.increment("whatsapp_status_events", status=status)
+
+        record = self._cache.get(provider_message_id)
+        if record is None:
+            record = {"provider_message_id": provider_message_id, "status": None, "error": None}
+            record.update({field: None for field in TIMESTAMP_FIELDS})
+            record.update({"provider": None, "phone": None})
+        before = dict(record)
+
+        for field in ("provider", "phone", "queued_at"):
+            if event.get(field) and not record.get(field):
+                record[field] = event[field]
+        if not record.get(f"{status}_at"):
+            record[f"{status}_at"] = timestamp
+
+        current = record["status"]
+        if status == "failed":
+            if current not in ("delivered", "read"):
+                record["status"] = "failed"
+                record["error"] = event.get("error")
+        elif STATUS_RANK.get(status, 0) > STATUS_RANK.get(current, 0):
+            record["status"] = status
+
+        # "read" sem "delivered" antes (callbacks fora de ordem): a leitura implica entrega
+        if status == "read" and not record["delivered_at"]:
+            record["delivered_at"] = timestamp
+        if record["delivered_at"] and not before.get("delivered_at"):
+            self._observe_delivery(record)
+
+        self._cache[provider_message_id] = record
+        self._cache.move_to_end(provider_message_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+        if record == before:
+            return False
+        if self.repository is not None:
+            self._dirty[provider_message_id] = record
+        if record["status"] != before.get("status"):
+            for listener in self._listeners:
+                try:
+                    listener(dict(record))
+                except Exception as e:
+                    logger.exception(f"[MESSAGE STATUS] Falha no listener de status: {e}")
+        return True
+
+    def _observe_delivery(self, record: Dict[str, Any]) -> None:
+        provider = record.get("provider") or "unknown"
+        if record["sent_at"]:
+            metrics.observe(
+                "whatsapp_delivery_latency_seconds",
+                max(0.0, _seconds_between(record["sent_at"], record["delivered_at"])),
+                provider=provider
+            )
+        if record["queued_at"]:
+            metrics.observe(
+                "whatsapp_end_to_end_delivery_seconds",
+                max(0.0, _seconds_between(record["queued_at"], record["delivered_at"])),
+                provider=provider
+            )
+
+    @staticmethod
+    def _serialize(record: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            key: value.isoformat() if isinstance(value, datetime.datetime) else value
+            for key, value in record.items()
+        }
+
+    def get(self, provider_message_id: str) -> Optional[Dict[str, Any]]:
+        """Consulta O(1) no índice em memória."""
+        record = self._cache.get(provider_message_id)
+        return self._serialize(record) if record else None
+
+    async def lookup(self, provider_message_id: str) -> Optional[Dict[str, Any]]:
+        """Consulta o índice e, se a mensagem não estiver em memória, o banco."""
+        record = self.get(provider_message_id)
+        if record or self.repository is None:
+            return record
+        stored = await asyncio.to_thread(self.repository.get, provider_message_id)
+        if not stored:
+            return None
+        loaded = {
+            key: datetime.datetime.fromisoformat(value) if key in TIMESTAMP_FIELDS and value else value
+            for key, value in stored.items()
+            if key != "updated_at"
+        }
+        self._cache.setdefault(provider_message_id, loaded)
+        return stored
+
+    async def start(self) -> None:
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._stopping = True
+        self._flush_requested.set()
+        if self._task:
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        """Grava em lote todos os registros alterados desde o último flush."""
+        if self.repository is None or not self._dirty:
+            return 0
+        batch, self._dirty = self._dirty, {}
+        records = [dict(record) for record in batch.values()]
+        try:
+            with metrics.timer("message_status_flush_seconds"):
+                written = await asyncio.to_thread(self.repository.upsert_many, records)
+        except Exception as e:
+            # Devolve o lote sem sobrescrever registros que mudaram durante a gravação
+            for provider_message_id, record in batch.items():
+                self._dirty.setdefault(provider_message_id, record)
+            logger.exception(f"[MESSAGE STATUS] Falha ao gravar {len(records)} status: {e}")
+            return 0
+        metrics.increment("message_status_writes", written)
+        return written
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            await self.flush()
+
+
+# Instância global compartilhada pelos clientes de WhatsApp, pela outbox e pelo webhook
+message_status_service = MessageStatusService()
@@ -0,0 +1,207 @@
+# services/outbox_dispatcher.py
+import asyncio
+import datetime
+import os
+import time
+from interfaces.clients.chat_interface import IChat
+from interfaces.repositories.document_store_interface import IDocumentStore
+from interfaces.repositories.outbox_repository_interface import IOutboxRepository
+from services.message_status_service import message_status_service
+from utils.logger import logger
+from utils.metrics import metrics
+from utils.rate_limiter import TokenBucket
+
+
+class OutboxDispatcher:
+    """
+    Esvazia a outbox durável enviando as mensagens pelo cliente de WhatsApp.
+
+    - Ordem FIFO estrita por telefone: só a mensagem mais antiga de cada telefone sai,
+      e a próxima só é liberada depois que ela é entregue (ou falha de vez).
+    - Limite global de envios por segundo (token bucket), respeitando o provedor.
+    - Reservas com prazo: mensagens em voo quando o processo caiu, ou cuja entrega
+      falhou sem registrar o resultado, voltam para a fila quando a reserva expira
+      (verificado a cada ciclo de polling).
+    - Documentos enfileirados pelo hash são lidos do armazenamento só na hora do envio.
+    """
+
+    def __init__(
+        self,
+        outbox_repository: IOutboxRepository,
+        chat: IChat,
+        document_store: IDocumentStore | None = None,
+        rate_per_second: float | None = None,
+        burst: float | None = None,
+        batch_size: int = 50,
+        lease_seconds: float = 120.0,
+        poll_interval: float = 1.0
+    ):
+        self.outbox = outbox_repository
+        self.chat = chat
+        self.document_store = document_store
+        rate = rate_per_second or float(os.getenv("WHATSAPP_RATE_PER_SECOND", 20))
+        self.bucket = TokenBucket(rate, burst or float(os.getenv("WHATSAPP_RATE_BURST", rate)))
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+        self._deliveries: set[asyncio.Task] = set()
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        self._started_at: float | None = None
+
+    def notify(self) -> None:
+        """Acorda o dispatcher (ex: logo após enfileirar uma mensagem)."""
+        self._wakeup.set()
+
+    def _on_status(self, record: dict) -> None:
+        # Entrega que falhou depois de aceita pelo provedor: a mensagem volta para a outbox
+        if record["status"] != "failed":
+            return
+        task = asyncio.get_running_loop().create_task(self._requeue(record))
+        self._deliveries.add(task)
+        task.add_done_callback(self._deliveries.discard)
+
+    async def _requeue(self, record: dict) -> None:
+        outbox_id = await asyncio.to_thread(
+            self.outbox.requeue_failed_delivery, record["provider_message_id"], record.get("error") or "Falha na entrega"
+        )
+        if outbox_id:
+            metrics.increment("outbox_messages", outcome="requeued")
+            logger.warning(f"[OUTBOX DISPATCHER] Mensagem {outbox_id} devolvida à fila após falha de entrega")
+            self._wakeup.set()
+
+    async def _already_delivered(self, message: dict) -> bool:
+        # Uma tentativa anterior já foi aceita pelo provedor: se o callback confirmou a entrega,
+        # reenviar só duplicaria a mensagem para o usuário
+        provider_message_id = message.get("provider_message_id")
+        if not provider_message_id:
+            return False
+        record = await message_status_service.lookup(provider_message_id)
+        return bool(record) and record["status"] in ("delivered", "read")
+
+    async def start(self) -> None:
+        message_status_service.add_listener(self._on_status)
+        recovered = await asyncio.to_thread(self.outbox.recover_expired)
+        if recovered:
+            logger.info(f"[OUTBOX DISPATCHER] {recovered} mensagens em voo recuperadas após reinício")
+        self._stopping = False
+        self._started_at = time.monotonic()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._stopping = True
+        self._wakeup.set()
+        if self._task:
+            await self._task
+            self._task = None
+        if self._deliveries:
+            await asyncio.gather(*self._deliveries, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            self._wakeup.clear()
+            try:
+                # Reservas vencidas bloqueiam a fila do telefone: devolve-as antes de reservar
+                recovered = await asyncio.to_thread(self.outbox.recover_expired)
+                if recovered:
+                    metrics.increment("outbox_messages", recovered, outcome="lease_expired")
+                    logger.warning(f"[OUTBOX DISPATCHER] {recovered} mensagens com reserva vencida devolvidas à fila")
+                claimed = await asyncio.to_thread(self.outbox.claim_batch, self.batch_size, self.lease_seconds)
+            except Exception as e:
+                logger.exception(f"[OUTBOX DISPATCHER] Falha ao reservar mensagens: {e}")
+                claimed = []
+
+            for message in claimed:
+                task = asyncio.create_task(self._deliver(message))
+                self._deliveries.add(task)
+                task.add_done_callback(self._deliveries.discard)
+
+            # Espera um novo enfileiramento, o fim de uma entrega ou o intervalo de polling
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _send(self, message: dict) -> dict:
+        payload = message["payload"]
+        if message["kind"] == "document":
+            payload = dict(payload)
+            content_hash = payload.pop("document_hash", None)
+            if content_hash:
+                # Bytes crus: o cliente do provedor codifica em base64 uma única vez, no envio
+                payload["document"] = await asyncio.to_thread(self._read_document, content_hash)
+            return await self.chat.send_document(message["phone"], **payload)
+        return await self.chat.send_message(message["phone"], **payload)
+
+    def _read_document(self, content_hash: str) -> bytes:
+        with self.document_store.open(content_hash) as view:
+            return bytes(view)
+
+    async def _deliver(self, message: dict) -> None:
+        try:
+            if await self._already_delivered(message):
+                await asyncio.to_thread(
+                    self.outbox.mark_sent, message["id"], message.get("provider"), message["provider_message_id"]
+                )
+                metrics.increment("outbox_messages", outcome="already_delivered")
+                return
+
+            waited = await self.bucket.acquire()
+            metrics.observe("outbox_rate_limit_wait_seconds", waited)
+
+            try:
+                result = await self._send(message)
+            except Exception as e:
+                result = {"status": "failed", "error": str(e), "retryable": True}
+
+            if result.get("status") == "sent":
+                await asyncio.to_thread(
+                    self.outbox.mark_sent, message["id"], result.get("provider"), result.get("message_id")
+                )
+                metrics.increment("outbox_messages", outcome="sent")
+                created_at = message.get("created_at")
+                if result.get("message_id"):
+                    message_status_service.record_sent(
+                        result["message_id"], result.get("provider"), message["phone"], queued_at=created_at
+                    )
+                if created_at:
+                    now = datetime.datetime.now(created_at.tzinfo)
+                    metrics.observe("outbox_delivery_latency_seconds", (now - created_at).total_seconds())
+            elif result.get("retryable"):
+                delay = min(2 ** message["attempts"], 300)
+                await asyncio.to_thread(self.outbox.mark_retry, message["id"], result.get("error") or "", delay)
+                metrics.increment("outbox_messages", outcome="retry")
+                logger.warning(
+                    f"[OUTBOX DISPATCHER] Mensagem {message['id']} para {message['phone']} "
+                    f"será reenviada em {delay}s: {result.get('error')}"
+                )
+            else:
+                await asyncio.to_thread(self.outbox.mark_failed, message["id"], result.get("error") or "")
+                metrics.increment("outbox_messages", outcome="failed")
+                logger.error(
+                    f"[OUTBOX DISPATCHER] Mensagem {message['id']} para {message['phone']} descartada: {result.get('error')}"
+                )
+        except Exception as e:
+            # A reserva expira e a mensagem volta para a fila no próximo ciclo de _run
+            logger.exception(f"[OUTBOX DISPATCHER] Falha ao processar a mensagem {message['id']}: {e}")
+        finally:
+            self._wakeup.set()
+
+    async def stats(self) -> dict:
+        pending = await asyncio.to_thread(self.outbox.pending_count)
+        metrics.set_gauge("outbox_pending", pending)
+        sent = metrics.counter("outbox_messages", outcome="sent")
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {
+            "pending": pending,
+            "in_flight": len(self._deliveries),
+            "sent": sent,
+            "retries": metrics.counter("outbox_messages", outcome="retry"),
+            "failed": metrics.counter("outbox_messages", outcome="failed"),
+            "requeued_after_delivery_failure": metrics.counter("outbox_messages", outcome="requeued"),
+            "skipped_already_delivered": metrics.counter("outbox_messages", outcome="already_delivered"),
+            "throughput_per_second": sent / elapsed if elapsed else 0.0,
+            "delivery_latency_seconds": metrics.histogram("outbox_delivery_latency_seconds"),
+            "rate_limit_wait_seconds": metrics.histogram("outbox_rate_limit_wait_seconds"),
+        }
@@ -0,0 +1,89 @@
+# services/pdf_render_service.py
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from utils import pdf_layout
+from utils.logger import logger
+from utils.metrics import metrics
+
+
+class RenderedPdf:
+    """
+    PDF renderizado. `view` expõe os bytes sem cópia; use como context manager
+    (ou chame `close`) para liberar a view.
+
+    Os bytes voltam do pool pelo pickle do executor: o PDF de um roteiro tem poucas
+    centenas de KB e logo é entregue ao chat ou gravado no armazenamento de
+    documentos, então memória compartilhada não economizaria nada que valha o risco
+    de deixar blocos órfãos em /dev/shm quando a renderização é cancelada.
+    """
+    def __init__(self, data: bytes):
+        self._data = data
+        self.size = len(data)
+        self.view = memoryview(data)
+
+    def close(self) -> None:
+        if self._data is None:
+            return
+        self.view.release()
+        self._data = None
+
+    def __enter__(self) -> "RenderedPdf":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class PdfRenderService:
+    """
+    Renderiza os PDFs de roteiro em um pool de processos, fora do event loop.
+    Cada processo do pool carrega fontes e estilos uma única vez.
+    """
+    def __init__(self, max_workers: int | None = None):
+        self.max_workers = max_workers or int(os.getenv("PDF_RENDER_WORKERS", 2))
+        self._executor: ProcessPoolExecutor | None = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=pdf_layout.warm_up
+            )
+        return self._executor
+
+    async def _run(self, operation: str, func, *args):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            metrics.observe("pdf_render_seconds", time.perf_counter() - start, operation=operation)
+
+    async def warm(self) -> None:
+        """Sobe todos os processos do pool antes do primeiro roteiro."""
+        await asyncio.gather(*(self._run("warm", pdf_layout.warm_up) for _ in range(self.max_workers)))
+        logger.info(f"[PDF RENDER SERVICE] Pool de renderização pronto com {self.max_workers} processos")
+
+    async def layout(self, conteudo_texto: str) -> list[tuple[str, str]]:
+        """Diagrama um trecho do roteiro (ex: uma seção de dia) no pool."""
+        return await self._run("layout", pdf_layout.layout_text, conteudo_texto)
+
+    async def render_lines(self, lines: list[tuple[str, str]]) -> RenderedPdf:
+        """Desenha linhas já diagramadas e devolve o PDF renderizado."""
+        return RenderedPdf(await self._run("render", pdf_layout.render_lines, lines))
+
+    async def render(self, conteudo_texto: str) -> RenderedPdf:
+        return await self.render_lines(await self.layout(conteudo_texto))
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+# Instância global, pronta para importar em outros módulos
+pdf_render_service = PdfRenderService()
@@ -0,0 +1,197 @@
+# services/progressive_reply_service.py
+import asyncio
+import os
+import random
+import re
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+from interfaces.clients.chat_interface import IChat
+from utils.latency_predictor import LatencyPredictor
+from utils.logger import logger
+from utils.metrics import metrics
+
+DEFAULT_INTERIM_MESSAGE = "⏳ Já estou preparando sua resposta, só um instante!"
+
+# Não repete a mensagem de aviso para o mesmo telefone dentro deste intervalo (ex: reenvios)
+INTERIM_MESSAGE_COOLDOWN_SECONDS = 60.0
+
+# Intervalo para renovar o "digitando..." (o WhatsApp o apaga sozinho após alguns segundos)
+PRESENCE_REFRESH_SECONDS = 10.0
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\W+", " ", (text or "").lower()).strip()
+
+
+@dataclass
+class Turn:
+    """Uma mensagem do usuário sendo respondida."""
+    phone: str
+    message: str
+    group: str
+    started_at: float = field(default_factory=time.monotonic)
+    notified: bool = False
+    resends: int = 0
+    duplicates: int = 0
+
+
+class ProgressiveReplyService:
+    """
+    Respostas progressivas para agentes lentos.
+
+    - Prevê a latência de cada agente pelo histórico recente (LatencyPredictor).
+    - Se a previsão passa do limite, envia na hora um "digitando..." (ou uma mensagem
+      curta, quando o provedor não suporta presença); se a previsão errar e o agente
+      demorar além do limite, o aviso sai nesse momento.
+    - Mede os reenvios: mensagens do mesmo telefone que chegam enquanto a resposta anterior
+      ainda está sendo gerada. Uma fração das respostas lentas (holdout) não recebe aviso,
+      para comparar a taxa de reenvio com e sem o aviso.
+    """
+
+    def __init__(
+        self,
+        chat: IChat,
+        predictor: LatencyPredictor | None = None,
+        threshold: float | None = None,
+        mode: str | None = None,
+        holdout: float | None = None
+    ):
+        self.chat = chat
+        self.predictor = predictor or LatencyPredictor()
+        self.threshold = threshold if threshold is not None else float(os.getenv("PROGRESSIVE_REPLY_THRESHOLD", 8))
+        # presence | message | both
+        self.mode = (mode or os.getenv("PROGRESSIVE_REPLY_MODE", "presence")).lower()
+        self.holdout = holdout if holdout is not None else float(os.getenv("PROGRESSIVE_REPLY_HOLDOUT", 0.1))
+        self._turns: dict[str, Turn] = {}
+        self._interim_sent_at: dict[str, float] = {}
+
+    def _begin(self, phone: str, message: str) -> Turn:
+        previous = self._turns.get(phone)
+        if previous is not None:
+            # O usuário escreveu de novo antes de receber a resposta anterior
+            previous.resends += 1
+            duplicate = _normalize(previous.message) == _normalize(message)
+            previous.duplicates += int(duplicate)
+            metrics.increment(
+                "progressive_resends",
+                group=previous.group,
+                notified=previous.notified,
+                duplicate=duplicate
+            )
+        group = "holdout" if random.random() < self.holdout else "treated"
+        turn = Turn(phone=phone, message=message, group=group)
+        self._turns[phone] = turn
+        return turn
+
+    def _finish(self, turn: Turn) -> None:
+        if self._turns.get(turn.phone) is turn:
+            del self._turns[turn.phone]
+        if time.monotonic() - turn.started_at >= self.threshold:
+            metrics.increment("progressive_slow_turns", group=turn.group)
+            if turn.resends:
+                metrics.increment("progressive_slow_turns_resent", group=turn.group)
+
+    @asynccontextmanager
+    async def turn(self, phone: str, message: str):
+        """Envolve o processamento de uma mensagem do usuário (do recebimento ao envio da resposta)."""
+        turn = self._begin(phone, message)
+        try:
+            yield turn
+        finally:
+            self._finish(turn)
+
+    @asynccontextmanager
+    async def agent(self, phone: str, agent):
+        """
+        Envolve a execução de um agente: avisa o usuário se a resposta for demorar
+        e registra a duração real no histórico do agente.
+        """
+        turn = self._turns.get(phone)
+        owns_turn = turn is None
+        if owns_turn:
+            turn = self._begin(phone, "")
+
+        agent_id = agent.id
+        predicted = self.predictor.predict(agent_id, prior=getattr(agent, "EXPECTED_LATENCY", None))
+        predicted_slow = predicted is not None and predicted >= self.threshold
+        metrics.increment("progressive_predictions", agent=agent_id, slow=predicted_slow)
+
+        notifier = None
+        if turn.group == "treated":
+            delay = 0.0 if predicted_slow else self.threshold
+            notifier = asyncio.create_task(self._notify(turn, agent, delay))
+
+        start = time.perf_counter()
+        try:
+            yield predicted
+        finally:
+            elapsed = time.perf_counter() - start
+            if notifier:
+                notifier.cancel()
+            self.predictor.record(agent_id, elapsed)
+            metrics.observe("agent_latency_seconds", elapsed, agent=agent_id)
+            if predicted is not None:
+                metrics.observe("agent_latency_prediction_error_seconds", abs(elapsed - predicted), agent=agent_id)
+            if owns_turn:
+                self._finish(turn)
+
+    def _interim_allowed(self, phone: str) -> bool:
+        now = time.monotonic()
+        last = self._interim_sent_at.get(phone)
+        if last is not None and now - last < INTERIM_MESSAGE_COOLDOWN_SECONDS:
+            return False
+        self._interim_sent_at = {
+            key: value for key, value in self._interim_sent_at.items()
+            if now - value < INTERIM_MESSAGE_COOLDOWN_SECONDS
+        }
+        self._interim_sent_at[phone] = now
+        return True
+
+    async def _notify(self, turn: Turn, agent, delay: float) -> None:
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+            turn.notified = True
+            metrics.increment("progressive_notifications", agent=agent.id, mode=self.mode, late=bool(delay))
+
+            presence_ok = False
+            if self.mode in ("presence", "both"):
+                presence_ok = (await self.chat.send_presence(turn.phone, "composing")).get("status") == "sent"
+            if (self.mode in ("message", "both") or not presence_ok) and self._interim_allowed(turn.phone):
+                await self.chat.send_message(
+                    turn.phone, getattr(agent, "INTERIM_MESSAGE", None) or DEFAULT_INTERIM_MESSAGE
+                )
+
+            # Mantém o "digitando..." visível até a resposta final
+            while presence_ok:
+                await asyncio.sleep(PRESENCE_REFRESH_SECONDS)
+                await self.chat.send_presence(turn.phone, "composing")
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.warning(f"[PROGRESSIVE REPLY] Falha ao avisar {turn.phone}: {e}")
+
+    def stats(self) -> dict:
+        """Taxa de reenvio nas respostas lentas, com aviso (treated) e sem aviso (holdout)."""
+        groups = {}
+        for group in ("treated", "holdout"):
+            slow = metrics.counter("progressive_slow_turns", group=group)
+            resent = metrics.counter("progressive_slow_turns_resent", group=group)
+            groups[group] = {
+                "slow_turns": slow,
+                "resent_turns": resent,
+                "resend_rate": resent / slow if slow else None,
+            }
+        treated_rate = groups["treated"]["resend_rate"]
+        holdout_rate = groups["holdout"]["resend_rate"]
+        reduction = None
+        if treated_rate is not None and holdout_rate:
+            reduction = 1 - treated_rate / holdout_rate
+        return {
+            **groups,
+            "resend_reduction": reduction,
+            "in_flight_turns": len(self._turns),
+            "agents": self.predictor.snapshot(),
+        }
@@ -1,5 +1,10 @@
 from interfaces.orchestrators.response_orchestrator_interface import IResponseOrchestrator
 from container.repositories import RepositoryContainer
+from services.progressive_reply_service import ProgressiveReplyService
+from services.context_builder_service import ContextBuilderService
+from utils.circuit_breaker import OPENAI, CircuitBreakerOpen, dependency_breaker
+from utils.turn_context import DeadlineExceeded, SEND_RESERVE, TurnContext, guarded_stage, within_deadline
+from utils.metrics import metrics
 from typing import Coroutine, Any
 
 class ResponseOrchestrator(IResponseOrchestrator):
@@ -7,17 +12,43 @@ class ResponseOrchestrator(IResponseOrchestrator):
     Orquestrador responsável por:
     1. Usar instruções detalhadas para delegar a um agente.
     2. Buscar dados do usuário para passar ao agente.
+    Com prazo no turno, o roteamento e o agente rodam cada um na sua parte do tempo
+    restante; o agente deixa reservado o tempo do envio da resposta.
+    Com o circuito da OpenAI aberto, o roteamento vai direto ao agente padrão e o
+    agente que depender de uma dependência fora do ar responde a sua mensagem de
+    contingência (DEGRADED_MESSAGE), sem esperar timeout.
     """
+    # Fração do tempo restante (e teto em segundos) para a chamada de roteamento
+    ROUTING_SHARE = 0.2
+    ROUTING_TIMEOUT = 10.0
+    FALLBACK_AGENT = "#1"
     # O construtor recebe o container de repositórios
-    def __init__(self, ai_client, agents: dict, repositories: RepositoryContainer):
+    def __init__(
+        self,
+        ai_client,
+        agents: dict,
+        repositories: RepositoryContainer,
+        progressive_replies: ProgressiveReplyService | None = None,
+        context_builder: ContextBuilderService | None = None
+    ):
         self.ai = ai_client
         self.agents = agents
+        # Opcional: avisa o usuário ("digitando...") quando o agente escolhido costuma demorar
+        self.progressive_replies = progressive_replies
+        # Opcional: limita o histórico ao orçamento de tokens do agente escolhido
+        self.context_builder = context_builder
         user_repo = repositories.get("user")
         if not user_repo:
             raise ValueError("Repositório de usuário ('user') não encontrado no container.")
         self.user_repo = user_repo
 
-    async def execute(self, context: list[dict], phone: str) -> Coroutine[Any, Any, list[dict] | str]:
+    async def execute(
+        self,
+        context: list[dict],
+        phone: str,
+        user: dict | None = None,
+        turn: TurnContext | None = None
+    ) -> Coroutine[Any, Any, list[dict] | str]:
         instructions = (
             "Sua função é delegar a resposta da pergunta do usuário para o agente que melhor consegue responder. "
             "Você tem uma lista de cinco agente aos quais você pode delegar essas resposta: "
@@ -36,26 +67,58 @@ class ResponseOrchestrator(IResponseOrchestrator):
             {"role": "system", "content": instructions}
         ] + last_user_message
 
-        # Chamada à API de IA
-        response = await self.ai.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages_for_api,
-            temperature=0.5,
-            max_tokens=488
-        )
-
-        agent_code = response.choices[0].message.content.strip()
+        # Chamada à API de IA; se estourar a sua parte do prazo ou a OpenAI estiver fora do
+        # ar (circuito aberto), segue com o agente padrão
+        try:
+            response = await guarded_stage(
+                dependency_breaker(OPENAI),
+                turn,
+                "routing",
+                lambda: self.ai.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=messages_for_api,
+                    temperature=0.5,
+                    max_tokens=488
+                ),
+                share=self.ROUTING_SHARE,
+                cap=self.ROUTING_TIMEOUT
+            )
+            agent_code = response.choices[0].message.content.strip()
+        except DeadlineExceeded:
+            metrics.increment("routing_fallbacks", reason="deadline")
+            agent_code = self.FALLBACK_AGENT
+        except CircuitBreakerOpen:
+            metrics.increment("routing_fallbacks", reason="circuit_open")
+            agent_code = self.FALLBACK_AGENT
 
         # Mantém a lógica de fallback
         if agent_code not in self.agents:
-            agent_code = "#1"
+            agent_code = self.FALLBACK_AGENT
 
         agent = self.agents.get(agent_code)
         if not agent:
             raise ValueError(f"Agente com código '{agent_code}' não foi encontrado.")
 
-        # Busca o usuário e o passa para o agente 
-        user = self.user_repo.get_user_by_phone(phone)
+        # Busca o usuário (se ainda não foi buscado neste turno) e o passa para o agente
+        if user is None and turn is not None:
+            user = turn.user
+        if user is None:
+            user = await self.user_repo.get_user_by_phone(phone)
+            if turn is not None:
+                turn.user = user
+
+        # O contexto é passado para o agente final, junto com os dados do usuário; com o
+        # context builder, só os turnos recentes que cabem no orçamento do agente (mais o resumo)
+        if self.context_builder is not None:
+            context = await self.context_builder.build(phone, context, agent, turn=turn)
 
-        # O contexto COMPLETO é passado para o agente final, junto com os dados do usuário
-        return await agent.execute(context=context, phone=phone, user=user)
\ No newline at end of file
+        # O agente é cancelado se passar do prazo, guardando o tempo do envio da resposta
+        execution = agent.execute(context=context, phone=phone, user=user, turn=turn)
+        try:
+            if self.progressive_replies is None:
+                return await within_deadline(turn, "agent", execution, reserve=SEND_RESERVE)
+            async with self.progressive_replies.agent(phone, agent):
+                return await within_deadline(turn, "agent", execution, reserve=SEND_RESERVE)
+        except CircuitBreakerOpen as e:
+            metrics.increment("agent_degraded_responses", agent=agent.id, breaker=e.name)
+            return {"status": "degraded", "message": agent.DEGRADED_MESSAGE}
\ No newline at end of file
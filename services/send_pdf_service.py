@@ -1,23 +1,42 @@
-import requests
 import os
+from interfaces.clients.chat_interface import IChat
 
-def send_pdf_via_whatsapp(phone, pdf_base64):
-    # Carrega as variáveis de ambiente (ajuste conforme seu projeto)
-    base_url = os.getenv("ZAPI_BASE_URL")
-    instance_id = os.getenv("ZAPI_INSTANCE_ID")
-    instance_token = os.getenv("ZAPI_INSTANCE_TOKEN")
-    client_token = os.getenv("ZAPI_CLIENT_TOKEN")
+async def send_pdf_via_whatsapp(chat: IChat, phone, pdf_bytes):
+    """
+    Envia o PDF embutido no corpo da requisição. Os bytes seguem crus até o cliente
+    do provedor, que faz a única codificação em base64.
+    """
+    result = await chat.send_document(
+        phone,
+        filename="roteiro.pdf",
+        document=pdf_bytes,
+        caption="Seu roteiro personalizado!"
+    )
+    return result["status"] in ("sent", "queued")
 
-    url = f"{base_url}/instances/{instance_id}/token/{instance_token}/send-file-base64"
-    payload = {
-        "phone": phone,
-        "filename": "roteiro.pdf",
-        "base64": pdf_base64,
-        "caption": "Seu roteiro personalizado!"
-    }
-    headers = {
-        "Content-Type": "application/json",
-        "Client-Token": client_token
-    }
-    response = requests.post(url, json=payload, headers=headers)
-    return response.status_code == 200
\ No newline at end of file
+async def send_pdf_url_via_whatsapp(chat: IChat, phone, pdf_url, filename="roteiro.pdf"):
+    """
+    Envia o PDF informando uma URL de onde o provedor baixa o arquivo,
+    em vez de embutir o documento em base64 no corpo da requisição.
+    """
+    result = await chat.send_document(
+        phone,
+        filename=filename,
+        document_url=pdf_url,
+        caption="Seu roteiro personalizado!"
+    )
+    return result["status"] in ("sent", "queued")
+
+def public_base_url():
+    """
+    Endereço público de start_server.py (PUBLIC_BASE_URL), de onde o provedor baixa os
+    documentos. Obrigatório para a entrega por URL: um padrão local não é acessível ao provedor.
+    """
+    base_url = os.getenv("PUBLIC_BASE_URL", "").strip().rstrip("/")
+    if not base_url:
+        raise ValueError("PUBLIC_BASE_URL é obrigatória com DOCUMENT_DELIVERY=url")
+    return base_url
+
+def build_document_url(content_hash):
+    """Monta a URL pública servida por start_server.py para um documento armazenado."""
+    return f"{public_base_url()}/documents/{content_hash}"
@@ -0,0 +1,60 @@
+# services/session_summary_service.py
+from typing import Any, Dict, List, Optional
+
+from openai import AsyncOpenAI
+
+from utils.circuit_breaker import OPENAI, dependency_breaker
+from utils.logger import logger
+
+
+class SessionSummaryService:
+    """
+    Resume a janela anterior de uma sessão para levar ao contexto novo o que importa
+    (datas da viagem, parques, preferências, pendências), em vez do histórico inteiro.
+    """
+    MODEL = "gpt-4o-mini"
+    TEMPERATURE = 0.2
+    MAX_TOKENS = 300
+    # Mensagens mais recentes da janela anterior consideradas no resumo
+    WINDOW = 40
+
+    def __init__(self, client: AsyncOpenAI):
+        self.client = client
+
+    def _build_prompt(self, messages: List[Dict[str, Any]], previous_summary: Optional[str]) -> str:
+        transcript = "\n".join(
+            f"{message['role']}: {message['content']}"
+            for message in messages
+            if message.get("role") in ("user", "assistant")
+        )
+        previous = f"\n# RESUMO ANTERIOR:\n{previous_summary}\n" if previous_summary else ""
+        return f"""Resuma a conversa abaixo entre um cliente e o assistente de viagens para Orlando, em português do Brasil.
+{previous}
+# CONVERSA:
+{transcript}
+
+# REGRAS:
+- No máximo 8 tópicos curtos.
+- Mantenha fatos úteis para continuar o atendimento: datas, parques, quantidade de pessoas, preferências, orçamento e pendências.
+- Não invente informações.
+"""
+
+    async def summarize(self, messages: List[Dict[str, Any]], previous_summary: Optional[str] = None) -> Optional[str]:
+        """
+        Retorna o resumo ou None se não houver conversa ou a chamada falhar; com o
+        circuito da OpenAI aberto, devolve o resumo anterior sem chamar o modelo.
+        """
+        if not messages:
+            return previous_summary
+        try:
+            response = await dependency_breaker(OPENAI).call_async(
+                self.client.chat.completions.create,
+                model=self.MODEL,
+                messages=[{"role": "system", "content": self._build_prompt(messages[-self.WINDOW:], previous_summary)}],
+                temperature=self.TEMPERATURE,
+                max_tokens=self.MAX_TOKENS
+            )
+        except Exception as e:
+            logger.warning(f"[SESSION SUMMARY] Falha ao resumir a janela anterior: {e}")
+            return previous_summary
+        return response.choices[0].message.content or previous_summary
@@ -0,0 +1,182 @@
+# services/speculative_itinerary_service.py
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from services.itinerary_generator_service import ItineraryGeneratorService
+from utils.circuit_breaker import CLOSED, OPENAI, dependency_breaker
+from utils.logger import logger
+from utils.metrics import metrics
+
+
+@dataclass
+class _SpeculativeEntry:
+    fingerprint: str
+    task: asyncio.Task
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: float | None = None
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class SpeculativeItineraryService:
+    """
+    Pré-gera o roteiro em segundo plano quando os dados já coletados indicam
+    que só faltam campos não estruturais (que não mudam a montagem dos dias).
+
+    Os dados coletados vêm da própria resposta do agente na coleta (sem chamada extra
+    à IA). Quando a function 'roteiro' é finalmente acionada, o resultado especulativo
+    é reaproveitado se os campos estruturais coincidirem; caso contrário, é descartado.
+    Pré-gerações não reaproveitadas expiram depois de `ENTRY_TTL` segundos.
+    """
+    # Campos que não alteram a estrutura do roteiro
+    NON_STRUCTURAL_FIELDS = frozenset({"motivo_viagem", "servicos_extras"})
+    # Limita as gerações especulativas simultâneas para não competir com o tráfego real
+    MAX_CONCURRENT = 2
+    # Sessões abandonadas: a pré-geração é descartada após o TTL ou quando passa do limite
+    ENTRY_TTL = 30 * 60
+    MAX_ENTRIES = 256
+
+    def __init__(self, itinerary_service: ItineraryGeneratorService, parameters: dict):
+        self.itinerary_service = itinerary_service
+        self.parameters = parameters
+        self.required_fields: list[str] = list(parameters.get("required", []))
+        self.known_fields = frozenset(parameters.get("properties", {}))
+        self._entries: OrderedDict[str, _SpeculativeEntry] = OrderedDict()
+        self._semaphore = asyncio.Semaphore(self.MAX_CONCURRENT)
+
+    def missing_fields(self, slots: dict) -> list[str]:
+        return [name for name in self.required_fields if slots.get(name) is None]
+
+    @staticmethod
+    def _normalize(value):
+        if isinstance(value, str):
+            return value.strip().lower()
+        if isinstance(value, list):
+            return sorted((SpeculativeItineraryService._normalize(v) for v in value), key=str)
+        return value
+
+    def _fingerprint(self, dados: dict) -> str:
+        """Hash dos campos estruturais, usado para decidir se o resultado é reaproveitável."""
+        structural = {
+            name: self._normalize(dados.get(name))
+            for name in self.required_fields
+            if name not in self.NON_STRUCTURAL_FIELDS
+        }
+        encoded = json.dumps(structural, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    # --- Ciclo de vida da especulação ---
+    def _discard(self, phone: str, reason: str) -> None:
+        entry = self._entries.pop(phone, None)
+        if entry is None:
+            return
+        entry.task.cancel()
+        metrics.increment("roteiro_speculative_dropped", reason=reason)
+
+    def _expire(self) -> None:
+        """Descarta as pré-gerações expiradas e as mais antigas além de MAX_ENTRIES."""
+        now = time.monotonic()
+        for phone, entry in list(self._entries.items()):
+            if now - entry.created_at < self.ENTRY_TTL:
+                break
+            self._discard(phone, "expired")
+        while len(self._entries) > self.MAX_ENTRIES:
+            self._discard(next(iter(self._entries)), "evicted")
+
+    def observe(self, phone: str, slots: dict) -> None:
+        """
+        Recebe os campos coletados até agora (informados pelo agente na resposta da coleta)
+        e, se só faltarem campos não estruturais, agenda a pré-geração em segundo plano.
+        Não bloqueia a resposta ao usuário.
+        """
+        self._expire()
+        slots = {name: value for name, value in slots.items() if name in self.known_fields}
+        missing = self.missing_fields(slots)
+        if not set(missing) <= self.NON_STRUCTURAL_FIELDS:
+            return
+
+        fingerprint = self._fingerprint(slots)
+        current = self._entries.get(phone)
+        if current and current.fingerprint == fingerprint:
+            return
+        # Trabalho de baixa prioridade: não consome a chamada de teste de um circuito instável
+        if dependency_breaker(OPENAI).state != CLOSED:
+            return
+        if current:
+            self._discard(phone, "replaced")
+
+        logger.info(
+            f"[SPECULATIVE ITINERARY] Iniciando pré-geração para {phone} (faltando: {missing or 'nenhum'})"
+        )
+        entry = _SpeculativeEntry(fingerprint=fingerprint, task=None)
+        entry.task = asyncio.create_task(self._generate(entry, slots))
+        self._entries[phone] = entry
+        metrics.increment("roteiro_speculative_started")
+
+    async def _generate(self, entry: _SpeculativeEntry, slots: dict) -> str:
+        async with self._semaphore:
+            entry.started_at = time.monotonic()
+            try:
+                return await self.itinerary_service.generate(slots)
+            finally:
+                entry.finished_at = time.monotonic()
+
+    async def take(self, phone: str, dados_coletados: dict) -> str | None:
+        """
+        Retorna o roteiro pré-gerado se os campos estruturais coincidirem com os
+        argumentos finais da function. Caso contrário, descarta a especulação e retorna None.
+        """
+        entry = self._entries.pop(phone, None)
+        if entry is None:
+            metrics.increment("roteiro_speculative_outcome", outcome="miss")
+            return None
+
+        if entry.fingerprint != self._fingerprint(dados_coletados):
+            entry.task.cancel()
+            metrics.increment("roteiro_speculative_outcome", outcome="discarded")
+            self._report()
+            return None
+
+        requested_at = time.monotonic()
+        try:
+            itinerary = await entry.task
+        except Exception as e:
+            logger.warning(f"[SPECULATIVE ITINERARY] Pré-geração falhou para {phone}: {e}")
+            metrics.increment("roteiro_speculative_outcome", outcome="failed")
+            return None
+
+        # Tempo de geração que já tinha corrido antes do pedido final
+        finished_at = entry.finished_at or requested_at
+        saved = max(0.0, min(finished_at, requested_at) - entry.started_at)
+        metrics.increment("roteiro_speculative_outcome", outcome="reused")
+        metrics.observe("roteiro_speculative_latency_saved_seconds", saved)
+        self._report()
+        return itinerary
+
+    def stats(self) -> dict:
+        reused = metrics.counter("roteiro_speculative_outcome", outcome="reused")
+        discarded = metrics.counter("roteiro_speculative_outcome", outcome="discarded")
+        failed = metrics.counter("roteiro_speculative_outcome", outcome="failed")
+        missed = metrics.counter("roteiro_speculative_outcome", outcome="miss")
+        attempts = reused + discarded + failed + missed
+        saved = metrics.histogram("roteiro_speculative_latency_saved_seconds") or {"sum": 0.0, "avg": 0.0}
+        return {
+            "started": metrics.counter("roteiro_speculative_started"),
+            "reused": reused,
+            "discarded": discarded,
+            "failed": failed,
+            "missed": missed,
+            "reuse_rate": reused / attempts if attempts else 0.0,
+            "latency_saved_total_seconds": saved["sum"],
+            "latency_saved_avg_seconds": saved["avg"],
+        }
+
+    def _report(self) -> None:
+        stats = self.stats()
+        logger.info(
+            f"[SPECULATIVE ITINERARY] Reaproveitamento: {stats['reuse_rate']:.0%} "
+            f"({int(stats['reused'])} de {int(stats['reused'] + stats['discarded'] + stats['failed'] + stats['missed'])}), "
+            f"latência economizada: {stats['latency_saved_total_seconds']:.1f}s no total"
+        )
@@ -1,7 +1,70 @@
-from fastapi import FastAPI, Request
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from clients.database_client import DatabaseClient
+from clients.whatsapp_client import ZAPIProvider, EvolutionProvider
+from container.clients import ClientContainer
+from container.repositories import RepositoryContainer
+from database.migrations import run_migrations
 from interfaces.orchestrators.whatsapp_orchestrator import process_message
+from services.context_management_service import ContextManagementService
+from services.context_service import ContextService
+from services.context_write_buffer import context_write_buffer
+from services.message_status_service import message_status_service
+from services.pdf_render_service import pdf_render_service
+from services.session_summary_service import SessionSummaryService
+from utils.circuit_breaker import breaker_snapshots
+from utils.history_cache import HistoryCache
+from utils.metrics import metrics
 
-app = FastAPI()
+repositories = RepositoryContainer()
+clients = ClientContainer()
+status_providers = {"zapi": ZAPIProvider(), "evolution": EvolutionProvider()}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Repositórios de contexto, status e outbox no banco (DATABASE_URL, SQLite local por padrão)
+    database = DatabaseClient()
+    # Aplica as migrações pendentes antes de qualquer worker usar as tabelas
+    await asyncio.to_thread(run_migrations, database.sync_engine)
+    repositories.initialize_db_repositories(database)
+    # Os envios de WhatsApp passam pela outbox durável, entregue pelo dispatcher
+    dispatcher = clients.use_outbox(repositories.get("outbox"), repositories.get("document"))
+    status_repository = repositories.get("message_status")
+    if status_repository:
+        message_status_service.attach_repository(status_repository)
+    await message_status_service.start()
+    context_repository = repositories.get("context")
+    if context_repository:
+        context_write_buffer.attach_repository(context_repository)
+    await context_write_buffer.start()
+    # Serviços de contexto com gravação write-behind: respostas, chamadas de função e
+    # documentos do turno vão para o buffer e são gravados em lote
+    app.state.context_service = ContextService(
+        context_repository,
+        repositories.get("user"),
+        write_buffer=context_write_buffer,
+        history_cache=HistoryCache("context", window=int(os.getenv("CONTEXT_SIZE", 80))),
+        summarizer=SessionSummaryService(clients.get("async_openai"))
+    )
+    app.state.context_management_service = ContextManagementService(
+        context_repository, repositories.get("user"), write_buffer=context_write_buffer
+    )
+    await dispatcher.start()
+    # Sobe o pool de renderização de PDF antes do primeiro roteiro
+    await pdf_render_service.warm()
+    yield
+    # Termina as entregas em andamento e grava o que restou no buffer antes de encerrar
+    await dispatcher.stop()
+    await context_write_buffer.stop()
+    await message_status_service.stop()
+    await asyncio.to_thread(pdf_render_service.shutdown)
+    await database.aclose()
+    await clients.close()
+
+app = FastAPI(lifespan=lifespan)
 
 @app.post("/webhook")
 async def webhook(request: Request):
@@ -9,4 +72,45 @@ async def webhook(request: Request):
     message = data["message"]["body"]
     sender = data["message"]["from"]
     process_message(message, sender)
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@app.post("/webhook/status")
+async def status_webhook(request: Request, provider: str = "zapi"):
+    """Recebe os callbacks de status de entrega (enviada, entregue, lida, falha)."""
+    if provider not in status_providers:
+        raise HTTPException(status_code=404, detail="Provedor desconhecido")
+    data = await request.json()
+    events = status_providers[provider].parse_status_callback(data)
+    applied = await message_status_service.ingest_async(events)
+    return {"status": "ok", "events": len(events), "applied": applied}
+
+@app.get("/messages/{message_id}/status")
+async def get_message_status(message_id: str):
+    record = await message_status_service.lookup(message_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Mensagem não encontrada")
+    return record
+
+@app.get("/documents/{content_hash}")
+async def get_document(content_hash: str):
+    """Serve documentos do armazenamento endereçado por conteúdo (ex: PDFs de roteiro)."""
+    document_store = repositories.get("document")
+    try:
+        if not document_store.exists(content_hash):
+            raise HTTPException(status_code=404, detail="Documento não encontrado")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Hash de documento inválido")
+
+    return StreamingResponse(
+        document_store.iter_chunks(content_hash),
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f'inline; filename="{content_hash[:12]}.pdf"',
+            "Cache-Control": "public, max-age=31536000, immutable"
+        }
+    )
+
+@app.get("/metrics")
+async def get_metrics():
+    """Métricas em memória (estado dos circuit breakers, latência por provedor, outbox etc.)."""
+    return {**metrics.snapshot(), "circuit_breakers": breaker_snapshots()}
@@ -0,0 +1,57 @@
+# tests/test_cached_message_repository.py
+"""Cache read-through das últimas mensagens sobre o MessageRepository real (SQLite migrado)."""
+import asyncio
+
+from sqlalchemy import create_engine
+
+from clients.database_client import DatabaseClient
+from database.migrations import run_migrations
+from repositories.cached_message_repository import CachedMessageRepository
+from repositories.message_repository import MessageRepository
+from repositories.user_repository import DatabaseUserRepository
+from utils.history_cache import HistoryCache
+
+PHONE = "5511999999999"
+
+
+def test_hits_and_misses_against_the_database(tmp_path):
+    url = f"sqlite:///{tmp_path / 'messages.db'}"
+    engine = create_engine(url)
+    run_migrations(engine)
+    engine.dispose()
+
+    async def scenario():
+        database = DatabaseClient(url)
+        try:
+            await DatabaseUserRepository(database).save_user(PHONE, "Ana")
+            repository = MessageRepository(database)
+            for content in ("oi", "quero ir para Orlando"):
+                await repository.create(PHONE, "user", content)
+
+            cache = HistoryCache("messages_test", window=10)
+            cached = CachedMessageRepository(repository, cache)
+
+            # Miss: carrega do banco, mais recentes primeiro
+            first = await cached.get_latest_customer_messages(phone=PHONE, limit=10)
+            assert [message["content"] for message in first] == ["quero ir para Orlando", "oi"]
+            assert (cache.stats()["hits"], cache.stats()["misses"]) == (0, 1)
+
+            # Hit: mesma resposta, sem ir ao banco
+            assert await cached.get_latest_customer_messages(phone=PHONE, limit=10) == first
+            assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+            # Mensagem nova entra no cache e é gravada no banco
+            created = await cached.create(PHONE, "assistant", "Claro! Para quando?")
+            latest = await cached.get_latest_customer_messages(phone=PHONE, limit=10)
+            assert latest[0] == created
+            assert (cache.stats()["hits"], cache.stats()["misses"]) == (2, 1)
+            assert await repository.get_latest_customer_messages(phone=PHONE, limit=10) == latest
+
+            # Telefone sem mensagens: um miss, depois o histórico vazio vem do cache
+            assert await cached.get_latest_customer_messages(phone="5511888888888", limit=10) == []
+            assert await cached.get_latest_customer_messages(phone="5511888888888", limit=10) == []
+            assert cache.stats()["hit_ratio"] == 3 / 5
+        finally:
+            await database.aclose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,232 @@
+# utils/circuit_breaker.py
+import threading
+import time
+from collections import deque
+
+from utils.metrics import metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Valor numérico de cada estado no gauge `circuit_breaker_state`
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreakerOpen(Exception):
+    """Levantada quando uma chamada é recusada porque o circuito está aberto."""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuito '{name}' aberto; nova tentativa em {retry_in:.1f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker com janela deslizante de resultados.
+
+    - closed: as chamadas passam; abre quando a taxa de falhas da janela passa de
+      `failure_threshold` (com pelo menos `min_calls` resultados) ou após
+      `consecutive_failures` falhas seguidas.
+    - open: as chamadas são recusadas por `recovery_timeout` segundos.
+    - half_open: libera uma única chamada de teste; sucesso fecha o circuito, falha reabre.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_threshold: float = 0.5,
+        consecutive_failures: int = 5,
+        recovery_timeout: float = 30.0
+    ):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_threshold = failure_threshold
+        self.consecutive_failures = consecutive_failures
+        self.recovery_timeout = recovery_timeout
+        self._results: deque[bool] = deque(maxlen=window)
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._streak = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        metrics.set_gauge("circuit_breaker_state", STATE_VALUES[CLOSED], breaker=name)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _transition(self, state: str) -> None:
+        if state == self._state:
+            return
+        self._state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        if state == CLOSED:
+            self._results.clear()
+            self._streak = 0
+        self._probe_in_flight = False
+        metrics.set_gauge("circuit_breaker_state", STATE_VALUES[state], breaker=self.name)
+        metrics.increment("circuit_breaker_transitions", breaker=self.name, to=state)
+
+    def _maybe_half_open(self) -> None:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._transition(HALF_OPEN)
+
+    def allow(self) -> bool:
+        """Indica se uma chamada pode ser feita agora (reserva a chamada de teste no half_open)."""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def retry_in(self) -> float:
+        """Segundos até o circuito aceitar uma nova chamada de teste."""
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+
+    def release(self) -> None:
+        """Libera a chamada de teste reservada sem registrar resultado (ex: chamada cancelada)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self, latency: float | None = None) -> None:
+        with self._lock:
+            self._results.append(True)
+            if latency is not None:
+                self._latencies.append(latency)
+            self._streak = 0
+            if self._state == HALF_OPEN:
+                self._transition(CLOSED)
+
+    def record_failure(self, latency: float | None = None) -> None:
+        with self._lock:
+            self._results.append(False)
+            if latency is not None:
+                self._latencies.append(latency)
+            self._streak += 1
+            if self._state == HALF_OPEN:
+                self._transition(OPEN)
+            elif self._state == CLOSED and self._should_trip():
+                self._transition(OPEN)
+
+    def _should_trip(self) -> bool:
+        if self._streak >= self.consecutive_failures:
+            return True
+        if len(self._results) < self.min_calls:
+            return False
+        failures = self._results.count(False)
+        return failures / len(self._results) >= self.failure_threshold
+
+    def success_rate(self) -> float:
+        with self._lock:
+            if not self._results:
+                return 1.0
+            return self._results.count(True) / len(self._results)
+
+    def median_latency(self) -> float:
+        with self._lock:
+            if not self._latencies:
+                return 0.0
+            ordered = sorted(self._latencies)
+            return ordered[len(ordered) // 2]
+
+    def call(self, func, *args, **kwargs):
+        """Executa `func` protegido pelo circuito (exceções contam como falha)."""
+        if not self.allow():
+            raise CircuitBreakerOpen(self.name, self.retry_in())
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure(time.perf_counter() - start)
+            raise
+        except BaseException:
+            self.release()
+            raise
+        self.record_success(time.perf_counter() - start)
+        return result
+
+    async def call_async(self, func, *args, **kwargs):
+        """Versão assíncrona de `call` para corrotinas."""
+        if not self.allow():
+            raise CircuitBreakerOpen(self.name, self.retry_in())
+        start = time.perf_counter()
+        try:
+            result = await func(*args, **kwargs)
+        except Exception:
+            self.record_failure(time.perf_counter() - start)
+            raise
+        except BaseException:
+            self.release()
+            raise
+        self.record_success(time.perf_counter() - start)
+        return result
+
+    async def stream_async(self, func, *args, **kwargs):
+        """
+        Versão de `call_async` para respostas em streaming: `func` devolve um iterável
+        assíncrono, e a criação e a leitura do fluxo inteiro contam como uma chamada.
+        """
+        if not self.allow():
+            raise CircuitBreakerOpen(self.name, self.retry_in())
+        start = time.perf_counter()
+        try:
+            async for item in await func(*args, **kwargs):
+                yield item
+        except Exception:
+            self.record_failure(time.perf_counter() - start)
+            raise
+        except BaseException:
+            self.release()
+            raise
+        self.record_success(time.perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        state = self.state
+        return {
+            "name": self.name,
+            "state": state,
+            "success_rate": self.success_rate(),
+            "median_latency_seconds": self.median_latency(),
+            "consecutive_failures": self._streak,
+            "retry_in_seconds": self.retry_in(),
+        }
+
+
+# Dependências externas com circuit breaker próprio
+OPENAI = "openai"
+QUEUE_TIMES = "queue_times"
+
+# Circuit breakers das dependências externas, um por processo
+_dependency_breakers: dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def dependency_breaker(name: str, **options) -> CircuitBreaker:
+    """Circuit breaker compartilhado da dependência `name` (criado no primeiro uso com `options`)."""
+    with _registry_lock:
+        breaker = _dependency_breakers.get(name)
+        if breaker is None:
+            breaker = _dependency_breakers[name] = CircuitBreaker(name, **options)
+        return breaker
+
+
+def breaker_snapshots() -> dict:
+    """Estado de cada circuit breaker de dependência, para o endpoint de métricas."""
+    with _registry_lock:
+        breakers = list(_dependency_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
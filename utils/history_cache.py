@@ -0,0 +1,157 @@
+# utils/history_cache.py
+import sys
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional
+
+from utils.metrics import metrics
+
+# Custo fixo estimado de cada mensagem em memória (dict, deque, chaves), além do conteúdo
+MESSAGE_OVERHEAD_BYTES = 240
+
+
+def _message_size(message: Dict[str, Any]) -> int:
+    return MESSAGE_OVERHEAD_BYTES + sum(
+        sys.getsizeof(value) for value in message.values() if isinstance(value, (str, bytes))
+    )
+
+
+class _Entry:
+    __slots__ = ("messages", "size", "complete")
+
+    def __init__(self, window: int, complete: bool):
+        self.messages: Deque[Dict[str, Any]] = deque(maxlen=window)
+        self.size = 0
+        # True quando o cache contém o histórico inteiro da sessão (não só a janela recente)
+        self.complete = complete
+
+
+class HistoryCache:
+    """
+    Cache read-through das mensagens mais recentes de cada sessão.
+
+    - Guarda até `window` mensagens por sessão, em ordem cronológica.
+    - É atualizado a cada mensagem nova (`append`) em vez de invalidado, então o
+      histórico já está em memória quando o agente roda.
+    - O total é limitado por `max_bytes` (tamanho estimado); ao passar do limite,
+      as sessões usadas há mais tempo são descartadas (LRU).
+    """
+
+    def __init__(self, name: str, window: int = 80, max_bytes: int = 64 * 1024 * 1024):
+        self.name = name
+        self.window = window
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        # Sessões sendo carregadas do banco -> mensagens novas chegadas durante a carga
+        self._loading: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: Hashable, limit: Optional[int]) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            hit = entry is not None and (entry.complete or (limit is not None and len(entry.messages) >= limit))
+            if hit:
+                self._hits += 1
+                self._entries.move_to_end(key)
+                messages = list(entry.messages)
+            else:
+                self._misses += 1
+            metrics.increment("history_cache_hits" if hit else "history_cache_misses", cache=self.name)
+            metrics.set_gauge("history_cache_hit_ratio", self._hits / (self._hits + self._misses), cache=self.name)
+        if not hit:
+            return None
+        return messages[-limit:] if limit else messages
+
+    async def get(
+        self,
+        key: Hashable,
+        loader: Callable[[int], Any],
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Últimas `limit` mensagens da sessão (todas, se None), em ordem cronológica.
+        Em caso de miss, `loader(n)` (coroutine) busca as n mais recentes no banco.
+        """
+        cached = self._lookup(key, limit)
+        if cached is not None:
+            return cached
+
+        fetch = max(self.window, limit or 0)
+        with self._lock:
+            self._loading.setdefault(key, 0)
+        try:
+            messages = list(await loader(fetch))
+        finally:
+            with self._lock:
+                raced = self._loading.pop(key, 0)
+        # Se chegou mensagem durante a carga, o resultado pode estar defasado: não guarda
+        if not raced:
+            self.put(key, messages, complete=len(messages) < fetch)
+        return messages[-limit:] if limit else messages
+
+    def put(self, key: Hashable, messages: List[Dict[str, Any]], complete: bool = False) -> None:
+        """Substitui a janela da sessão pelas mensagens informadas (ordem cronológica)."""
+        entry = _Entry(self.window, complete=complete and len(messages) <= self.window)
+        for message in messages[-self.window:]:
+            entry.messages.append(message)
+            entry.size += _message_size(message)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            self._evict()
+
+    def append(self, key: Hashable, message: Dict[str, Any], new_session: bool = False) -> None:
+        """
+        Acrescenta uma mensagem à janela da sessão. Sessões fora do cache só passam a
+        ser guardadas se forem novas (`new_session`), quando o histórico inteiro é conhecido.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if key in self._loading:
+                    self._loading[key] += 1
+                if not new_session:
+                    return
+                entry = self._entries[key] = _Entry(self.window, complete=True)
+            delta = _message_size(message)
+            if len(entry.messages) == self.window:
+                # A deque descarta a mais antiga; a sessão deixa de estar completa no cache
+                delta -= _message_size(entry.messages[0])
+                entry.complete = False
+            entry.messages.append(message)
+            entry.size += delta
+            self._bytes += delta
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry.size
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            metrics.increment("history_cache_evictions", cache=self.name)
+        metrics.set_gauge("history_cache_bytes", self._bytes, cache=self.name)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "sessions": len(self._entries),
+                "messages": sum(len(entry.messages) for entry in self._entries.values()),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / lookups if lookups else None,
+            }
@@ -0,0 +1,43 @@
+# utils/latency_predictor.py
+import threading
+from collections import deque
+
+
+class LatencyPredictor:
+    """
+    Prevê a latência de uma operação (ex: um agente) a partir do histórico recente.
+
+    A previsão é o quantil `quantile` das últimas `window` durações; enquanto não houver
+    `min_samples` medições, usa a estimativa inicial informada (`prior`).
+    """
+
+    def __init__(self, window: int = 50, quantile: float = 0.75, min_samples: int = 5):
+        self.window = window
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self._samples: dict[str, deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def predict(self, key: str, prior: float | None = None) -> float | None:
+        """
+        Returns:
+            float | None: Latência prevista em segundos, ou None sem histórico nem estimativa inicial
+        """
+        with self._lock:
+            samples = list(self._samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return prior
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self.quantile))]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            keys = list(self._samples)
+        return {
+            key: {"samples": len(self._samples[key]), "predicted_seconds": self.predict(key)}
+            for key in keys
+        }
@@ -0,0 +1,64 @@
+# utils/message_chunker.py
+import os
+import re
+
+# Tamanho máximo de cada parte enviada pelo WhatsApp (bem abaixo do limite do app, para boa leitura)
+WHATSAPP_MAX_MESSAGE_LENGTH = int(os.getenv("WHATSAPP_MAX_MESSAGE_LENGTH", 4000))
+
+# Linhas que iniciam uma nova seção: áreas do parque (*📍 Área*) e dias do roteiro (**Dia N**)
+SECTION_HEADER = re.compile(r"^[ \t]*(\*📍|\*{1,2}Dia\s+\d+)", re.MULTILINE)
+
+
+def _split_sections(text: str) -> list[str]:
+    starts = [m.start() for m in SECTION_HEADER.finditer(text) if m.start() > 0]
+    bounds = [0, *starts, len(text)]
+    return [text[a:b] for a, b in zip(bounds, bounds[1:]) if text[a:b]]
+
+
+def _split_oversized(block: str, max_length: int) -> list[str]:
+    """Quebra um bloco maior que o limite em parágrafos, depois linhas e, por fim, caracteres."""
+    for separator in ("\n\n", "\n"):
+        pieces = block.split(separator)
+        if len(pieces) > 1:
+            parts = [piece + separator for piece in pieces[:-1]] + [pieces[-1]]
+            return _pack([p for p in parts if p], max_length)
+    return [block[i:i + max_length] for i in range(0, len(block), max_length)]
+
+
+def _pack(blocks: list[str], max_length: int) -> list[str]:
+    """Agrupa blocos consecutivos em partes de até `max_length` caracteres."""
+    chunks: list[str] = []
+    current = ""
+    for block in blocks:
+        if len(block) > max_length:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.extend(_split_oversized(block, max_length))
+        elif len(current) + len(block) > max_length:
+            chunks.append(current)
+            current = block
+        else:
+            current += block
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def split_message(text: str, max_length: int = WHATSAPP_MAX_MESSAGE_LENGTH) -> list[str]:
+    """
+    Divide uma resposta longa em partes que cabem em uma mensagem do WhatsApp,
+    preferindo cortar nos cabeçalhos de seção (áreas do parque e dias do roteiro).
+
+    Args:
+        text (str): Mensagem completa
+        max_length (int): Tamanho máximo de cada parte
+
+    Returns:
+        list: Partes da mensagem, na ordem de envio
+    """
+    if len(text) <= max_length:
+        return [text]
+
+    chunks = _pack(_split_sections(text), max_length)
+    return [chunk.strip("\n") for chunk in chunks if chunk.strip()]
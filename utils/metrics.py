@@ -0,0 +1,121 @@
+# utils/metrics.py
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any
+
+# Limites (em segundos) dos buckets usados pelos histogramas de latência
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Histogram:
+    """Histograma simples com buckets fixos, contagem, soma, mínimo e máximo."""
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min: float | None = None
+        self.max: float | None = None
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        for i, limit in enumerate(self.buckets):
+            if value <= limit:
+                self.bucket_counts[i] += 1
+                return
+        self.bucket_counts[-1] += 1
+
+    def to_dict(self) -> dict:
+        cumulative = 0
+        buckets = {}
+        for limit, count in zip(self.buckets, self.bucket_counts):
+            cumulative += count
+            buckets[str(limit)] = cumulative
+        buckets["+Inf"] = self.count
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "avg": self.total / self.count if self.count else 0.0,
+            "min": self.min,
+            "max": self.max,
+            "buckets": buckets,
+        }
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas em memória (contadores, gauges e histogramas).
+    As métricas são identificadas pelo nome e por labels opcionais.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = {}
+        self._gauges: dict[str, float] = {}
+        self._histograms: dict[str, Histogram] = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict[str, Any]) -> str:
+        if not labels:
+            return name
+        rendered = ",".join(f"{k}={v}" for k, v in sorted(labels.items()))
+        return f"{name}{{{rendered}}}"
+
+    def increment(self, name: str, value: float = 1, **labels) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(self._key(name, labels), 0)
+
+    def histogram(self, name: str, **labels) -> dict | None:
+        with self._lock:
+            histogram = self._histograms.get(self._key(name, labels))
+            return histogram.to_dict() if histogram else None
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Mede o tempo de execução do bloco e registra no histograma `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "histograms": {key: h.to_dict() for key, h in self._histograms.items()},
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+# Instância global, pronta para importar em outros módulos
+metrics = MetricsRegistry()
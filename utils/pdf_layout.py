@@ -0,0 +1,111 @@
+# utils/pdf_layout.py
+"""
+Motor de layout dos PDFs de roteiro.
+
+As funções deste módulo são puras e rodam dentro dos processos do pool de
+renderização (services/pdf_render_service.py): `warm_up` pré-carrega fontes e
+estilos uma vez por processo, `layout_text` quebra o texto em linhas que cabem
+na página e `render_lines` desenha o PDF.
+"""
+import io
+import re
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfgen import canvas
+
+PAGE_SIZE = letter
+MARGIN = 50
+
+# estilo -> (fonte, tamanho, entrelinha, recuo)
+STYLES = {
+    "title": ("Helvetica-Bold", 16, 22, 0),
+    "day_header": ("Helvetica-Bold", 13, 20, 0),
+    "body": ("Helvetica", 10, 14, 0),
+    "bullet": ("Helvetica", 10, 14, 14),
+    "blank": ("Helvetica", 10, 8, 0),
+}
+
+DAY_HEADER = re.compile(r"^\s*\*\*(Dia\s+\d+.*?)\*\*\s*:?\s*$")
+TITLE = re.compile(r"^\s*#{1,3}\s+(.*)$")
+BULLET = re.compile(r"^\s*[-*•]\s+(.*)$")
+INLINE_BOLD = re.compile(r"\*\*(.+?)\*\*")
+
+_warmed = False
+
+
+def warm_up() -> None:
+    """Pré-carrega as métricas das fontes usadas pelos estilos (inicializador do pool)."""
+    global _warmed
+    if _warmed:
+        return
+    for font_name, font_size, _, _ in STYLES.values():
+        pdfmetrics.getFont(font_name)
+        pdfmetrics.stringWidth("Orlando", font_name, font_size)
+    _warmed = True
+
+
+def _wrap(style: str, text: str) -> list[tuple[str, str]]:
+    font_name, font_size, _, indent = STYLES[style]
+    width = PAGE_SIZE[0] - 2 * MARGIN - indent
+    return [(style, line) for line in simpleSplit(text, font_name, font_size, width)] or [(style, "")]
+
+
+def layout_text(conteudo_texto: str) -> list[tuple[str, str]]:
+    """
+    Converte o markdown do roteiro em linhas já quebradas na largura da página.
+
+    Returns:
+        list: pares (estilo, linha) prontos para `render_lines`
+    """
+    # Seções fatiadas do streaming terminam com a quebra que pertence à próxima linha
+    if conteudo_texto.endswith("\n"):
+        conteudo_texto = conteudo_texto[:-1]
+
+    lines: list[tuple[str, str]] = []
+    for raw in conteudo_texto.split("\n"):
+        if not raw.strip():
+            lines.append(("blank", ""))
+        elif match := DAY_HEADER.match(raw):
+            lines.extend(_wrap("day_header", match.group(1).strip()))
+        elif match := TITLE.match(raw):
+            lines.extend(_wrap("title", INLINE_BOLD.sub(r"\1", match.group(1)).strip()))
+        elif match := BULLET.match(raw):
+            wrapped = _wrap("bullet", INLINE_BOLD.sub(r"\1", match.group(1)).strip())
+            first_style, first_line = wrapped[0]
+            lines.append((first_style, f"• {first_line}"))
+            lines.extend(wrapped[1:])
+        else:
+            lines.extend(_wrap("body", INLINE_BOLD.sub(r"\1", raw).strip()))
+    return lines
+
+
+def render_lines(lines: list[tuple[str, str]]) -> bytes:
+    """Desenha as linhas já diagramadas e retorna os bytes do PDF."""
+    warm_up()
+    largura, altura = PAGE_SIZE
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=PAGE_SIZE)
+    y = altura - MARGIN
+
+    for style, line in lines:
+        font_name, font_size, leading, indent = STYLES[style]
+        if y - leading < MARGIN:
+            pdf.showPage()
+            y = altura - MARGIN
+        # Evita espaço em branco no topo da página
+        if style == "blank" and y == altura - MARGIN:
+            continue
+        y -= leading
+        if line:
+            pdf.setFont(font_name, font_size)
+            x = MARGIN + (indent if style == "bullet" and not line.startswith("• ") else 0)
+            pdf.drawString(x, y, line)
+
+    pdf.save()
+    return buffer.getvalue()
+
+
+def render_pdf(conteudo_texto: str) -> bytes:
+    return render_lines(layout_text(conteudo_texto))
+
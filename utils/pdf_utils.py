@@ -1,24 +1,43 @@
-import io
-import base64
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-
-def gerar_pdf_base64(conteudo_texto: str, nome_arquivo: str = "roteiro.pdf") -> str:
-    buffer = io.BytesIO()
-    pdf = canvas.Canvas(buffer, pagesize=letter)
-    largura, altura = letter
-
-    linhas = conteudo_texto.split('\n')
-    y = altura - 50
-    for linha in linhas:
-        pdf.drawString(50, y, linha)
-        y -= 15  # Espaço entre linhas
-        if y < 50:
-            pdf.showPage()
-            y = altura - 50
-
-    pdf.save()
-    buffer.seek(0)
-    pdf_bytes = buffer.read()
-    pdf_base64 = base64.b64encode(pdf_bytes).decode("utf-8")
-    return pdf_base64
\ No newline at end of file
+import re
+
+# Cabeçalho de cada dia do roteiro (ex: **Dia 1: Chegada e Disney Springs**)
+DAY_HEADER_PATTERN = re.compile(r"^[ \t]*\*\*Dia\s+\d+", re.MULTILINE)
+
+
+class DaySectionSplitter:
+    """
+    Acumula o texto recebido em streaming e libera cada seção de dia assim que
+    o cabeçalho do dia seguinte começa. O texto antes do primeiro dia sai como
+    uma seção de introdução.
+    """
+    def __init__(self):
+        self._buffer = ""
+
+    @staticmethod
+    def is_day_section(section: str) -> bool:
+        return DAY_HEADER_PATTERN.match(section) is not None
+
+    def feed(self, delta: str) -> list[str]:
+        self._buffer += delta
+
+        # Só considera linhas completas, para não confundir um cabeçalho pela metade
+        complete = self._buffer[: self._buffer.rfind("\n") + 1]
+        starts = [m.start() for m in DAY_HEADER_PATTERN.finditer(complete) if m.start() > 0]
+        if not starts:
+            return []
+
+        sections = []
+        previous = 0
+        for start in starts:
+            section = self._buffer[previous:start]
+            if section.strip():
+                sections.append(section)
+            previous = start
+        self._buffer = self._buffer[previous:]
+        return sections
+
+    def flush(self) -> list[str]:
+        """Libera o que restou no buffer ao final do streaming."""
+        section, self._buffer = self._buffer, ""
+        return [section] if section.strip() else []
+
@@ -0,0 +1,41 @@
+# utils/phone.py
+import re
+
+NON_DIGITS = re.compile(r"[^0-9]")
+
+
+def normalize_phone(phone: str) -> str:
+    """
+    Remove caracteres não numéricos e adiciona o DDI 55 caso não tenha.
+
+    Args:
+        phone (str): Número em qualquer formato (ex: "(11) 99999-9999")
+
+    Returns:
+        str: Número apenas com dígitos (ex: "5511999999999")
+    """
+    phone_clean = NON_DIGITS.sub("", phone or "")
+
+    if phone_clean and not phone_clean.startswith("55") and len(phone_clean) <= 11:
+        return f"55{phone_clean}"
+
+    return phone_clean
+
+
+def is_valid_cell_number(phone: str) -> bool:
+    """Valida o tamanho do número: mínimo 11 dígitos (DDD + celular) e máximo 13 (DDI + DDD + celular)."""
+    phone_clean = NON_DIGITS.sub("", phone or "")
+
+    if not phone_clean:
+        print("[WHATSAPP] ❌ Dados incompletos: O número de telefone é obrigatório.")
+        return False
+
+    if len(phone_clean) < 11:
+        print(f"[WHATSAPP] Telefone inválido. O número de celular deve conter no mínimo 11 dígitos (com DDD): {phone_clean}")
+        return False
+
+    if len(phone_clean) > 13:
+        print(f"[WHATSAPP] Telefone inválido. O número de celular deve conter no máximo 13 dígitos (com DDI e DDD): {phone_clean}")
+        return False
+
+    return True
@@ -0,0 +1,38 @@
+# utils/rate_limiter.py
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Limitador de taxa do tipo token bucket.
+    Libera até `rate` operações por segundo, com rajadas de até `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Aguarda até haver `tokens` disponíveis e os consome.
+
+        Returns:
+            float: Quanto tempo (em segundos) a chamada esperou
+        """
+        start = time.monotonic()
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
+        return time.monotonic() - start
@@ -0,0 +1,23 @@
+# utils/sizeof.py
+import sys
+from typing import Any, Optional
+
+
+def deep_sizeof(obj: Any, seen: Optional[set] = None) -> int:
+    """
+    Bytes ocupados pelo objeto e por tudo que ele referencia (dicts, listas, tuplas,
+    conjuntos e seus elementos). Objetos compartilhados são contados uma vez por `seen`;
+    as chaves dos dicts não entram, porque são strings literais compartilhadas
+    ("role", "content") e não memória da mensagem.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(value, seen) for value in obj.values())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    return size
@@ -0,0 +1,47 @@
+# utils/tokenizer.py
+import json
+import math
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:  # sem o tiktoken, estima ~4 caracteres por token
+    tiktoken = None
+
+# Tokens extras de cada mensagem no formato de chat (papel e delimitadores)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # Os arquivos do tokenizer não estão no cache local nem puderam ser baixados
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """Conta os tokens do texto com o tokenizer local do modelo."""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(message: dict, model: str = "gpt-4o-mini") -> int:
+    """Tokens de uma mensagem de chat (conteúdo, tool calls e o custo fixo da mensagem)."""
+    content = message.get("content")
+    if content is not None and not isinstance(content, str):
+        content = json.dumps(content, ensure_ascii=False, default=str)
+    tokens = MESSAGE_OVERHEAD_TOKENS + count_tokens(content or "", model)
+    if message.get("tool_calls"):
+        tokens += count_tokens(json.dumps(message["tool_calls"], ensure_ascii=False, default=str), model)
+    return tokens
@@ -0,0 +1,177 @@
+# utils/turn_context.py
+import asyncio
+import inspect
+import os
+import time
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from utils.circuit_breaker import CircuitBreaker, CircuitBreakerOpen
+from utils.metrics import metrics
+from utils.phone import is_valid_cell_number, normalize_phone
+
+T = TypeVar("T")
+
+# Prazo padrão de um turno, do webhook ao envio da resposta (cobre a geração do roteiro)
+DEFAULT_TURN_BUDGET = float(os.getenv("TURN_DEADLINE_SECONDS", 150))
+# Tempo reservado no fim do turno para o envio da resposta pelo WhatsApp
+SEND_RESERVE = float(os.getenv("TURN_SEND_RESERVE_SECONDS", 5))
+
+
+class DeadlineExceeded(Exception):
+    """O prazo do turno (ou da etapa) acabou antes de a etapa `stage` terminar."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Prazo do turno esgotado na etapa '{stage}'")
+        self.stage = stage
+
+
+def session_id_for(phone: str) -> str:
+    """ID da sessão de conversa de um telefone (canônico)."""
+    return f"session_{phone}"
+
+
+@dataclass
+class TurnContext:
+    """
+    Dados de um turno (mensagem recebida -> resposta), derivados uma vez na entrada e
+    repassados ao orquestrador, aos agentes e aos clientes, que não os recalculam:
+    telefone canônico, usuário, sessão/contexto, prazo e IDs de rastreio.
+    """
+    raw_phone: str
+    phone: str
+    session_id: str
+    trace_id: str
+    started_at: float = field(default_factory=time.monotonic)
+    # Instante (time.monotonic) em que o turno deve estar respondido; None = sem prazo
+    deadline: Optional[float] = None
+    user: Optional[Dict[str, Any]] = None
+    user_id: Optional[int] = None
+    context_id: Optional[int] = None
+
+    @classmethod
+    def start(cls, phone: str, budget: Optional[float] = None, trace_id: Optional[str] = None) -> "TurnContext":
+        """Cria o contexto do turno na entrada; `budget` é o prazo em segundos a partir de agora."""
+        canonical = normalize_phone(phone)
+        started_at = time.monotonic()
+        return cls(
+            raw_phone=phone,
+            phone=canonical,
+            session_id=session_id_for(canonical),
+            trace_id=trace_id or uuid.uuid4().hex,
+            started_at=started_at,
+            deadline=started_at + budget if budget is not None else None
+        )
+
+    @cached_property
+    def phone_valid(self) -> bool:
+        # Validado na primeira vez que alguém precisa (envio), depois reaproveitado; como
+        # fora do turno, vale o número recebido (o canônico já tem o 55 acrescentado)
+        return is_valid_cell_number(self.raw_phone)
+
+    def matches(self, phone: str) -> bool:
+        return phone == self.phone or phone == self.raw_phone
+
+    def remaining(self) -> Optional[float]:
+        """Segundos até o prazo do turno (negativo se já passou); None se não há prazo."""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def stage_timeout(self, share: float = 1.0, cap: Optional[float] = None, reserve: float = 0.0) -> Optional[float]:
+        """
+        Tempo de uma etapa: a fração `share` do que resta do turno depois de `reserve`
+        (tempo guardado para as etapas seguintes), limitada a `cap` segundos.
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return cap
+        budget = (remaining - reserve) * share
+        return min(budget, cap) if cap is not None else budget
+
+
+async def within_deadline(
+    turn: Optional[TurnContext],
+    stage: str,
+    awaitable: Awaitable[T],
+    share: float = 1.0,
+    cap: Optional[float] = None,
+    reserve: float = 0.0
+) -> T:
+    """
+    Executa uma etapa do turno dentro da sua parte do prazo (ver TurnContext.stage_timeout).
+    Se o prazo acabar, a etapa é cancelada, o estouro é contado em `turn_deadline_misses`
+    (label `stage`) e DeadlineExceeded é levantada. Sem turno, vale só o `cap`.
+    """
+    timeout = turn.stage_timeout(share, cap, reserve) if turn is not None else cap
+    if timeout is not None and timeout <= 0:
+        if inspect.iscoroutine(awaitable):
+            awaitable.close()
+        metrics.increment("turn_deadline_misses", stage=stage)
+        raise DeadlineExceeded(stage)
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        metrics.increment("turn_deadline_misses", stage=stage)
+        raise DeadlineExceeded(stage) from None
+
+
+async def guarded_stage(
+    breaker: CircuitBreaker,
+    turn: Optional[TurnContext],
+    stage: str,
+    call: Callable[[], Awaitable[T]],
+    share: float = 1.0,
+    cap: Optional[float] = None,
+    reserve: float = 0.0
+) -> T:
+    """
+    Etapa que chama uma dependência externa, protegida pelo seu circuit breaker e
+    dentro do prazo do turno (ver within_deadline).
+
+    Com o circuito aberto, falha na hora com CircuitBreakerOpen, sem chamar a dependência.
+    Erros e estouros do prazo da etapa contam como falha da dependência; um turno que
+    já chegou sem tempo não conta.
+    """
+    if not breaker.allow():
+        metrics.increment("circuit_breaker_rejections", breaker=breaker.name)
+        raise CircuitBreakerOpen(breaker.name, breaker.retry_in())
+    timeout = turn.stage_timeout(share, cap, reserve) if turn is not None else cap
+    if timeout is not None and timeout <= 0:
+        breaker.release()
+        metrics.increment("turn_deadline_misses", stage=stage)
+        raise DeadlineExceeded(stage)
+    start = time.perf_counter()
+    try:
+        result = await within_deadline(turn, stage, call(), share, cap, reserve)
+    except Exception:
+        breaker.record_failure(time.perf_counter() - start)
+        raise
+    except BaseException:
+        breaker.release()
+        raise
+    breaker.record_success(time.perf_counter() - start)
+    return result
+
+
+# Turno em andamento na task atual (para camadas cuja assinatura não recebe o turno, como IChat)
+current_turn: ContextVar[Optional[TurnContext]] = ContextVar("current_turn", default=None)
+
+
+def canonical_phone(phone: str) -> str:
+    """Telefone normalizado, reaproveitando o do turno em andamento quando é o mesmo número."""
+    turn = current_turn.get()
+    if turn is not None and turn.matches(phone):
+        return turn.phone
+    return normalize_phone(phone)
+
+
+def valid_cell_number(phone: str) -> bool:
+    """Validação do telefone, reaproveitando a do turno em andamento quando é o mesmo número."""
+    turn = current_turn.get()
+    if turn is not None and phone == turn.raw_phone:
+        return turn.phone_valid
+    return is_valid_cell_number(phone)